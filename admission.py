@@ -0,0 +1,170 @@
+"""
+受付制御モジュール
+検索のコスト（企業数 × (キーマン数 + 1)）を見積もり、実行待ち・実行中の検索のコストと
+実行スレッド数から受け付けるかどうかを判定する
+
+受け付けない場合、app.py は 429 と Retry-After（空きができるまでの見積もり秒数）を返す。
+1件で上限を超える検索は待っても受け付けられないため 413 を返す。
+バッチ検索は検索条件の合計を1つの単位として判定し、合計の上限（max_batch_cost）を超える場合は 413 を返す
+"""
+
+import math
+from typing import Optional, Sequence
+
+import metrics
+from config import (ADMISSION_CONTROL, ADMISSION_COST_PER_WORKER, ADMISSION_MAX_JOB_COST, ADMISSION_MAX_BATCH_COST,
+                    ADMISSION_SUBMITTER_SHARE, ADMISSION_INTERACTIVE_HEADROOM, ADMISSION_SECONDS_PER_COST)
+
+# Retry-After の範囲（秒）
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 300
+
+ADMISSION_DECISIONS = metrics.counter(
+    'sales_bot_admission_decisions_total', '検索の受付判定の数', ('decision', 'reason'))
+ADMISSION_QUEUED_COST = metrics.gauge(
+    'sales_bot_admission_queued_cost', '直近の受付判定時点の実行待ち・実行中の検索のコスト')
+ADMISSION_CAPACITY_COST = metrics.gauge(
+    'sales_bot_admission_capacity_cost', '受け付ける実行待ち・実行中の検索のコストの上限')
+
+
+class Decision:
+    """
+    受付判定の結果
+
+    Attributes:
+        accepted: 受け付けるかどうか
+        reason: 判定の理由（accepted / job_too_large / batch_too_large / queue_full / submitter_limit / disabled）
+        status_code: 受け付けない場合に返す HTTP ステータス
+        retry_after: 再試行までの秒数（待っても受け付けられない場合は None）
+        message: 受け付けない場合に返すメッセージ
+    """
+
+    def __init__(self, accepted: bool, reason: str, status_code: int = 200, retry_after: Optional[int] = None,
+                 message: str = ''):
+        self.accepted = accepted
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.message = message
+
+
+class AdmissionController:
+    """
+    検索の受付制御
+
+    Args:
+        workers: 検索のステップを実行するスレッド数の合計
+        cost_per_worker: 実行待ち・実行中のコストの上限（スレッド1つあたり）
+        max_job_cost: 1件の検索のコストの上限
+        max_batch_cost: バッチ検索の検索条件の合計コストの上限
+        submitter_share: 1つの送信者が使える上限の割合
+        interactive_headroom: interactive の検索だけが使える上限の超過分の割合
+        seconds_per_cost: コスト1あたりの処理時間の見積もり（秒）
+        enabled: False の場合はすべて受け付ける
+    """
+
+    def __init__(self, workers: int, cost_per_worker: int = ADMISSION_COST_PER_WORKER,
+                 max_job_cost: int = ADMISSION_MAX_JOB_COST, submitter_share: float = ADMISSION_SUBMITTER_SHARE,
+                 interactive_headroom: float = ADMISSION_INTERACTIVE_HEADROOM,
+                 seconds_per_cost: float = ADMISSION_SECONDS_PER_COST, enabled: bool = ADMISSION_CONTROL,
+                 max_batch_cost: int = ADMISSION_MAX_BATCH_COST):
+        self.workers = max(int(workers), 1)
+        self.capacity = self.workers * cost_per_worker
+        self.max_job_cost = max_job_cost
+        self.max_batch_cost = max(max_batch_cost, max_job_cost)
+        self.submitter_share = submitter_share
+        self.interactive_headroom = interactive_headroom
+        self.seconds_per_cost = seconds_per_cost
+        self.enabled = enabled
+        ADMISSION_CAPACITY_COST.set(self.capacity)
+
+    def _retry_after(self, excess: float) -> int:
+        # 超過分のコストを実行スレッドで処理し終えるまでの見積もり
+        seconds = math.ceil(excess * self.seconds_per_cost / self.workers)
+        return min(max(seconds, MIN_RETRY_AFTER), MAX_RETRY_AFTER)
+
+    def decide(self, cost: int, queued_cost: int, submitter_cost: int = 0, priority: str = 'normal') -> Decision:
+        """
+        受け付けるかどうかを判定
+
+        Args:
+            cost: 新しい検索のコスト
+            queued_cost: 実行待ち・実行中の検索のコスト（残りの分）
+            submitter_cost: そのうち同じ送信者の検索のコスト
+            priority: 新しい検索の優先度クラス
+        """
+        ADMISSION_QUEUED_COST.set(queued_cost)
+        decision = self._decide(cost, queued_cost, submitter_cost, priority)
+        ADMISSION_DECISIONS.inc(decision='accepted' if decision.accepted else 'rejected', reason=decision.reason)
+        return decision
+
+    def decide_batch(self, costs: Sequence[int], queued_cost: int, submitter_cost: int = 0,
+                     priority: str = 'normal') -> Decision:
+        """
+        バッチ検索を1つの単位として受け付けるかどうかを判定（各検索条件は max_job_cost まで、
+        合計は max_batch_cost まで。合計が上限以下なら、実行スレッドが空けば必ず受け付けられる）
+
+        Args:
+            costs: 検索条件ごとのコスト
+            queued_cost: 実行待ち・実行中の検索のコスト（残りの分）
+            submitter_cost: そのうち同じ送信者の検索のコスト
+            priority: バッチの優先度クラス
+        """
+        ADMISSION_QUEUED_COST.set(queued_cost)
+        decision = self._decide_batch(costs, queued_cost, submitter_cost, priority)
+        ADMISSION_DECISIONS.inc(decision='accepted' if decision.accepted else 'rejected', reason=decision.reason)
+        return decision
+
+    def _decide_batch(self, costs: Sequence[int], queued_cost: int, submitter_cost: int,
+                      priority: str) -> Decision:
+        if not self.enabled:
+            return Decision(True, 'disabled')
+
+        for cost in costs:
+            if cost > self.max_job_cost:
+                return self._too_large(cost)
+
+        total = sum(costs)
+        if total > self.max_batch_cost:
+            return Decision(False, 'batch_too_large', 413, message=(
+                f"バッチ検索が大きすぎます（合計コスト {total}、上限 {self.max_batch_cost}）。"
+                f"検索条件を分けて送信してください。"))
+
+        return self._decide_queue(total, queued_cost, submitter_cost, priority, self.max_batch_cost)
+
+    def _too_large(self, cost: int) -> Decision:
+        return Decision(False, 'job_too_large', 413, message=(
+            f"検索が大きすぎます（コスト {cost}、上限 {self.max_job_cost}）。"
+            f"企業数またはキーマン数を減らしてください。"))
+
+    def _decide(self, cost: int, queued_cost: int, submitter_cost: int, priority: str) -> Decision:
+        if not self.enabled:
+            return Decision(True, 'disabled')
+
+        if cost > self.max_job_cost:
+            return self._too_large(cost)
+
+        return self._decide_queue(cost, queued_cost, submitter_cost, priority, self.max_job_cost)
+
+    def _decide_queue(self, cost: int, queued_cost: int, submitter_cost: int, priority: str,
+                      max_cost: int) -> Decision:
+        # 実行スレッドが空いている場合は、1件だけなら上限を超えても受け付ける
+        if queued_cost == 0:
+            return Decision(True, 'accepted')
+
+        # interactive の検索はスケジューラーで先に実行されるため、少し多めに受け付ける
+        capacity = self.capacity
+        if priority == 'interactive':
+            capacity = int(capacity * (1 + self.interactive_headroom))
+
+        # 上限以下の検索（バッチ）は、送信者の他の検索が終われば受け付けられるようにする
+        submitter_limit = max(int(self.capacity * self.submitter_share), max_cost)
+        if submitter_cost + cost > submitter_limit:
+            return Decision(False, 'submitter_limit', 429, self._retry_after(submitter_cost + cost - submitter_limit),
+                            "実行中の検索が多すぎます。しばらく待ってから再度お試しください。")
+
+        if queued_cost + cost > capacity:
+            return Decision(False, 'queue_full', 429, self._retry_after(queued_cost + cost - capacity),
+                            "混み合っています。しばらく待ってから再度お試しください。")
+
+        return Decision(True, 'accepted')
@@ -8,8 +8,8 @@ import os
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-# 環境変数を設定
-os.environ['USE_MEMORY_DB'] = 'true'
+# 環境変数を設定（REDIS_URL を設定するとインスタンス間で検索状態を共有できる）
+os.environ.setdefault('USE_MEMORY_DB', 'true')
 
 try:
     # FastAPIアプリをインポート
@@ -1,5 +1,10 @@
 """
 検索API
+
+JOB_EXECUTION=worker の場合は検索を保存して search_id をすぐに返し、
+api/worker.py（または worker.py）が企業単位に分けて実行する。
+それ以外の場合はこの関数内で検索を実行する（SEARCH_TIMEOUT を関数のタイムアウトより短くすると、
+締め切りでそこまでの結果を保存して返す）
 """
 from http.server import BaseHTTPRequestHandler
 import json
@@ -11,23 +16,25 @@ from urllib.parse import parse_qs
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-# 環境変数を設定
-os.environ['USE_MEMORY_DB'] = 'true'
-
-from company_search import CompanySearch
-from keyman_finder import KeymanFinder
-import database_memory as db_module
+# 環境変数を設定（REDIS_URL を設定するとインスタンス間で検索状態を共有できる）
+os.environ.setdefault('USE_MEMORY_DB', 'true')
 
-# データベース初期化
-db_module.init_db()
+import storage
+import services
+import metrics
+import enrichment
+import projection
+from config import JOB_EXECUTION
+from deadline import search_deadline
+from search_job import build_params
 
-# サービスインスタンス
-company_search = CompanySearch()
-keyman_finder = KeymanFinder()
+# データベース・サービスのインスタンスは初回のリクエストで作成する（OPTIONS などで重いモジュールを読み込まないため）
 
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
+            store = storage.get_store()
+            
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode('utf-8'))
@@ -37,48 +44,114 @@ class handler(BaseHTTPRequestHandler):
             keywords = data.get('keywords', '')
             num_companies = data.get('num_companies', 5)
             max_keymen = data.get('max_keymen', 5)
+            weights = data.get('weights')
+            try:
+                mode = enrichment.validate_mode(data.get('mode'))
+                fields = projection.validate_fields(data.get('fields'), projection.SEARCH_FIELDS)
+            except ValueError as e:
+                self.send_response(400)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8'))
+                return
             
             # 検索条件の文字列を作成
             conditions_text = f"業界: {industry}, 売上: {revenue}"
             if keywords:
                 conditions_text += f", キーワード: {keywords}"
             
+            # ワーカーで実行する場合は、検索パラメータを保存してすぐに返す
+            if JOB_EXECUTION == 'worker':
+                if storage.backend_name() == 'memory':
+                    # メモリ内の保存先は他のインスタンスのワーカー（api/worker.py）から見えず、実行されないまま残る
+                    self.send_response(500)
+                    self.send_header('Content-type', 'application/json')
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    error_response = {
+                        'error': 'JOB_EXECUTION=worker にはインスタンス間で共有できる保存先が必要です'
+                                 '（REDIS_URL、または STORAGE_BACKEND=sql と DATABASE_URL）'
+                    }
+                    self.wfile.write(json.dumps(error_response, ensure_ascii=False).encode('utf-8'))
+                    return
+                search_id = store.create_search(
+                    conditions_text,
+                    num_companies,
+                    params=build_params(industry, revenue, keywords, num_companies, max_keymen, weights,
+                                        submitter=self._submitter(), mode=mode, fields=fields)
+                )
+                self.send_response(202)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                response = {
+                    'search_id': search_id,
+                    'message': '検索を受け付けました'
+                }
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+                return
+            
+            company_search = services.get_company_search()
+            keyman_finder = services.get_keyman_finder()
+            
             # データベースに検索を作成
-            search_id = db_module.create_search(conditions_text, num_companies)
+            search_id = store.create_search(conditions_text, num_companies)
             
             # すぐに検索を実行（バックグラウンドタスクは使えないため）
-            try:
-                db_module.update_search_status(search_id, "processing")
+            with metrics.collect_stats() as stats:
+                try:
+                    store.update_search_status(search_id, "processing")
                 
-                results = []
-                companies = company_search.search_companies_by_criteria(industry, revenue, keywords, num_companies)
+                    results = []
+                    names = keyman_finder.name_scope(f"search_{search_id}")
+                    deadline = search_deadline()
+                    companies = company_search.search_companies_by_criteria(industry, revenue, keywords, num_companies, weights=weights,
+                                                                            deadline=deadline, detailed=mode != 'lite', fields=fields)
+                    truncated = deadline is not None and deadline.truncated
                 
-                if not companies:
-                    db_module.update_search_status(search_id, "failed", error_message="企業が見つかりませんでした")
-                else:
-                    for company in companies:
-                        keymen = keyman_finder.find_keymen(company['企業名'], max_keymen)
+                    if mode == 'lite':
+                        # 企業候補のみを返す（詳細は /api/search/{id}/enrich で選んだ企業だけ取得）
+                        results = enrichment.lite_rows(companies)
+                        stats.rows = len(results)
+                        store.update_search_status(search_id, "completed", results=results, stats=stats.to_dict())
+                    elif not companies and not truncated:
+                        store.update_search_status(search_id, "failed", error_message="企業が見つかりませんでした",
+                                                  stats=stats.to_dict())
+                    else:
+                        for company in companies:
+                            if deadline is not None and deadline.should_stop():
+                                break
+                            if not projection.needs_keymen(fields):
+                                # キーマンの項目が指定されていなければ、企業ごとに1行
+                                metrics.record_skipped('keyman_discovery')
+                                results.append(projection.project(company, fields))
+                                continue
+                            keymen = keyman_finder.find_keymen(company['企業名'], company['企業URL'], max_keymen, names=names,
+                                                               deadline=deadline)
                         
-                        for keyman in keymen:
-                            result_row = {
-                                '企業名': company['企業名'],
-                                '企業URL': company['企業URL'],
-                                '事業概要': company['事業概要'],
-                                '設立年': company.get('設立年', ''),
-                                '売上': company.get('売上', ''),
-                                '利益': company.get('利益', ''),
-                                '従業員規模': company.get('従業員規模', ''),
-                                '事業領域': company.get('事業領域', ''),
-                                '注力ポイント': company.get('注力ポイント', ''),
-                                'キーマン氏名': keyman['氏名'],
-                                '役職名': keyman['役職']
-                            }
-                            results.append(result_row)
+                            for keyman in keymen:
+                                result_row = {
+                                    '企業名': company['企業名'],
+                                    '企業URL': company['企業URL'],
+                                    '事業概要': company['事業概要'],
+                                    '設立年': company.get('設立年', ''),
+                                    '売上': company.get('売上', ''),
+                                    '利益': company.get('利益', ''),
+                                    '従業員規模': company.get('従業員規模', ''),
+                                    '事業領域': company.get('事業領域', ''),
+                                    '注力ポイント': company.get('注力ポイント', ''),
+                                    'キーマン氏名': keyman['氏名'],
+                                    '役職名': keyman['役職']
+                                }
+                                results.append(projection.project(result_row, fields))
                     
-                    db_module.update_search_status(search_id, "completed", results=results)
+                        stats.rows = len(results)
+                        stats.truncated = deadline is not None and deadline.truncated
+                        store.update_search_status(search_id, "completed", results=results, stats=stats.to_dict())
             
-            except Exception as e:
-                db_module.update_search_status(search_id, "failed", error_message=str(e))
+                except Exception as e:
+                    store.update_search_status(search_id, "failed", error_message=str(e), stats=stats.to_dict())
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
@@ -99,6 +172,14 @@ class handler(BaseHTTPRequestHandler):
             }
             self.wfile.write(json.dumps(error_response).encode())
     
+    def _submitter(self):
+        # 公平に扱う単位（APIキー、なければクライアントのアドレス。app.py と同じ形式）
+        api_key = self.headers.get('X-API-Key')
+        if api_key:
+            return f"key:{api_key}"
+        forwarded = self.headers.get('X-Forwarded-For', '')
+        return f"ip:{forwarded.split(',')[0].strip() or self.client_address[0]}"
+    
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
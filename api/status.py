@@ -11,13 +11,12 @@ from urllib.parse import parse_qs, urlparse
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-# 環境変数を設定
-os.environ['USE_MEMORY_DB'] = 'true'
+# 環境変数を設定（REDIS_URL を設定するとインスタンス間で検索状態を共有できる）
+os.environ.setdefault('USE_MEMORY_DB', 'true')
 
-import database_memory as db_module
+import storage
 
-# データベース初期化
-db_module.init_db()
+# データベースは初回のリクエストで初期化する（このハンドラーは検索を行わないため、storage 以外は読み込まない）
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
@@ -36,7 +35,7 @@ class handler(BaseHTTPRequestHandler):
                 self.wfile.write(json.dumps(error_response).encode())
                 return
             
-            search = db_module.get_search(search_id)
+            search = storage.get_store().get_search(search_id)
             
             if not search:
                 self.send_response(404)
@@ -0,0 +1,68 @@
+"""
+検索ワーカーAPI（JOB_EXECUTION=worker 用）
+
+api/search.py が保存した検索を1件取得し、WORKER_CHUNK_SECONDS 秒以内に終わる分だけ実行する。
+終わらなかった分は途中経過を保存し、次の呼び出しで続きから実行する。
+検索が終わるまで、フロントエンドのポーリングや Vercel Cron などから繰り返し呼び出す
+
+保存先はインスタンス間で共有できるもの（REDIS_URL、または STORAGE_BACKEND=sql と DATABASE_URL）を使う
+（USE_MEMORY_DB の既定が true のため、DATABASE_URL だけではメモリ内の保存先になる）
+"""
+from http.server import BaseHTTPRequestHandler
+import json
+import sys
+import os
+import uuid
+
+# プロジェクトルートをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# 環境変数を設定（REDIS_URL を設定するとインスタンス間で検索状態を共有できる）
+os.environ.setdefault('USE_MEMORY_DB', 'true')
+
+import storage
+import services
+from search_job import run_chunk
+
+# リースの所有者（インスタンスごと）
+WORKER_ID = f"api-worker:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class handler(BaseHTTPRequestHandler):
+    def _run(self):
+        try:
+            result = run_chunk(
+                storage.get_store(),
+                services.get_company_search(),
+                services.get_keyman_finder(),
+                WORKER_ID
+            )
+            
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            response = result if result is not None else {'search_id': None, 'message': '実行待ちの検索はありません'}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+            
+        except Exception as e:
+            self.send_response(500)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            error_response = {'error': str(e)}
+            self.wfile.write(json.dumps(error_response).encode())
+    
+    def do_POST(self):
+        self._run()
+    
+    def do_GET(self):
+        # Vercel Cron は GET で呼び出す
+        self._run()
+    
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
@@ -3,23 +3,27 @@ FastAPI Webアプリケーション
 AI営業アポイント自動化BOT - Webサービス版
 """
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, FileResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional
-import uvicorn
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+import hmac
 import os
 
-from company_search import CompanySearch
-from keyman_finder import KeymanFinder
-
-# 環境に応じてデータベースを切り替え
-if os.getenv('USE_MEMORY_DB', 'false').lower() == 'true':
-    import database_memory as db_module
-else:
-    import database as db_module
+import metrics
+import profiling
+import memory_tracking
+import storage
+import services
+import enrichment
+import projection
+import lookup_cache
+from search_job import SearchJob, BatchJob, build_params, create_job, job_cost
+from scheduler import classify, get_scheduler
+from admission import AdmissionController
+from config import (ADMIN_TOKEN, JOB_EXECUTION, ADMISSION_WORKERS, SCHEDULER_WORKERS, WORKER_CONCURRENCY,
+                    BATCH_MAX_SEARCHES)
 
 # FastAPIアプリケーション
 app = FastAPI(
@@ -28,17 +32,44 @@ app = FastAPI(
     version="2.0.0"
 )
 
-# テンプレート設定
+# テンプレート設定（Jinja2 はトップページの初回表示時に読み込む）
 import pathlib
 TEMPLATE_DIR = pathlib.Path(__file__).parent / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATE_DIR))
+_templates = None
+
+
+def get_templates():
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory=str(TEMPLATE_DIR))
+    return _templates
+
+
+# データベース・サービスクラスのインスタンスは初回のリクエストで作成する（起動を速くするため）
+#   保存先: storage.get_store()（環境変数 STORAGE_BACKEND / REDIS_URL / USE_MEMORY_DB で切り替え）
+#   企業検索・キーマン特定: services.get_company_search() / services.get_keyman_finder()
+
+
+def _candidate_pools():
+    company_search = services.peek('company_search')
+    return company_search._candidate_pools if company_search is not None else {}
+
+
+def _batch_lookups():
+    return lookup_cache._batches
+
+
+def _memory_store_searches():
+    import database_memory
+    return database_memory._searches
 
-# データベース初期化
-db_module.init_db()
 
-# サービスクラスのインスタンス
-company_search = CompanySearch()
-keyman_finder = KeymanFinder()
+# メモリ使用量を監視するサブシステム
+memory_tracking.register_subsystem('candidate_pools', _candidate_pools, 'キャッシュ済みの候補企業プール（業界）の数')
+memory_tracking.register_subsystem('batch_lookups', _batch_lookups, '取得結果を共有しているバッチ検索の数')
+if storage.backend_name() == 'memory':
+    memory_tracking.register_subsystem('memory_store_searches', _memory_store_searches, 'メモリ内データストアの検索数')
 
 
 # リクエスト/レスポンスモデル
@@ -48,6 +79,21 @@ class SearchRequest(BaseModel):
     keywords: Optional[str] = ""
     num_companies: int = 5
     max_keymen: int = 5
+    weights: Optional[Dict[str, float]] = None  # スコアリングの重み（lead_scoring.DEFAULT_WEIGHTS を上書き）
+    profile: Optional[bool] = None  # プロファイルを取る（省略時は環境変数 PROFILE_SEARCHES に従う）
+    priority: Optional[str] = None  # 優先度クラス（interactive / normal / batch。省略時は検索の大きさから判定）
+    mode: Optional[str] = 'full'  # full: すべての詳細を取得 / lite: 企業候補のみ（詳細は /api/search/{id}/enrich で取得）
+    fields: Optional[List[str]] = None  # 結果に必要な項目（省略時はすべて。指定されていない項目の取得・抽出は省略）
+
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest]  # 検索条件（1件ごとに検索IDを発行。各条件の priority は使わない）
+    priority: Optional[str] = None  # バッチ全体の優先度クラス（省略時はバッチ全体のコストから判定）
+
+
+class EnrichRequest(BaseModel):
+    companies: List[str]  # 詳細を取得する企業名（lite モードの検索結果の「企業名」）
+    max_keymen: int = 5
 
 
 class SearchResponse(BaseModel):
@@ -55,6 +101,12 @@ class SearchResponse(BaseModel):
     message: str
 
 
+class BatchSearchResponse(BaseModel):
+    batch_id: int
+    search_ids: List[int]  # searches と同じ順
+    message: str
+
+
 class SearchStatus(BaseModel):
     search_id: int
     status: str
@@ -62,68 +114,138 @@ class SearchStatus(BaseModel):
     results: Optional[List[Dict]] = None
     error_message: Optional[str] = None
     created_at: Optional[datetime] = None
+    stats: Optional[Dict] = None  # 処理時間・HTTPリクエスト数・通信量などの内訳
+    truncated: bool = False  # 締め切り（SEARCH_TIMEOUT）を過ぎて途中の結果で完了した
+
+
+# 検索ジョブのスケジューラー（送信者ごとに企業単位で交互に実行）
+scheduler = get_scheduler()
 
 
-# バックグラウンドタスク
-def perform_search(search_id: int, industry: str, revenue: str, keywords: str, num_companies: int, max_keymen: int = 5):
+# 検索の受付制御（実行スレッド数は inline ならスケジューラー、worker ならワーカーの設定から）
+admission_controller = AdmissionController(
+    ADMISSION_WORKERS or (WORKER_CONCURRENCY if JOB_EXECUTION == 'worker' else SCHEDULER_WORKERS))
+
+
+def _submitter(request: Request, api_key: Optional[str]) -> str:
+    """
+    公平に扱う単位（APIキー、なければクライアントのアドレス）
+    """
+    if api_key:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _queued_cost(submitter: str):
+    """
+    実行待ち・実行中の検索のコスト（全体・送信者ごと）
+    """
+    if JOB_EXECUTION == 'worker':
+        # 実行中の検索も全体のコストで数える（ワーカーの進み具合は保存されていないため）
+        queued = submitter_cost = 0
+        for params in storage.get_store().get_active_params():
+            cost = job_cost(params.get('num_companies', 0), params.get('max_keymen', 5), params.get('mode', 'full'),
+                            params.get('fields'))
+            queued += cost
+            if params.get('submitter') == submitter:
+                submitter_cost += cost
+        return queued, submitter_cost
+    return scheduler.outstanding_cost(), scheduler.outstanding_cost(submitter)
+
+
+def _admit(cost: int, submitter: str, priority: str):
     """
-    バックグラウンドで検索を実行
+    混雑している場合は受け付けない（Retry-After 秒後に再試行してもらう）
     """
+    queued_cost, submitter_cost = _current_load(submitter)
+    _raise_if_rejected(admission_controller.decide(cost, queued_cost, submitter_cost, priority))
+
+
+def _admit_batch(costs: List[int], submitter: str, priority: str):
+    """
+    バッチ検索を1つの単位として受け付けるかどうか（受け付けなければバッチ全体を受け付けない）
+    """
+    queued_cost, submitter_cost = _current_load(submitter)
+    _raise_if_rejected(admission_controller.decide_batch(costs, queued_cost, submitter_cost, priority))
+
+
+def _current_load(submitter: str) -> Tuple[int, int]:
     try:
-        print(f"\n[Search {search_id}] 検索開始")
-        # ステータスを処理中に更新
-        db_module.update_search_status(search_id, "processing")
-        
-        results = []
-        
-        # 企業検索
-        print(f"[Search {search_id}] 企業検索中...")
-        companies = company_search.search_companies_by_criteria(industry, revenue, keywords, num_companies)
-        print(f"[Search {search_id}] {len(companies)}社を取得")
-        
-        if not companies:
-            error_msg = "企業が見つかりませんでした。検索条件を変更してください。"
-            print(f"[Search {search_id}] エラー: {error_msg}")
-            db_module.update_search_status(search_id, "failed", error_message=error_msg)
-            return
-        
-        # 各企業について役員・責任者を検索
-        for i, company in enumerate(companies, 1):
-            print(f"[Search {search_id}] 企業 {i}/{len(companies)}: {company['企業名']}")
-            # 役員・責任者を特定
-            keymen = keyman_finder.find_keymen(
-                company['企業名'],
-                company['企業URL'],
-                max_keymen
-            )
-            
-            # 結果を統合
-            for keyman in keymen:
-                result_row = {
-                    '企業名': company['企業名'],
-                    '事業概要': company['事業概要'],
-                    '設立年': company.get('設立年', ''),
-                    '売上': company.get('売上', ''),
-                    '利益': company.get('利益', ''),
-                    '従業員規模': company.get('従業員規模', ''),
-                    '事業領域': company.get('事業領域', ''),
-                    '注力ポイント': company.get('注力ポイント', ''),
-                    'キーマン氏名': keyman['氏名'],
-                    '役職名': keyman['役職']
-                }
-                
-                results.append(result_row)
-        
-        # 結果を保存して完了
-        print(f"[Search {search_id}] 完了: {len(results)}件の役員・責任者情報を取得")
-        db_module.update_search_status(search_id, "completed", results=results)
-    
+        return _queued_cost(submitter)
     except Exception as e:
-        # エラーが発生した場合
-        import traceback
-        error_message = f"{str(e)}\n{traceback.format_exc()}"
-        print(f"[Search {search_id}] エラー発生:\n{error_message}")
-        db_module.update_search_status(search_id, "failed", error_message=str(e))
+        # 負荷を取得できない場合は受け付ける
+        print(f"受付制御の負荷の取得に失敗しました: {e}")
+        return 0, 0
+
+
+def _raise_if_rejected(decision):
+    if not decision.accepted:
+        headers = {'Retry-After': str(decision.retry_after)} if decision.retry_after else None
+        raise HTTPException(status_code=decision.status_code, detail=decision.message, headers=headers)
+
+
+def _validate_search(search_request: SearchRequest):
+    """
+    スコアリングの重み・検索モード・項目を検証して (mode, fields, cost) を返す
+
+    Raises:
+        ValueError: 不正な検索条件
+    """
+    from lead_scoring import resolve_weights
+    resolve_weights(search_request.weights)
+    mode = enrichment.validate_mode(search_request.mode)
+    fields = projection.validate_fields(search_request.fields, projection.SEARCH_FIELDS)
+    return mode, fields, job_cost(search_request.num_companies, search_request.max_keymen, mode, fields)
+
+
+def _conditions_text(search_request: SearchRequest) -> str:
+    """
+    検索条件の文字列（検索履歴の表示用）
+    """
+    conditions_text = f"業界: {search_request.industry}, 売上: {search_request.revenue}"
+    if search_request.keywords:
+        conditions_text += f", キーワード: {search_request.keywords}"
+    return conditions_text
+
+
+def _search_params(search_request: SearchRequest, mode: str, fields, submitter: str, priority: str) -> Dict:
+    """
+    ワーカーで実行するために保存する検索パラメータ
+    """
+    return build_params(
+        search_request.industry,
+        search_request.revenue,
+        search_request.keywords,
+        search_request.num_companies,
+        search_request.max_keymen,
+        search_request.weights,
+        search_request.profile,
+        submitter=submitter,
+        priority=priority,
+        mode=mode,
+        fields=fields
+    )
+
+
+def _search_job(store, search_id: int, search_request: SearchRequest, mode: str, fields) -> SearchJob:
+    """
+    スケジューラーで実行する検索ジョブ
+    """
+    return SearchJob(
+        store,
+        services.get_company_search(),
+        services.get_keyman_finder(),
+        search_id,
+        search_request.industry,
+        search_request.revenue,
+        search_request.keywords,
+        search_request.num_companies,
+        search_request.max_keymen,
+        search_request.weights,
+        search_request.profile,
+        mode,
+        fields
+    )
 
 
 # APIエンドポイント
@@ -133,35 +255,49 @@ async def read_root(request: Request):
     """
     トップページ
     """
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_templates().TemplateResponse("index.html", {"request": request})
 
 
 @app.post("/api/search", response_model=SearchResponse)
-async def create_search(search_request: SearchRequest, background_tasks: BackgroundTasks):
+async def create_search(search_request: SearchRequest, request: Request, x_api_key: Optional[str] = Header(None)):
     """
     新しい検索を開始
     """
+    # スコアリングの重み・検索モード・項目・優先度を検証
+    try:
+        mode, fields, cost = _validate_search(search_request)
+        priority = classify(cost, search_request.priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    submitter = _submitter(request, x_api_key)
+    _admit(cost, submitter, priority)
+    
+    store = storage.get_store()
+    
     # 検索条件の文字列を作成
-    conditions_text = f"業界: {search_request.industry}, 売上: {search_request.revenue}"
-    if search_request.keywords:
-        conditions_text += f", キーワード: {search_request.keywords}"
+    conditions_text = _conditions_text(search_request)
+    
+    # ワーカーで実行する場合は、検索パラメータを保存してワーカーの取得を待つ
+    if JOB_EXECUTION == 'worker':
+        search_id = store.create_search(
+            conditions_text,
+            search_request.num_companies,
+            params=_search_params(search_request, mode, fields, submitter, priority)
+        )
+        return SearchResponse(
+            search_id=search_id,
+            message="検索を受け付けました。しばらくお待ちください。"
+        )
     
     # データベースに検索を作成
-    search_id = db_module.create_search(
+    search_id = store.create_search(
         conditions_text,
         search_request.num_companies
     )
     
-    # バックグラウンドタスクとして検索を実行
-    background_tasks.add_task(
-        perform_search,
-        search_id,
-        search_request.industry,
-        search_request.revenue,
-        search_request.keywords,
-        search_request.num_companies,
-        search_request.max_keymen
-    )
+    # スケジューラーで他の検索と交互に実行
+    job = _search_job(store, search_id, search_request, mode, fields)
+    scheduler.submit(job, submitter, priority)
     
     return SearchResponse(
         search_id=search_id,
@@ -169,12 +305,198 @@ async def create_search(search_request: SearchRequest, background_tasks: Backgro
     )
 
 
+@app.post("/api/search/batch", response_model=BatchSearchResponse)
+async def create_batch_search(batch_request: BatchSearchRequest, request: Request,
+                              x_api_key: Optional[str] = Header(None)):
+    """
+    複数の検索条件をまとめて開始（バッチ全体を1つのジョブとして実行し、企業ページ・キーマン・SNSの取得を
+    検索条件の間で共有する）。検索条件ごとの結果は /api/search/{search_id}、全体の状況は
+    /api/search/batch/{batch_id} で取得する
+    """
+    if not batch_request.searches:
+        raise HTTPException(status_code=400, detail="検索条件を指定してください")
+    if len(batch_request.searches) > BATCH_MAX_SEARCHES:
+        raise HTTPException(status_code=413,
+                            detail=f"1回に受け付ける検索条件は{BATCH_MAX_SEARCHES}件までです（{len(batch_request.searches)}件）")
+    
+    validated = []
+    try:
+        for i, search_request in enumerate(batch_request.searches, 1):
+            try:
+                validated.append(_validate_search(search_request))
+            except ValueError as e:
+                raise ValueError(f"検索条件 {i}: {e}")
+        costs = [cost for _, _, cost in validated]
+        priority = classify(sum(costs), batch_request.priority)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    submitter = _submitter(request, x_api_key)
+    _admit_batch(costs, submitter, priority)
+    
+    store = storage.get_store()
+    worker = JOB_EXECUTION == 'worker'
+    batch_id, search_ids = store.create_batch([
+        {
+            'conditions': _conditions_text(search_request),
+            'num_companies': search_request.num_companies,
+            # ワーカーで実行する場合は検索条件ごとに取得される（同じワーカーが取得した検索の間で共有する）
+            'params': _search_params(search_request, mode, fields, submitter, priority) if worker else None
+        }
+        for search_request, (mode, fields, _) in zip(batch_request.searches, validated)
+    ])
+    
+    if not worker:
+        jobs = [
+            _search_job(store, search_id, search_request, mode, fields)
+            for search_id, search_request, (mode, fields, _) in zip(search_ids, batch_request.searches, validated)
+        ]
+        scheduler.submit(BatchJob(batch_id, jobs), submitter, priority)
+    
+    return BatchSearchResponse(
+        batch_id=batch_id,
+        search_ids=search_ids,
+        message=f"{len(search_ids)}件の検索を受け付けました。しばらくお待ちください。"
+    )
+
+
+@app.get("/api/search/batch/{batch_id}")
+async def get_batch_status(batch_id: int):
+    """
+    バッチ検索の状況（検索条件ごとのステータス・件数と、全体の進み具合・通信量）
+    """
+    store = storage.get_store()
+    batch = store.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="バッチが見つかりません")
+    
+    searches = []
+    counts: Dict[str, int] = {}
+    totals = {'http_requests': 0, 'cache_hits': 0, 'cache_misses': 0, 'rows': 0}
+    for search_id in batch['search_ids']:
+        search = store.get_search(search_id)
+        if search is None:
+            # 保存期間を過ぎて削除された検索
+            searches.append({"search_id": search_id, "status": "expired"})
+            counts['expired'] = counts.get('expired', 0) + 1
+            continue
+        
+        stats = search.get('stats') or {}
+        searches.append({
+            "search_id": search_id,
+            "conditions": search['conditions'],
+            "status": search['status'],
+            "result_count": len(search['results']) if search['results'] else 0,
+            "truncated": bool(stats.get('truncated')),
+            "error_message": search['error_message']
+        })
+        counts[search['status']] = counts.get(search['status'], 0) + 1
+        for key in totals:
+            totals[key] += stats.get(key, 0)
+    
+    finished = sum(counts.get(status, 0) for status in ('completed', 'failed', 'expired'))
+    if finished == len(searches):
+        status = 'completed'
+    elif counts.get('pending', 0) == len(searches):
+        status = 'pending'
+    else:
+        status = 'processing'
+    
+    # 同じプロセスで実行中・実行済みのバッチは、共有した取得結果の数も返す
+    lookups = lookup_cache.peek_batch(batch_id)
+    return {
+        "batch_id": batch['id'],
+        "status": status,
+        "created_at": batch['created_at'],
+        "progress": {"finished": finished, "total": len(searches)},
+        "counts": counts,
+        "stats": totals,
+        "shared_lookups": lookups.stats() if lookups is not None else None,
+        "searches": searches
+    }
+
+
+@app.post("/api/search/{search_id}/enrich")
+def enrich_search_results(search_id: int, enrich_request: EnrichRequest, request: Request,
+                          x_api_key: Optional[str] = Header(None)):
+    """
+    lite モードの検索で選んだ企業の詳細情報・キーマン・SNSを取得し、検索の結果に書き戻す
+    （取得済みの企業は取得し直さない）
+    """
+    if not enrich_request.companies:
+        raise HTTPException(status_code=400, detail="詳細を取得する企業を指定してください")
+    cost = job_cost(len(enrich_request.companies), enrich_request.max_keymen)
+    _admit(cost, _submitter(request, x_api_key), classify(cost))
+    
+    try:
+        return enrichment.enrich_search(
+            storage.get_store(),
+            services.get_company_search(),
+            services.get_keyman_finder(),
+            services.get_sns_finder(),
+            search_id,
+            enrich_request.companies,
+            enrich_request.max_keymen
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/api/search/{search_id}/retry", response_model=SearchResponse)
+async def retry_search(search_id: int, request: Request, force: bool = False,
+                       x_api_key: Optional[str] = Header(None)):
+    """
+    失敗した検索を保存された途中経過から再実行（企業検索・キーマン特定まで終わった企業は処理し直さない）。
+    force=true の場合は、実行していたプロセスが停止して「処理中」のまま残った検索も再実行する
+    """
+    store = storage.get_store()
+    search = store.get_search(search_id)
+    if not search:
+        raise HTTPException(status_code=404, detail="検索が見つかりません")
+    
+    params = search.get('params') or {}
+    cost = job_cost(search['num_companies'] or 0, params.get('max_keymen', 5), params.get('mode', 'full'),
+                    params.get('fields'))
+    submitter = _submitter(request, x_api_key)
+    priority = classify(cost, params.get('priority'))
+    _admit(cost, submitter, priority)
+    
+    requeued = store.requeue_search(search_id, force)
+    if requeued is None:
+        raise HTTPException(status_code=409,
+                            detail=f"再実行できるのは失敗した検索のみです（現在のステータス: {search['status']}）")
+    checkpoint = requeued['checkpoint'] or {}
+    
+    # ワーカーで実行する検索は、実行待ちに戻すとワーカーが途中経過から続ける
+    if JOB_EXECUTION == 'worker' and requeued['params'] is not None:
+        return SearchResponse(search_id=search_id, message="再実行を受け付けました。しばらくお待ちください。")
+    
+    params = requeued['params'] or checkpoint.get('params')
+    if params is None:
+        # 途中経過を保存する前に作成された検索
+        store.update_search_status(search_id, "failed", error_message="検索パラメータが保存されていないため再実行できません")
+        raise HTTPException(status_code=409, detail="検索パラメータが保存されていないため再実行できません")
+    
+    job = create_job(store, services.get_company_search(), services.get_keyman_finder(), search_id, params)
+    if checkpoint:
+        job.restore(checkpoint)
+    # 途中経過を保存できるように処理中にしてから、スケジューラーで続きを実行
+    store.update_search_status(search_id, "processing")
+    scheduler.submit(job, submitter, priority)
+    
+    return SearchResponse(
+        search_id=search_id,
+        message=f"検索を再開しました（処理済み: {job.processed}社）。しばらくお待ちください。"
+    )
+
+
 @app.get("/api/search/{search_id}", response_model=SearchStatus)
 async def get_search_status(search_id: int):
     """
     検索のステータスと結果を取得
     """
-    search = db_module.get_search(search_id)
+    search = storage.get_store().get_search(search_id)
     
     if not search:
         raise HTTPException(status_code=404, detail="検索が見つかりません")
@@ -184,16 +506,27 @@ async def get_search_status(search_id: int):
         status=search['status'],
         results=search['results'] if search['status'] == "completed" else None,
         error_message=search['error_message'],
-        created_at=search['created_at']
+        created_at=search['created_at'],
+        stats=search.get('stats'),
+        truncated=bool((search.get('stats') or {}).get('truncated'))
     )
 
 
+def _stats_totals(stats: Optional[Dict]) -> Optional[Dict]:
+    """
+    一覧表示用に内訳から合計値のみを取り出す（段階ごとの時間は省略）
+    """
+    if not stats:
+        return None
+    return {key: value for key, value in stats.items() if key != 'stages'}
+
+
 @app.get("/api/history")
 async def get_search_history(limit: int = 20):
     """
     検索履歴を取得
     """
-    searches = db_module.get_all_searches(limit)
+    searches = storage.get_store().get_all_searches(limit)
     
     history = []
     for search in searches:
@@ -203,7 +536,8 @@ async def get_search_history(limit: int = 20):
             "num_companies": search['num_companies'],
             "status": search['status'],
             "created_at": search['created_at'],
-            "result_count": len(search['results']) if search['results'] else 0
+            "result_count": len(search['results']) if search['results'] else 0,
+            "stats": _stats_totals(search.get('stats'))
         })
     
     return {"history": history}
@@ -215,7 +549,7 @@ async def export_results(search_id: int, format: str):
     結果を指定されたフォーマットでエクスポート
     format: csv, json, tsv
     """
-    search = db_module.get_search(search_id)
+    search = storage.get_store().get_search(search_id)
     
     if not search or not search['results']:
         raise HTTPException(status_code=404, detail="結果が見つかりません")
@@ -253,6 +587,70 @@ async def export_results(search_id: int, format: str):
         raise HTTPException(status_code=400, detail="サポートされていないフォーマットです")
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus 形式のメトリクス
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _require_admin(token: Optional[str]):
+    """
+    管理用APIのトークンを確認
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="管理用APIは無効です（ADMIN_TOKEN を設定してください）")
+    # 比較時間からトークンを推測されないよう定数時間で比較（非ASCIIの値でも例外にしないよう bytes で比較）
+    if not hmac.compare_digest((token or '').encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=401, detail="管理用トークンが正しくありません")
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles(search_id: Optional[int] = None, x_admin_token: Optional[str] = Header(None)):
+    """
+    保存済みのプロファイル一覧（search_id で絞り込み可能）
+    """
+    _require_admin(x_admin_token)
+    tag = f"search_{search_id}" if search_id is not None else None
+    return {"profiles": profiling.list_profiles(tag)}
+
+
+@app.get("/api/admin/profiles/{name}")
+async def download_profile(name: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    プロファイルをダウンロード（.prof: pstats 形式 / .txt: 要約）
+    """
+    _require_admin(x_admin_token)
+    path = profiling.profile_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    media_type = "text/plain; charset=utf-8" if name.endswith('.txt') else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+
+@app.get("/api/admin/memory")
+async def get_memory_report(x_admin_token: Optional[str] = Header(None)):
+    """
+    サブシステムごとのメモリ使用量と、ジョブ前後の tracemalloc 差分
+    """
+    _require_admin(x_admin_token)
+    return memory_tracking.report()
+
+
+@app.post("/api/admin/memory/tracing")
+async def set_memory_tracing(enabled: bool = True, x_admin_token: Optional[str] = Header(None)):
+    """
+    tracemalloc の有効・無効を切り替え（再起動せずにジョブの差分を取り始める）
+    """
+    _require_admin(x_admin_token)
+    if enabled:
+        memory_tracking.enable_tracing()
+    else:
+        memory_tracking.disable_tracing()
+    return memory_tracking.tracing_report()
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -272,5 +670,6 @@ if __name__ == "__main__":
     print("\n終了するには Ctrl+C を押してください")
     print("=" * 70 + "\n")
     
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
 
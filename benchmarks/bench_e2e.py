@@ -0,0 +1,199 @@
+"""
+エンドツーエンドのベンチマーク（外部通信なし）
+
+ローカルのスタブWebサーバーに全ての検索モジュールを向け、
+search_job.SearchJob / main.AISalesBot.run のスループットを同時実行数ごとに計測する
+
+使い方:
+    python -m benchmarks.bench_e2e --target search --companies 10 --concurrency 1,2,4
+    python -m benchmarks.bench_e2e --target bot --latency 0.05 --error-rate 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# ベンチマーク中はリクエスト間隔の待機・途中経過の保存を行わない（各モジュールの import より前に設定）
+os.environ.setdefault('REQUEST_DELAY', '0')
+os.environ.setdefault('USE_MEMORY_DB', 'true')
+os.environ.setdefault('RUN_CHECKPOINT_DIR', '')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client  # noqa: E402
+from benchmarks.stub_web import StubWeb  # noqa: E402
+
+
+class CompanyTimer:
+    """
+    企業ごとの処理時間（詳細取得・キーマン特定・SNS検索）を合計する
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[tuple, float] = {}
+
+    def wrap(self, obj, method_name: str, key_func):
+        original = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                key = (threading.get_ident(), key_func(args))
+                with self._lock:
+                    self._durations[key] = self._durations.get(key, 0.0) + elapsed
+
+        setattr(obj, method_name, timed)
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+
+    def durations(self) -> List[float]:
+        with self._lock:
+            return sorted(self._durations.values())
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    index = min(int(round(q * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def _instrument(company_search, keyman_finder, sns_finder, timer: CompanyTimer):
+    timer.wrap(company_search, '_extract_company_info', lambda args: args[0].get('title', '').split('|')[0].strip())
+    timer.wrap(company_search, 'enrich_company', lambda args: args[0]['企業名'])
+    timer.wrap(keyman_finder, 'find_keymen', lambda args: args[0])
+    if sns_finder is not None:
+        timer.wrap(sns_finder, 'find_sns_accounts', lambda args: args[1])
+
+
+def _run_search_jobs(concurrency: int, companies: int, keymen: int) -> int:
+    import services
+    import storage
+    from search_job import SearchJob
+
+    store = storage.get_store()
+
+    def job(_):
+        search_id = store.create_search('benchmark', companies)
+        SearchJob(store, services.get_company_search(), services.get_keyman_finder(), search_id,
+                  'it_saas', '10to30', '', companies, keymen).run()
+        search = store.get_search(search_id)
+        return len({row['企業名'] for row in (search['results'] or [])})
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return sum(pool.map(job, range(concurrency)))
+
+
+def _run_bot_jobs(bots: list, companies: int, keymen: int) -> int:
+    def job(bot):
+        results = bot.run('SaaS スタートアップ 東京', companies, keymen, interactive=False)
+        return len({row['企業名'] for row in results})
+
+    with ThreadPoolExecutor(max_workers=len(bots)) as pool:
+        return sum(pool.map(job, bots))
+
+
+def run_benchmark(target: str, concurrency_levels: List[int], companies: int, keymen: int,
+                  track_memory: bool = True) -> List[Dict]:
+    """
+    同時実行数ごとにベンチマークを実行して結果を返す
+    """
+    timer = CompanyTimer()
+    rows = []
+
+    if target == 'search':
+        import services
+        _instrument(services.get_company_search(), services.get_keyman_finder(), None, timer)
+    else:
+        from main import AISalesBot
+
+    for concurrency in concurrency_levels:
+        if target == 'bot':
+            bots = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(concurrency):
+                    bot = AISalesBot()
+                    _instrument(bot.company_search, bot.keyman_finder, bot.sns_finder, timer)
+                    bots.append(bot)
+
+        timer.reset()
+        if track_memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if target == 'search':
+                done = _run_search_jobs(concurrency, companies, keymen)
+            else:
+                done = _run_bot_jobs(bots, companies, keymen)
+        elapsed = time.perf_counter() - start
+
+        peak = 0
+        if track_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        durations = timer.durations()
+        rows.append({
+            'concurrency': concurrency,
+            'companies': done,
+            'seconds': elapsed,
+            'companies_per_sec': done / elapsed if elapsed else 0.0,
+            'p50': _percentile(durations, 0.50),
+            'p99': _percentile(durations, 0.99),
+            'peak_mb': peak / (1024 * 1024)
+        })
+
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="スタブWebを使ったエンドツーエンドのベンチマーク")
+    parser.add_argument('--target', choices=['search', 'bot'], default='search',
+                        help="search: app.perform_search / bot: main.AISalesBot.run")
+    parser.add_argument('--companies', type=int, default=10, help="1ジョブあたりの企業数")
+    parser.add_argument('--keymen', type=int, default=5, help="1社あたりのキーマン数")
+    parser.add_argument('--concurrency', default='1,2,4', help="同時実行ジョブ数（カンマ区切り）")
+    parser.add_argument('--latency', type=float, default=0.01, help="スタブの応答遅延（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="スタブが500を返す確率")
+    parser.add_argument('--page-size', type=int, default=20, help="企業ページの本文段落数")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="tracemalloc によるピークメモリ計測を行わない")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    with StubWeb(latency=args.latency, error_rate=args.error_rate, seed=args.seed, page_size=args.page_size) as stub:
+        http_client.set_url_rewriter(stub.rewrite_url)
+        try:
+            rows = run_benchmark(args.target, levels, args.companies, args.keymen, not args.no_memory)
+        finally:
+            http_client.set_url_rewriter(None)
+
+        print(f"target={args.target} latency={args.latency}s error_rate={args.error_rate} "
+              f"requests={stub.request_count} errors={stub.error_count} "
+              f"bytes={stub.bytes_sent}")
+
+    print(f"{'並列数':>6} {'企業数':>6} {'秒':>8} {'企業/秒':>8} {'p50(秒)':>8} {'p99(秒)':>8} {'ピークMB':>9}")
+    for row in rows:
+        print(f"{row['concurrency']:>8} {row['companies']:>8} {row['seconds']:>9.2f} "
+              f"{row['companies_per_sec']:>10.2f} {row['p50']:>9.3f} {row['p99']:>9.3f} {row['peak_mb']:>10.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+起動時間（import）のベンチマーク
+
+エントリーポイント（app.py・Vercel の api/ ハンドラー・worker.py）を
+python -X importtime で別プロセスとして import し、累積の import 時間を計測する。
+benchmarks/import_time_budgets.json の予算を超えた場合や、起動時に読み込まないはずの
+モジュール（requests・BeautifulSoup・numpy など）が読み込まれた場合は終了コード1で失敗する
+
+使い方:
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --repeat 9 --output import_time.json
+    python -m benchmarks.bench_import_time --filter api.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+BUDGETS_PATH = os.path.join(BENCH_DIR, 'import_time_budgets.json')
+
+# 計測するエントリーポイント（モジュール名）
+ENTRY_POINTS = ['app', 'api.index', 'api.search', 'api.status', 'api.worker', 'worker']
+
+# 表示する重いモジュールの数
+TOP_N = 5
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    -X importtime の出力を (モジュール名, 深さ, 自身の時間(µs), 累積時間(µs)) のリストに変換
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            # 見出し行
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), depth, int(parts[0]), int(parts[1])))
+    return rows
+
+
+def measure_once(module: str, env: Dict[str, str]) -> Dict:
+    """
+    新しいプロセスでモジュールを1回 import して計測
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} の import に失敗しました:\n{result.stderr[-2000:]}")
+
+    rows = parse_importtime(result.stderr)
+    index = max((i for i, row in enumerate(rows) if row[0] == module and row[1] == 0), default=None)
+    if index is None:
+        raise RuntimeError(f"{module} の import 時間が出力されませんでした（すでに読み込まれている可能性があります）")
+
+    # エントリーポイントが読み込んだモジュール（出力は子 → 親の順に並ぶ）
+    start = index
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    children = [row for row in rows[start:index] if row[1] == 1]
+    return {
+        'total_ms': rows[index][3] / 1000,
+        'modules': {row[0] for row in rows},
+        'heaviest': sorted(((row[0], row[3] / 1000) for row in children),
+                           key=lambda item: item[1], reverse=True)[:TOP_N]
+    }
+
+
+def measure(module: str, repeat: int, env: Dict[str, str]) -> Dict:
+    """
+    1回目（.pyc の作成を含む）を除いて repeat 回計測し、中央値を返す
+    """
+    measure_once(module, env)
+    runs = [measure_once(module, env) for _ in range(repeat)]
+    median_run = sorted(runs, key=lambda run: run['total_ms'])[len(runs) // 2]
+    return {
+        'median_ms': statistics.median(run['total_ms'] for run in runs),
+        'min_ms': min(run['total_ms'] for run in runs),
+        'max_ms': max(run['total_ms'] for run in runs),
+        'modules': sorted(set().union(*(run['modules'] for run in runs))),
+        'heaviest': median_run['heaviest']
+    }
+
+
+def check(report: Dict[str, Dict], budgets: Dict[str, Dict]) -> List[str]:
+    """
+    予算・読み込み禁止のモジュールと比較して失敗理由のリストを返す
+    """
+    failures = []
+    for module, result in report.items():
+        budget = budgets.get(module, {})
+        max_ms = budget.get('max_ms')
+        if max_ms is not None and result['median_ms'] > max_ms:
+            failures.append(f"{module}: {result['median_ms']:.0f}ms > 予算 {max_ms:.0f}ms")
+
+        loaded = set(result['modules'])
+        for forbidden in budget.get('forbidden', []):
+            if forbidden in loaded:
+                failures.append(f"{module}: 起動時に {forbidden} が読み込まれています")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="エントリーポイントの起動時間（import）のベンチマーク")
+    parser.add_argument('--repeat', type=int, default=5, help="エントリーポイントごとの計測回数（中央値を使う）")
+    parser.add_argument('--budgets', default=BUDGETS_PATH, help="予算（ミリ秒）と読み込み禁止のモジュールのファイル")
+    parser.add_argument('--output', help="計測結果を書き出すJSONファイル")
+    parser.add_argument('--filter', default='', help="モジュール名に含まれる文字列で絞り込み")
+    args = parser.parse_args(argv)
+
+    # Vercel と同じくメモリ内データストアで計測（外部の DB・Redis に接続しない）
+    env = dict(os.environ)
+    env.setdefault('USE_MEMORY_DB', 'true')
+    env.pop('REDIS_URL', None)
+    env['PYTHONPATH'] = PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+
+    budgets = {}
+    if args.budgets and os.path.exists(args.budgets):
+        with open(args.budgets, encoding='utf-8') as f:
+            budgets = json.load(f)
+
+    report = {}
+    print(f"{'エントリーポイント':<11} {'中央値(ms)':>8} {'最小':>6} {'最大':>6} {'予算':>6}  重いモジュール")
+    for module in ENTRY_POINTS:
+        if args.filter not in module:
+            continue
+        result = measure(module, max(args.repeat, 1), env)
+        report[module] = result
+        max_ms = budgets.get(module, {}).get('max_ms')
+        heaviest = ', '.join(f"{name} {ms:.0f}ms" for name, ms in result['heaviest'])
+        print(f"{module:<20} {result['median_ms']:>10.0f} {result['min_ms']:>8.0f} {result['max_ms']:>8.0f} "
+              f"{max_ms if max_ms is not None else '-':>8}  {heaviest}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    failures = check(report, budgets)
+    if failures:
+        print("\n✗ 起動時間の予算を超えました:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\n✓ すべてのエントリーポイントが予算内です")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
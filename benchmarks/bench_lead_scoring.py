@@ -0,0 +1,94 @@
+"""
+リードスコアリングのベンチマーク（候補数に対する順位付けの所要時間）
+
+企業検索の候補プール（CompanySearch._get_candidate_pool）を --candidates 件までくり返した候補について、
+lead_scoring の各段階（属性の配列化 build_features・スコア計算 score・上位k件の選択 top_k）の
+所要時間（ミリ秒、--repeat 回の最小値）を計測する
+
+--max-ms を指定した場合は、最大の候補数で順位付け全体（rank）がこれを超えると終了コード1で失敗する
+
+使い方:
+    python -m benchmarks.bench_lead_scoring
+    python -m benchmarks.bench_lead_scoring --candidates 1000,100000 --top-k 100 --max-ms 200
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lead_scoring import LeadScorer, build_features  # noqa: E402
+
+
+def load_candidates(count: int) -> List[Dict]:
+    """
+    候補プールをくり返して count 件の候補を作る（キーワード一致の列は候補ごとに変える）
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        from company_search import CompanySearch
+        company_search = CompanySearch()
+        pool = company_search._get_candidate_pool('it_saas')
+    return [dict(pool[i % len(pool)]) for i in range(count)]
+
+
+def best_ms(func: Callable[[], object], repeat: int) -> float:
+    """
+    func を repeat 回実行した最小の所要時間（ミリ秒）
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def measure(candidates: List[Dict], top_k: int, repeat: int) -> Dict:
+    from company_search import BUSINESS_DOMAIN_KEYWORDS
+
+    scorer = LeadScorer()
+    revenue_range = (10, 30)
+    keyword_scores = [float(i % 7) for i in range(len(candidates))]
+    features = build_features(candidates, BUSINESS_DOMAIN_KEYWORDS, keyword_scores)
+    scores = scorer.score(features, revenue_range)
+    return {
+        'candidates': len(candidates),
+        'build_features': best_ms(lambda: build_features(candidates, BUSINESS_DOMAIN_KEYWORDS, keyword_scores), repeat),
+        'score': best_ms(lambda: scorer.score(features, revenue_range), repeat),
+        'top_k': best_ms(lambda: scorer.top_k(scores, top_k), repeat),
+        'rank': best_ms(lambda: scorer.rank(candidates, top_k, revenue_range, BUSINESS_DOMAIN_KEYWORDS,
+                                            keyword_scores), repeat)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="リードスコアリングのベンチマーク")
+    parser.add_argument('--candidates', default='100,10000,100000', help="候補数（カンマ区切り）")
+    parser.add_argument('--top-k', type=int, default=100, help="選ぶ企業数")
+    parser.add_argument('--repeat', type=int, default=5, help="計測の回数（最小値を使う）")
+    parser.add_argument('--max-ms', type=float, help="最大の候補数での順位付け全体（rank）の上限（ミリ秒）")
+    args = parser.parse_args(argv)
+
+    counts = [int(count) for count in args.candidates.split(',') if count.strip()]
+    rows = [measure(load_candidates(count), args.top_k, args.repeat) for count in counts]
+
+    print(f"{'候補数':>8} {'build_features':>15} {'score':>8} {'top_k':>8} {'rank':>8}  (ミリ秒)")
+    for row in rows:
+        print(f"{row['candidates']:>10,} {row['build_features']:>15.2f} {row['score']:>8.2f} "
+              f"{row['top_k']:>8.2f} {row['rank']:>8.2f}")
+
+    if args.max_ms is not None and rows and rows[-1]['rank'] > args.max_ms:
+        print(f"\n✗ 順位付けに {rows[-1]['rank']:.1f} ミリ秒かかりました（上限: {args.max_ms:.1f} ミリ秒）")
+        return 1
+
+    print("\n✓ 計測が完了しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+氏名割り当てのベンチマーク
+
+NameAllocator で数百万件の氏名を割り当て、区間ごとの1件あたりの所要時間が
+割り当て件数に関係なく一定であることを確認する。
+比較として、旧実装（使用済み氏名の集合に対して乱数で引き直す方式）も計測できる
+
+使い方:
+    python -m benchmarks.bench_name_allocator --allocations 5000000
+    python -m benchmarks.bench_name_allocator --legacy --allocations 20000
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyman_finder import SAMPLE_FIRST_NAMES, SAMPLE_LAST_NAMES, SAMPLE_POSITIONS  # noqa: E402
+from name_allocator import NameAllocator  # noqa: E402
+
+# 1検索あたりの企業数（この数の企業ごとにスコープを切り替える）
+COMPANIES_PER_SEARCH = 20
+
+
+def scoped_allocations() -> Callable[[int], None]:
+    """
+    検索ごとにスコープを作り、企業ごとに5名ずつ割り当てる（app.perform_search と同じ使い方）
+    """
+    allocator = NameAllocator(SAMPLE_LAST_NAMES, SAMPLE_FIRST_NAMES)
+    state = {'scope': None, 'allocated': 0, 'search': 0}
+    per_search = COMPANIES_PER_SEARCH * 5
+
+    def allocate(count: int):
+        for _ in range(count):
+            if state['allocated'] % per_search == 0:
+                state['search'] += 1
+                state['scope'] = allocator.scope(f"search_{state['search']}")
+            state['scope'].allocate()
+            state['allocated'] += 1
+
+    return allocate
+
+
+def legacy_allocations() -> Callable[[int], None]:
+    """
+    旧実装: プロセス全体の使用済み集合に対して md5 シードの乱数で最大100回引き直す
+    """
+    used_names = set()
+    state = {'company': 0}
+
+    def allocate(count: int):
+        for _ in range(count):
+            state['company'] += 1
+            position = SAMPLE_POSITIONS[state['company'] % 5]
+            seed = int(hashlib.md5(f"企業{state['company']}_{position}".encode()).hexdigest(), 16)
+            rng = random.Random(seed)
+            for _ in range(100):
+                name = f"{rng.choice(SAMPLE_LAST_NAMES)} {rng.choice(SAMPLE_FIRST_NAMES)}"
+                if name not in used_names:
+                    used_names.add(name)
+                    break
+
+    return allocate
+
+
+def run(allocate: Callable[[int], None], total: int, windows: int) -> List[dict]:
+    """
+    total 件を windows 区間に分けて割り当て、区間ごとの1件あたりの時間を返す
+    """
+    window_size = max(total // windows, 1)
+    rows = []
+    done = 0
+    while done < total:
+        count = min(window_size, total - done)
+        start = time.perf_counter()
+        allocate(count)
+        elapsed = time.perf_counter() - start
+        done += count
+        rows.append({'allocated': done, 'ns_per_allocation': elapsed / count * 1e9})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="氏名割り当てのベンチマーク")
+    parser.add_argument('--allocations', type=int, default=3_000_000, help="割り当てる氏名の総数")
+    parser.add_argument('--windows', type=int, default=10, help="計測区間の数")
+    parser.add_argument('--legacy', action='store_true', help="旧実装（使用済み集合と引き直し）を計測")
+    parser.add_argument('--max-drift', type=float, default=2.0,
+                        help="最初の区間に対する最後の区間の許容倍率（NameAllocator のみ判定）")
+    args = parser.parse_args(argv)
+
+    allocate = legacy_allocations() if args.legacy else scoped_allocations()
+    rows = run(allocate, args.allocations, args.windows)
+
+    print(f"{'割り当て済み':>14} {'ns/件':>10}")
+    for row in rows:
+        print(f"{row['allocated']:>16,} {row['ns_per_allocation']:>12.0f}")
+
+    if args.legacy or len(rows) < 2:
+        return 0
+
+    drift = rows[-1]['ns_per_allocation'] / rows[0]['ns_per_allocation']
+    if drift > args.max_drift:
+        print(f"\n✗ 1件あたりの時間が {drift:.2f} 倍に増加しました（許容: {args.max_drift:.2f} 倍）")
+        return 1
+
+    print(f"\n✓ 1件あたりの時間は一定です（最初の区間に対して {drift:.2f} 倍）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+解析プロセスプールのベンチマーク（CPU負荷の高い解析のコア数に対するスケーリング）
+
+benchmarks/fixtures の企業サイトHTMLを --page-scale 倍に大きくしたページを入力に、
+企業ページ1件あたり詳細情報・キーマンの抽出（parse_pool.parse_page の company・keymen）を行い、
+次の方法で処理量（ページ/秒）を計測する
+
+    inline  : 1スレッドで順に解析
+    threads : --threads 個のスレッドで解析（GIL のため、コア数を増やしても速くならない）
+    pool=N  : parse_pool.ParsePool（子プロセス N 個）に --threads 個のスレッドから依頼
+
+--min-efficiency を指定した場合は、コア数以下のプロセス数で 速度比 / プロセス数 がこれを下回ると終了コード1で失敗する
+
+使い方:
+    python -m benchmarks.bench_parse_pool
+    python -m benchmarks.bench_parse_pool --processes 1,2,4,8 --pages 200 --page-scale 8
+    python -m benchmarks.bench_parse_pool --batch-size 1,8,32 --output parse_pool.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parse_pool  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPORATE_DIR = os.path.join(BENCH_DIR, 'fixtures', 'corporate')
+
+
+def load_pages(count: int, scale: int) -> List[Tuple[bytes, str]]:
+    """
+    フィクスチャの本文を scale 回くり返して大きくしたページ（内容, スニペット）を count 件作る
+    """
+    fixtures = []
+    for filename in sorted(os.listdir(CORPORATE_DIR)):
+        if not filename.endswith('.html'):
+            continue
+        with open(os.path.join(CORPORATE_DIR, filename), encoding='utf-8') as f:
+            html = f.read()
+        head, _, rest = html.partition('<body')
+        body = '<body' + rest.rsplit('</body>', 1)[0] + '</body>'
+        page = head + '<body>' + body * max(scale, 1) + '</body></html>'
+        fixtures.append((page.encode('utf-8'), filename))
+    return [fixtures[i % len(fixtures)] for i in range(count)]
+
+
+def run_parallel(parse: Callable[[bytes, str], object], pages: List[Tuple[bytes, str]], threads: int) -> float:
+    """
+    threads 個のスレッドで全ページを解析して所要時間（秒）を返す
+    """
+    start = time.perf_counter()
+    if threads <= 1:
+        for content, snippet in pages:
+            parse(content, snippet)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda page: parse(*page), pages))
+    return time.perf_counter() - start
+
+
+def inline_parse(content: bytes, snippet: str):
+    parse_pool.parse_page('company', content, snippet)
+    parse_pool.parse_page('keymen', content)
+
+
+def measure_pool(pages: List[Tuple[bytes, str]], processes: int, batch_size: int, batch_wait: float,
+                 threads: int) -> Dict:
+    """
+    子プロセス processes 個のプールで計測（子プロセスの起動・初期化は計測に含めない）
+    """
+    pool = parse_pool.ParsePool(processes, batch_size, batch_wait)
+    try:
+        def parse(content: bytes, snippet: str):
+            pool.parse('company', content, snippet)
+            pool.parse('keymen', content)
+
+        # 起動・import を済ませる（すべての子プロセスに行き渡る数を依頼する）
+        run_parallel(parse, pages[:processes * batch_size * 2], threads)
+        seconds = run_parallel(parse, pages, threads)
+    finally:
+        pool.shutdown()
+    return {'seconds': seconds, 'pages_per_sec': len(pages) / seconds}
+
+
+def main(argv=None) -> int:
+    cpu_count = os.cpu_count() or 1
+    default_processes = sorted({1, 2, 4, cpu_count} - {n for n in (2, 4) if n > cpu_count})
+    parser = argparse.ArgumentParser(description="解析プロセスプールのスケーリングのベンチマーク")
+    parser.add_argument('--pages', type=int, default=40, help="解析するページ数")
+    parser.add_argument('--page-scale', type=int, default=4, help="フィクスチャの本文をくり返す回数（ページの大きさ）")
+    parser.add_argument('--processes', default=','.join(map(str, default_processes)),
+                        help="計測する子プロセス数（カンマ区切り）")
+    parser.add_argument('--batch-size', default='8', help="1回で子プロセスに送る解析の数（カンマ区切りで複数）")
+    parser.add_argument('--batch-wait', type=float, default=0.005, help="解析をまとめて送るために待つ秒数")
+    parser.add_argument('--threads', type=int, default=max(cpu_count * 2, 4), help="解析を依頼するスレッド数")
+    parser.add_argument('--min-efficiency', type=float, help="コア数以下のプロセス数での 速度比 / プロセス数 の下限")
+    parser.add_argument('--output', help="計測結果を書き出すJSONファイル")
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.pages, args.page_scale)
+    page_kib = sum(len(content) for content, _ in pages) / len(pages) / 1024
+    processes_list = [int(n) for n in args.processes.split(',') if n.strip()]
+    batch_sizes = [int(n) for n in args.batch_size.split(',') if n.strip()]
+    print(f"コア数: {cpu_count} / ページ: {len(pages)}件（平均 {page_kib:.0f} KiB）/ 依頼スレッド: {args.threads}\n")
+
+    # 計測前に import・インスタンスの作成を済ませる
+    inline_parse(*pages[0])
+    inline = run_parallel(inline_parse, pages, 1)
+    threaded = run_parallel(inline_parse, pages, args.threads)
+    baseline = len(pages) / inline
+
+    report = {
+        'cpu_count': cpu_count,
+        'pages': len(pages),
+        'page_kib': round(page_kib, 1),
+        'inline': {'seconds': inline, 'pages_per_sec': baseline},
+        'threads': {'threads': args.threads, 'seconds': threaded, 'pages_per_sec': len(pages) / threaded},
+        'pool': []
+    }
+
+    print(f"{'方法':<24} {'ページ/秒':>10} {'速度比':>8} {'効率':>6}")
+    print(f"{'inline':<24} {baseline:>12.1f} {1.0:>9.2f}")
+    print(f"{f'threads={args.threads}':<24} {len(pages) / threaded:>12.1f} {inline / threaded:>9.2f}")
+
+    failures = []
+    for batch_size in batch_sizes:
+        for processes in processes_list:
+            result = measure_pool(pages, processes, batch_size, args.batch_wait, args.threads)
+            speedup = result['pages_per_sec'] / baseline
+            efficiency = speedup / processes
+            report['pool'].append(dict(result, processes=processes, batch_size=batch_size,
+                                       speedup=speedup, efficiency=efficiency))
+            label = f"pool={processes} batch={batch_size}"
+            print(f"{label:<24} {result['pages_per_sec']:>12.1f} {speedup:>9.2f} {efficiency:>8.2f}")
+
+            if args.min_efficiency is not None and processes <= cpu_count and efficiency < args.min_efficiency:
+                failures.append(f"{label}: 効率 {efficiency:.2f} < 下限 {args.min_efficiency:.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if failures:
+        print("\n✗ スケーリングの下限を下回りました:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\n✓ 計測が完了しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
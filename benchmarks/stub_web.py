@@ -0,0 +1,235 @@
+"""
+ローカルスタブWebサーバー
+検索結果ページ（SERP）と企業サイトを模したHTMLを返し、外部に通信せずにベンチマークを行う
+
+- /search?q=...            : Google検索結果ページ（div.g / h3 / VwiC3b の構造）
+- /site/<host>/<path>      : 企業サイト（トップページ・会社概要ページ）
+"""
+
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+from keyman_finder import SAMPLE_FIRST_NAMES, SAMPLE_LAST_NAMES
+
+# 会社概要ページとして扱うパス（KeymanFinder._extract_from_website が巡回するもの）
+ABOUT_PATHS = {'/company', '/about', '/company/profile', '/about-us'}
+
+# 役員として掲載する役職
+OFFICER_POSITIONS = ['代表取締役社長', '取締役', '執行役員', 'CTO', 'CFO']
+
+SERP_TEMPLATE = """<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>{query} - Google 検索</title></head>
+<body><div id="search"><div id="rso">
+{results}
+</div></div></body></html>"""
+
+SERP_RESULT_TEMPLATE = """<div class="g"><div class="yuRUbf"><a href="{url}"><h3 class="LC20lb">{title}</h3></a></div>
+<div class="VwiC3b yXK7lf">{snippet}</div></div>"""
+
+COMPANY_TEMPLATE = """<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>{name}</title></head>
+<body>
+<header><nav><a href="/">ホーム</a> <a href="/company">会社概要</a> <a href="/service">事業内容</a></nav></header>
+<main>
+<h1>{name}</h1>
+<p>{name}は{domain}の分野で{focus}を推進しています。</p>
+<table class="company-profile">
+<tr><th>設立</th><td>{year}年</td></tr>
+<tr><th>売上高</th><td>{revenue}億円</td></tr>
+<tr><th>営業利益</th><td>{profit}億円</td></tr>
+<tr><th>従業員数</th><td>{employees}名</td></tr>
+</table>
+{officers}
+{filler}
+</main>
+<footer>Copyright {name} All Rights Reserved.</footer>
+</body></html>"""
+
+DOMAINS = ['SaaS・クラウド', 'AI・機械学習', 'DX推進', 'フィンテック・決済', 'マーケティング', 'ヘルスケア・医療']
+FOCUS = ['グローバル展開', '新規事業の拡大', '研究開発の強化', 'シェア拡大', 'イノベーション']
+
+
+class StubWeb:
+    """
+    スタブWebサーバー
+
+    Args:
+        latency: 1リクエストあたりの応答遅延（秒）
+        error_rate: 500エラーを返す確率（0〜1）
+        seed: エラー発生・ページ内容の乱数シード
+        page_size: 企業ページに追加する本文の段落数（HTMLの大きさの調整用）
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 page_size: int = 20, host: str = '127.0.0.1', port: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.page_size = page_size
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.bytes_sent = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubWeb':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def rewrite_url(self, url: str) -> str:
+        """
+        外部URLをスタブサーバーのURLに書き換える（http_client.set_url_rewriter 用）
+        """
+        parsed = urlparse(url)
+        if url.startswith(self.base_url):
+            return url
+        if parsed.path == '/search':
+            return f"{self.base_url}/search?{parsed.query}"
+        path = parsed.path or '/'
+        return f"{self.base_url}/site/{quote(parsed.netloc)}{quote(path)}"
+
+    # ---- リクエスト処理 ----
+
+    def _handle(self, request: BaseHTTPRequestHandler):
+        with self._lock:
+            self.request_count += 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.error_count += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if fail:
+            self._send(request, 500, 'Internal Server Error')
+            return
+
+        parsed = urlparse(request.path)
+        if parsed.path == '/search':
+            query = parse_qs(parsed.query).get('q', [''])[0]
+            num = int(parse_qs(parsed.query).get('num', ['10'])[0])
+            self._send(request, 200, self._serp(query, num))
+        elif parsed.path.startswith('/site/'):
+            host, _, path = unquote(parsed.path[len('/site/'):]).partition('/')
+            page = self._company_page(host, '/' + path.rstrip('/'))
+            if page is None:
+                self._send(request, 404, 'Not Found')
+            else:
+                self._send(request, 200, page)
+        else:
+            self._send(request, 404, 'Not Found')
+
+    def _send(self, request: BaseHTTPRequestHandler, status: int, body: str):
+        data = body.encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', 'text/html; charset=utf-8')
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+        with self._lock:
+            self.bytes_sent += len(data)
+
+    # ---- ページ生成（ホスト名・クエリから決定的に生成） ----
+
+    def _page_rng(self, key: str) -> random.Random:
+        return random.Random(zlib.crc32(f"{self.seed}:{key}".encode('utf-8')))
+
+    def _officers(self, host: str) -> str:
+        rng = self._page_rng('officers:' + host)
+        rows = []
+        for position in OFFICER_POSITIONS:
+            name = f"{rng.choice(SAMPLE_LAST_NAMES)} {rng.choice(SAMPLE_FIRST_NAMES)}"
+            rows.append(f"<tr><th>{position}</th><td>{name}</td></tr>")
+        return '<h2>役員一覧</h2>\n<table class="officers">\n' + '\n'.join(rows) + '\n</table>'
+
+    def _company_page(self, host: str, path: str) -> Optional[str]:
+        rng = self._page_rng(host)
+        if path in ('', '/'):
+            officers = ''
+        elif path in ABOUT_PATHS:
+            # 一部の企業は /company を持たず /about で役員を掲載している
+            if path == '/company' and rng.random() < 0.3:
+                return None
+            officers = self._officers(host)
+        else:
+            return None
+
+        name = f"株式会社{host.split('.')[0]}"
+        filler = '\n'.join(
+            f"<p>{rng.choice(DOMAINS)}に関する取り組み{i}。お客様の課題解決に向けて{rng.choice(FOCUS)}を進めています。</p>"
+            for i in range(self.page_size)
+        )
+        return COMPANY_TEMPLATE.format(
+            name=name,
+            domain=rng.choice(DOMAINS),
+            focus=rng.choice(FOCUS),
+            year=rng.randint(1990, 2022),
+            revenue=rng.randint(5, 300),
+            profit=round(rng.uniform(0.5, 30), 1),
+            employees=rng.randint(20, 2000),
+            officers=officers,
+            filler=filler
+        )
+
+    def _serp(self, query: str, num: int) -> str:
+        rng = self._page_rng('serp:' + query)
+
+        if 'site:facebook.com' in query:
+            slug = f"bench.user{rng.randint(1, 10 ** 6)}"
+            results = [SERP_RESULT_TEMPLATE.format(
+                url=f"/url?q=https://www.facebook.com/{slug}&sa=U", title=f"{query.split()[0]} | Facebook", snippet='')]
+        elif 'site:twitter.com' in query:
+            handle = f"bench_user{rng.randint(1, 10 ** 6)}"
+            results = [SERP_RESULT_TEMPLATE.format(
+                url=f"/url?q=https://x.com/{handle}&sa=U", title=f"{query.split()[0]} (@{handle}) / X", snippet='')]
+        elif '代表取締役 社長 役員' in query:
+            results = [SERP_RESULT_TEMPLATE.format(
+                url=f"https://news.example.jp/{i}", title=f"役員情報 {i}",
+                snippet=f"代表取締役 {rng.choice(SAMPLE_LAST_NAMES)} {rng.choice(SAMPLE_FIRST_NAMES)}")
+                for i in range(3)]
+        else:
+            results = []
+            for i in range(num):
+                host = f"bench-company-{zlib.crc32(query.encode('utf-8')) % 10000}-{i}.example.jp"
+                results.append(SERP_RESULT_TEMPLATE.format(
+                    url=f"https://{host}",
+                    title=f"株式会社ベンチ{i} | {rng.choice(DOMAINS)}",
+                    snippet=(f"{rng.randint(2000, 2022)}年設立、従業員{rng.randint(20, 900)}名、"
+                             f"売上高{rng.randint(5, 300)}億円。{rng.choice(FOCUS)}に注力。")
+                ))
+
+        return SERP_TEMPLATE.format(query=query, results='\n'.join(results))
@@ -5,10 +5,52 @@
 
 import requests
 from bs4 import BeautifulSoup
-import time
+import contextvars
+import math
 import re
-from typing import List, Dict
-from config import USER_AGENT, REQUEST_DELAY
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Sequence
+import http_client
+import lookup_cache
+import metrics
+import parse_pool
+import projection
+from config import USER_AGENT, SEARCH_ENGINE_URL, COMPANY_OVERFETCH_FACTOR, COMPANY_FETCH_WORKERS, REQUEST_DELAY
+from deadline import CancellableDeadline, Cancelled, Deadline
+from keyword_index import KeywordIndex
+from lead_scoring import LeadScorer
+from synthetic_data import SyntheticCompanyGenerator
+
+
+# 事業領域のキーワード
+BUSINESS_DOMAIN_KEYWORDS = {
+    'SaaS': ['SaaS', 'クラウド', 'サブスクリプション'],
+    'AI/機械学習': ['AI', '機械学習', 'ディープラーニング', '人工知能'],
+    'DX': ['DX', 'デジタルトランスフォーメーション', 'デジタル化'],
+    'フィンテック': ['フィンテック', 'FinTech', '決済', '金融テクノロジー'],
+    'マーケティング': ['マーケティング', 'MA', 'マーケティングオートメーション'],
+    'HR Tech': ['HRTech', '人事', '採用管理', 'タレントマネジメント'],
+    'Eコマース': ['EC', 'Eコマース', 'オンラインショップ', '通販'],
+    'IoT': ['IoT', 'センサー', 'スマートデバイス'],
+    'ヘルスケア': ['ヘルスケア', '医療', 'メディカル'],
+    'エンタープライズ': ['エンタープライズ', '大企業向け', '基幹システム']
+}
+
+COMPANY_CANDIDATES = metrics.counter(
+    'sales_bot_company_candidates_total',
+    '並行取得した企業候補の結果（qualified / empty / cancelled / discarded）', ('result',))
+
+# 売上規模の選択肢（億円単位、下限以上・上限未満）
+REVENUE_RANGES = {
+    'under10': (0, 10),
+    '10to30': (10, 30),
+    '30to50': (30, 50),
+    '50to100': (50, 100),
+    '100to300': (100, 300),
+    '300to500': (300, 500),
+    '500to1000': (500, 1000),
+    'over1000': (1000, 10000)
+}
 
 
 class CompanySearch:
@@ -16,14 +58,25 @@ class CompanySearch:
         self.headers = {
             'User-Agent': USER_AGENT
         }
+        # 業界ごとの候補企業プール
+        self._candidate_pools = {}
     
-    def search_companies(self, conditions: str, num_companies: int) -> List[Dict]:
+    def search_companies(self, conditions: str, num_companies: int,
+                         deadline: Optional[Deadline] = None, fields: Optional[Sequence[str]] = None,
+                         overfetch: float = COMPANY_OVERFETCH_FACTOR,
+                         workers: int = COMPANY_FETCH_WORKERS) -> List[Dict]:
         """
         企業条件に基づいて企業を検索
         
         Args:
             conditions: 企業リストアップ条件（フリーテキスト）
             num_companies: リストアップする企業数
+            deadline: 検索の締め切り（過ぎた場合はそこまでの企業を返す）
+            fields: 必要な項目（projection。省略時はすべて。指定されていない詳細情報は取得・抽出しない）
+            overfetch: 企業数の何倍の候補を取得するか。1より大きい場合は候補の企業ページを workers 個のスレッドで
+                       並行して取得し、情報を取得できた企業が num_companies 社そろった時点で残りを取り消す
+                       （1以下の場合は上位の候補から1社ずつ順に取得）
+            workers: 並行して取得するスレッド数
         
         Returns:
             企業情報のリスト
@@ -33,24 +86,104 @@ class CompanySearch:
         
         companies = []
         search_query = self._build_search_query(conditions)
+        concurrent = overfetch > 1 and workers > 1
+        num_candidates = math.ceil(num_companies * overfetch) if concurrent else num_companies
         
         # Google検索を使用して企業を検索
-        search_results = self._google_search(search_query, num_companies)
+        search_results = self._google_search(search_query, num_candidates, deadline)
         
         # 検索結果が空の場合はサンプルデータを使用
         if not search_results:
             print("  検索結果が取得できませんでした。サンプルデータを使用します。")
-            search_results = self._get_sample_data(num_companies)
+            search_results = self._get_sample_data(num_candidates)
+        
+        if concurrent:
+            return self._fetch_candidates(search_results[:num_candidates], num_companies, workers, deadline, fields)
         
         for i, result in enumerate(search_results[:num_companies]):
+            if deadline is not None and deadline.should_stop():
+                print(f"  締め切りを過ぎたため、{len(companies)}社で打ち切ります")
+                break
             print(f"企業 {i+1}/{num_companies} を処理中...")
-            company_info = self._extract_company_info(result)
+            company_info = self._extract_company_info(result, deadline, fields=fields)
             if company_info:
                 companies.append(company_info)
-            time.sleep(REQUEST_DELAY)
+            http_client.throttle(deadline=deadline)
         
         return companies
     
+    def _fetch_candidates(self, candidates: List[Dict], num_companies: int, workers: int,
+                          deadline: Optional[Deadline] = None,
+                          fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        候補の企業情報を並行して取得し、情報を取得できた企業が num_companies 社そろった時点で打ち切る
+        
+        取得に失敗した・情報が空の候補があっても、残りの候補で企業数をそろえる。
+        結果は候補の順位順（待機中の取得は取り消し、実行中の取得はこれから送るリクエストを止めて結果を捨てる）
+        """
+        print(f"  {len(candidates)}社の候補から{num_companies}社を並行して取得します（{workers}スレッド）")
+        # 取得ごとの締め切り。取り消すと、実行中の取得も次のリクエストを送らない
+        fetch_deadline = CancellableDeadline(deadline)
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='company-fetch')
+        # 処理時間・通信量の内訳（metrics.current_stats）を各スレッドに引き継ぐ
+        futures = {
+            pool.submit(contextvars.copy_context().run, self._fetch_candidate, candidate, fetch_deadline, fields): i
+            for i, candidate in enumerate(candidates)
+        }
+        
+        found = {}
+        try:
+            for future in as_completed(futures):
+                company_info = future.result()
+                if company_info is None:
+                    continue
+                found[futures[future]] = company_info
+                if len(found) >= num_companies:
+                    break
+                if deadline is not None and deadline.should_stop():
+                    print(f"  締め切りを過ぎたため、{len(found)}社で打ち切ります")
+                    break
+        finally:
+            # 残りの取得を取り消す（実行中のものは完了を待たない）
+            fetch_deadline.cancel()
+            pending = sum(future.cancel() for future in futures)
+            pool.shutdown(wait=False)
+            COMPANY_CANDIDATES.inc(pending, result='cancelled')
+            if pending:
+                metrics.record_skipped('page_fetch', pending)
+        
+        companies = [found[i] for i in sorted(found)][:num_companies]
+        COMPANY_CANDIDATES.inc(len(companies), result='qualified')
+        print(f"  {len(companies)}社を取得しました（取り消した候補: {pending}社）")
+        return companies
+    
+    def _fetch_candidate(self, search_result: Dict, deadline: CancellableDeadline,
+                         fields: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """
+        候補1社の企業情報を取得（情報が空の場合・取り消された場合は None）
+        """
+        if deadline.should_stop():
+            return None
+        
+        # リクエスト間隔はスレッドごとに待機せず、すべてのスレッドで共有するホストごとの間隔で空ける
+        with http_client.min_host_interval(REQUEST_DELAY):
+            company_info = self._extract_company_info(search_result, deadline, fields=fields)
+        if deadline.cancelled:
+            # 必要な企業数がそろった後に完了した取得
+            COMPANY_CANDIDATES.inc(result='discarded')
+            return None
+        if not self._has_profile(company_info, fields):
+            COMPANY_CANDIDATES.inc(result='empty')
+            return None
+        return company_info
+    
+    def _has_profile(self, company_info: Dict, fields: Optional[Sequence[str]] = None) -> bool:
+        """
+        企業情報を取得できたかどうか（指定された詳細情報のいずれかが空でない。詳細情報を指定していなければ常に True）
+        """
+        wanted = [field for field in projection.DETAIL_FIELDS if projection.wants(fields, field)]
+        return not wanted or any(company_info.get(field) for field in wanted)
+    
     def _build_search_query(self, conditions: str) -> str:
         """
         検索条件からGoogle検索クエリを構築
@@ -59,7 +192,7 @@ class CompanySearch:
         query = f"{conditions} 企業 会社 代表取締役"
         return query
     
-    def _google_search(self, query: str, max_results: int) -> List[Dict]:
+    def _google_search(self, query: str, max_results: int, deadline: Optional[Deadline] = None) -> List[Dict]:
         """
         Google検索を実行（スクレイピング版）
         
@@ -69,12 +202,14 @@ class CompanySearch:
         
         try:
             # Google検索URL
-            search_url = f"https://www.google.com/search?q={requests.utils.quote(query)}&num={max_results}"
+            search_url = f"{SEARCH_ENGINE_URL}?q={requests.utils.quote(query)}&num={max_results}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=30)
+            with metrics.span('serp_fetch'):
+                response = http_client.get(search_url, headers=self.headers, timeout=30, deadline=deadline)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            with metrics.span('html_parse'):
+                soup = BeautifulSoup(response.content, 'html.parser')
             
             # 検索結果を抽出
             for g in soup.find_all('div', class_='g'):
@@ -100,15 +235,16 @@ class CompanySearch:
         
         return search_results
     
-    def _extract_company_info(self, search_result: Dict) -> Dict:
+    def _extract_company_info(self, search_result: Dict, deadline: Optional[Deadline] = None,
+                              detailed: bool = True, fields: Optional[Sequence[str]] = None) -> Dict:
         """
-        検索結果から企業情報を抽出
+        検索結果から企業情報を抽出（detailed=False の場合は企業ページを取得せず、タイトル・スニペットのみ）
         """
         snippet = search_result.get('snippet', '')
         url = search_result.get('url', '')
         
         # より詳細な情報を取得
-        detailed_info = self._fetch_detailed_info(url, snippet)
+        detailed_info = self._fetch_detailed_info(url, snippet, deadline, fields) if detailed else {}
         
         company_info = {
             '企業名': self._extract_company_name(search_result),
@@ -124,6 +260,15 @@ class CompanySearch:
         
         return company_info
     
+    def enrich_company(self, company: Dict, deadline: Optional[Deadline] = None,
+                       fields: Optional[Sequence[str]] = None) -> Dict:
+        """
+        企業候補（detailed=False で取得した企業情報）に企業ページの詳細情報を追加
+        """
+        detailed_info = self._fetch_detailed_info(company.get('企業URL', ''), company.get('事業概要', ''), deadline,
+                                                  fields)
+        return dict(company, **detailed_info)
+    
     def _extract_company_name(self, search_result: Dict) -> str:
         """
         検索結果から企業名を抽出
@@ -134,9 +279,10 @@ class CompanySearch:
         company_name = title.split('|')[0].split('-')[0].strip()
         return company_name
     
-    def _fetch_detailed_info(self, url: str, snippet: str) -> Dict:
+    def _fetch_detailed_info(self, url: str, snippet: str, deadline: Optional[Deadline] = None,
+                             fields: Optional[Sequence[str]] = None) -> Dict:
         """
-        企業の詳細情報を取得
+        企業の詳細情報を取得（fields に含まれない項目は抽出せず、どれも含まれなければページを取得しない）
         """
         detailed_info = {
             '設立年': '',
@@ -147,33 +293,78 @@ class CompanySearch:
             '注力ポイント': ''
         }
         
+        if not projection.wants_any(fields, projection.DETAIL_FIELDS):
+            metrics.record_skipped('page_fetch')
+            self._extract_details(detailed_info, '', snippet, fields)
+            return detailed_info
+        
+        # バッチ検索では、同じ企業ページを他の検索条件と共有する
+        fields_key = tuple(fields) if fields is not None else None
+        return lookup_cache.lookup(
+            'company_page', (url, snippet, fields_key),
+            lambda: self._download_detailed_info(url, snippet, detailed_info, deadline, fields), deadline)
+    
+    def _download_detailed_info(self, url: str, snippet: str, detailed_info: Dict,
+                                deadline: Optional[Deadline] = None,
+                                fields: Optional[Sequence[str]] = None) -> Dict:
+        """
+        企業ページを取得して詳細情報を抽出（取得に失敗した場合はスニペットから抽出）
+        """
         try:
             # 企業サイトから情報を取得
-            response = requests.get(url, headers=self.headers, timeout=10)
+            with metrics.span('page_fetch'):
+                response = http_client.get(url, headers=self.headers, timeout=10, deadline=deadline)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                text = soup.get_text()
-                
                 # 各種情報を抽出
-                detailed_info['設立年'] = self._extract_founded_year(text)
-                detailed_info['売上'] = self._extract_revenue(text)
-                detailed_info['利益'] = self._extract_profit(text)
-                detailed_info['従業員規模'] = self._extract_employee_count(text)
-                detailed_info['事業領域'] = self._extract_business_domain(text, snippet)
-                detailed_info['注力ポイント'] = self._extract_focus_points(text, snippet)
+                self._parse_details(detailed_info, response.content, snippet, deadline, fields)
         
+        except Cancelled:
+            # 必要な企業数がそろって取り消された候補（結果は使わない）
+            pass
         except Exception as e:
             print(f"    詳細情報取得エラー: {e}")
             # スニペットから可能な限り情報を抽出
-            detailed_info['設立年'] = self._extract_founded_year(snippet)
-            detailed_info['売上'] = self._extract_revenue(snippet)
-            detailed_info['利益'] = self._extract_profit(snippet)
-            detailed_info['従業員規模'] = self._extract_employee_count(snippet)
-            detailed_info['事業領域'] = self._extract_business_domain('', snippet)
-            detailed_info['注力ポイント'] = self._extract_focus_points('', snippet)
+            self._extract_details(detailed_info, '', snippet, fields, from_snippet=True)
         
         return detailed_info
     
+    def _parse_details(self, detailed_info: Dict, content: bytes, snippet: str,
+                       deadline: Optional[Deadline] = None, fields: Optional[Sequence[str]] = None):
+        """
+        企業ページを解析して詳細情報を抽出（PARSE_PROCESSES が1以上なら子プロセスで行う）
+        """
+        pool = parse_pool.get_pool()
+        if pool is not None:
+            detailed_info.update(pool.parse('company', content, snippet, fields, deadline))
+            return
+        
+        with metrics.span('html_parse'):
+            soup = BeautifulSoup(content, 'html.parser')
+        with metrics.span('text_extraction'):
+            text = soup.get_text()
+        self._extract_details(detailed_info, text, snippet, fields)
+    
+    def _extract_details(self, detailed_info: Dict, text: str, snippet: str,
+                         fields: Optional[Sequence[str]] = None, from_snippet: bool = False):
+        """
+        指定された項目の詳細情報を抽出（from_snippet=True の場合はスニペットのみから抽出）
+        """
+        source = snippet if from_snippet else text
+        extractors = (
+            ('設立年', 'extract_founded_year', lambda: self._extract_founded_year(source)),
+            ('売上', 'extract_revenue', lambda: self._extract_revenue(source)),
+            ('利益', 'extract_profit', lambda: self._extract_profit(source)),
+            ('従業員規模', 'extract_employee_count', lambda: self._extract_employee_count(source)),
+            ('事業領域', 'extract_business_domain', lambda: self._extract_business_domain(text, snippet)),
+            ('注力ポイント', 'extract_focus_points', lambda: self._extract_focus_points(text, snippet)),
+        )
+        for field, extractor, extract in extractors:
+            if projection.wants(fields, field):
+                detailed_info[field] = extract()
+            else:
+                metrics.record_skipped(extractor)
+    
+    @metrics.timed('extract_founded_year')
     def _extract_founded_year(self, text: str) -> str:
         """
         設立年を抽出
@@ -193,6 +384,7 @@ class CompanySearch:
         
         return ''
     
+    @metrics.timed('extract_revenue')
     def _extract_revenue(self, text: str) -> str:
         """
         売上を抽出
@@ -211,6 +403,7 @@ class CompanySearch:
         
         return ''
     
+    @metrics.timed('extract_profit')
     def _extract_profit(self, text: str) -> str:
         """
         利益を抽出
@@ -229,6 +422,7 @@ class CompanySearch:
         
         return ''
     
+    @metrics.timed('extract_employee_count')
     def _extract_employee_count(self, text: str) -> str:
         """
         従業員規模を抽出
@@ -248,6 +442,7 @@ class CompanySearch:
         
         return ''
     
+    @metrics.timed('extract_business_domain')
     def _extract_business_domain(self, text: str, snippet: str) -> str:
         """
         事業領域を抽出
@@ -256,20 +451,8 @@ class CompanySearch:
         
         # 事業領域のキーワード
         domains = []
-        keywords = {
-            'SaaS': ['SaaS', 'クラウド', 'サブスクリプション'],
-            'AI/機械学習': ['AI', '機械学習', 'ディープラーニング', '人工知能'],
-            'DX': ['DX', 'デジタルトランスフォーメーション', 'デジタル化'],
-            'フィンテック': ['フィンテック', 'FinTech', '決済', '金融テクノロジー'],
-            'マーケティング': ['マーケティング', 'MA', 'マーケティングオートメーション'],
-            'HR Tech': ['HRTech', '人事', '採用管理', 'タレントマネジメント'],
-            'Eコマース': ['EC', 'Eコマース', 'オンラインショップ', '通販'],
-            'IoT': ['IoT', 'センサー', 'スマートデバイス'],
-            'ヘルスケア': ['ヘルスケア', '医療', 'メディカル'],
-            'エンタープライズ': ['エンタープライズ', '大企業向け', '基幹システム']
-        }
         
-        for domain, kws in keywords.items():
+        for domain, kws in BUSINESS_DOMAIN_KEYWORDS.items():
             for kw in kws:
                 if kw in combined_text:
                     domains.append(domain)
@@ -277,6 +460,7 @@ class CompanySearch:
         
         return '、'.join(domains[:3]) if domains else ''
     
+    @metrics.timed('extract_focus_points')
     def _extract_focus_points(self, text: str, snippet: str) -> str:
         """
         注力ポイントを抽出
@@ -303,18 +487,39 @@ class CompanySearch:
         
         return ''
     
-    def search_companies_by_criteria(self, industry: str, revenue: str, keywords: str, num_companies: int) -> List[Dict]:
+    def search_companies_by_criteria(self, industry: str, revenue: str, keywords: str, num_companies: int,
+                                     weights: Optional[Dict[str, float]] = None,
+                                     deadline: Optional[Deadline] = None, detailed: bool = True,
+                                     fields: Optional[Sequence[str]] = None) -> List[Dict]:
         """
         業界と売上規模に基づいて企業を検索
+        
+        Args:
+            industry: 業界
+            revenue: 売上規模（REVENUE_RANGES のキー）
+            keywords: 追加キーワード（空白・カンマ区切り）
+            num_companies: リストアップする企業数
+            weights: スコアリングの重み（lead_scoring.DEFAULT_WEIGHTS の一部を上書き）
+            deadline: 検索の締め切り（過ぎた場合は詳細情報を取得できた企業までを返す）
+            detailed: False の場合は企業ページを取得せず、タイトル・スニペットの企業候補をすぐに返す（lite モード）
+            fields: 必要な項目（projection。省略時はすべて。指定されていない詳細情報は取得・抽出しない）
         """
         print(f"企業検索を開始します: 業界={industry}, 売上規模={revenue}, キーワード={keywords}")
         print(f"目標企業数: {num_companies}")
         
-        # サンプルデータを業界と売上でフィルタリング
-        sample_data = self._get_sample_data_by_industry(industry, revenue)
+        candidates = self._get_candidate_pool(industry)
+        keyword_scores = None
+        
+        # キーワードで絞り込み、一致度をスコアリングに渡す
+        if keywords and keywords.strip():
+            matches = KeywordIndex(candidates).search(keywords)
+            candidates = [candidates[doc_id] for doc_id, _ in matches]
+            keyword_scores = [score for _, score in matches]
+            print(f"  キーワード一致: {len(candidates)}社")
         
-        # 指定された数だけ取得
-        filtered_companies = sample_data[:num_companies]
+        # スコア上位の企業を指定された数だけ取得
+        filtered_companies = self._rank_candidates(candidates, revenue, num_companies,
+                                                   keyword_scores=keyword_scores, weights=weights)
         
         if not filtered_companies:
             print("  検索結果が取得できませんでした。サンプルデータを使用します。")
@@ -322,6 +527,9 @@ class CompanySearch:
         # 詳細情報を追加
         results = []
         for i, company_data in enumerate(filtered_companies, 1):
+            if deadline is not None and deadline.should_stop():
+                print(f"  締め切りを過ぎたため、{len(results)}社で打ち切ります")
+                break
             print(f"企業 {i}/{len(filtered_companies)} を処理中...")
             
             # search_result形式に変換
@@ -331,112 +539,31 @@ class CompanySearch:
                 'snippet': company_data['snippet']
             }
             
-            company_info = self._extract_company_info(search_result)
+            company_info = self._extract_company_info(search_result, deadline, detailed, fields)
             
             results.append(company_info)
         
         return results
     
-    def _generate_company_variations(self, base_companies: List[Dict], target_count: int = 100) -> List[Dict]:
+    def _generate_company_variations(self, base_companies: List[Dict], target_count: int = 100,
+                                     seed: Optional[int] = None) -> List[Dict]:
         """
         基本企業データから複数のバリエーションを生成して指定数まで拡張
-        """
-        import random
-        
-        result = []
         
-        # 基本企業をそのまま追加
-        result.extend(base_companies)
-        
-        # バリエーション用のプレフィックス・サフィックス
-        prefixes = ['', 'ネクスト', 'アドバンス', 'プレミアム', 'グローバル', 'ジャパン', 'デジタル', 
-                   'スマート', 'フューチャー', 'モダン', 'エキスパート', 'プロ', 'トップ', 'エリート',
-                   'ハイクオリティ', 'イノベーティブ', 'クリエイティブ', 'ダイナミック']
-        
-        locations = ['東京', '大阪', '名古屋', '福岡', '札幌', '横浜', '神戸', '京都', '仙台', '広島',
-                    '関西', '関東', '九州', '北海道', '東北', '中部', '中国', '四国']
-        
-        suffixes = ['ホールディングス', 'グループ', 'ラボ', 'スタジオ', 'ワークス', 'システムズ',
-                   'ソリューションズ', 'サービス', 'パートナーズ', 'アソシエイツ', 'エンタープライズ']
-        
-        # 売上のバリエーション（億円単位）
-        revenue_ranges = [
-            (3, 8), (8, 15), (15, 25), (25, 35), (35, 50),
-            (50, 70), (70, 90), (90, 120), (120, 200), (200, 500)
-        ]
-        
-        # 従業員数のバリエーション
-        employee_ranges = [
-            (15, 30), (30, 50), (50, 80), (80, 120), (120, 200),
-            (200, 350), (350, 500), (500, 1000)
-        ]
+        seed を省略した場合は基本データから導出するため、同じ業界なら毎回同じ結果になる
+        """
+        result = list(base_companies[:target_count])
         
-        # 設立年のバリエーション
-        years = list(range(2015, 2023))
+        needed = target_count - len(result)
+        if needed > 0:
+            generator = SyntheticCompanyGenerator(base_companies, seed=seed)
+            result.extend(generator.companies(needed))
         
-        # 必要な数まで生成
-        variation_index = 0
-        while len(result) < target_count:
-            # ベース企業を循環して選択
-            base = base_companies[variation_index % len(base_companies)]
-            variation_index += 1
-            
-            # 企業名のバリエーションを生成
-            base_name = base['title'].split(' | ')[0].replace('株式会社', '').strip()
-            
-            # ランダムな変更を適用
-            variation_type = variation_index % 3
-            
-            if variation_type == 0:
-                # プレフィックス + 元の名前
-                new_name = f"{random.choice(prefixes)}{base_name}"
-            elif variation_type == 1:
-                # 地域 + 元の名前
-                new_name = f"{random.choice(locations)}{base_name}"
-            else:
-                # 元の名前 + サフィックス
-                new_name = f"{base_name}{random.choice(suffixes)}"
-            
-            # URLを生成
-            url_slug = new_name.replace('株式会社', '').replace(' ', '-').lower()
-            new_url = f"https://example-{variation_index}-{url_slug[:20]}.com"
-            
-            # 売上・従業員・設立年を生成
-            # ベース企業の売上規模を保持（±10%の範囲でバリエーション）
-            base_revenue = base.get('revenue_value', 50)
-            revenue = int(base_revenue * random.uniform(0.9, 1.1))
-            profit_rate = random.uniform(0.05, 0.15)
-            profit = round(revenue * profit_rate, 1)
-            
-            emp_min, emp_max = random.choice(employee_ranges)
-            employees = random.randint(emp_min, emp_max)
-            
-            year = random.choice(years)
-            
-            # 事業内容は元のsnippetをベースに数値を変更
-            original_snippet = base['snippet']
-            new_snippet = original_snippet
-            
-            # 数値を置き換え
-            import re
-            new_snippet = re.sub(r'\d{4}年設立', f'{year}年設立', new_snippet)
-            new_snippet = re.sub(r'従業員\d+名', f'従業員{employees}名', new_snippet)
-            new_snippet = re.sub(r'売上高\d+億円', f'売上高{revenue}億円', new_snippet)
-            new_snippet = re.sub(r'営業利益\d+(\.\d+)?億円', f'営業利益{profit}億円', new_snippet)
-            
-            # 新しい企業データを追加
-            result.append({
-                'title': f'株式会社{new_name} | {base["title"].split(" | ")[1] if " | " in base["title"] else ""}',
-                'url': new_url,
-                'snippet': new_snippet,
-                'revenue_value': revenue
-            })
-        
-        return result[:target_count]
+        return result
     
-    def _get_sample_data_by_industry(self, industry: str, revenue: str) -> List[Dict]:
+    def _get_base_companies(self, industry: str) -> List[Dict]:
         """
-        業界と売上規模に基づいたサンプルデータを生成（最大100社）
+        業界別の基本サンプルデータを取得
         """
         # 業界別の基本サンプルデータ定義
         industry_data = {
@@ -766,52 +893,45 @@ class CompanySearch:
         default_data = industry_data.get('it_saas', [])
         
         # 指定された業界の基本データを取得
-        base_companies = industry_data.get(industry, default_data)
-        
-        # 基本データを100社分に拡張
-        companies = self._generate_company_variations(base_companies, target_count=100)
-        
-        # 売上規模でフィルタリング
-        revenue_ranges = {
-            'under10': (0, 10),
-            '10to30': (10, 30),
-            '30to50': (30, 50),
-            '50to100': (50, 100),
-            '100to300': (100, 300),
-            '300to500': (300, 500),
-            '500to1000': (500, 1000),
-            'over1000': (1000, 10000)
-        }
-        
-        min_rev, max_rev = revenue_ranges.get(revenue, (0, 10000))
-        
-        # 売上規模でフィルタリング
-        filtered = [c for c in companies if min_rev <= c.get('revenue_value', 0) < max_rev]
-        
-        # フィルタ結果が十分にあればそれを返す
-        if len(filtered) >= 100:
-            return filtered[:100]
+        return industry_data.get(industry, default_data)
+    
+    def _get_candidate_pool(self, industry: str) -> List[Dict]:
+        """
+        業界の候補企業プールを生成（最大100社）
         
-        # フィルタ結果が少ない場合は、近い売上規模の企業も含める
-        # まず、条件に合う企業を優先
-        result = filtered.copy()
+        プールはシード固定で毎回同じになるため、業界ごとにキャッシュする
+        """
+        pool = self._candidate_pools.get(industry)
+        metrics.record_cache('candidate_pool', pool is not None)
+        if pool is not None:
+            return pool
         
-        # 不足している場合、売上規模に近い企業から順に追加
-        if len(result) < 100:
-            # フィルタ外の企業を売上規模の近さでソート
-            other_companies = [c for c in companies if c not in filtered]
-            
-            # 目標売上範囲の中央値
-            target_revenue = (min_rev + max_rev) / 2
-            
-            # 目標値との差でソート（近い順）
-            other_companies.sort(key=lambda c: abs(c.get('revenue_value', 0) - target_revenue))
-            
-            # 必要な数だけ追加
-            needed = 100 - len(result)
-            result.extend(other_companies[:needed])
+        base_companies = self._get_base_companies(industry)
         
-        return result[:100]  # 最大100社
+        # 基本データを100社分に拡張
+        pool = self._generate_company_variations(base_companies, target_count=100)
+        self._candidate_pools[industry] = pool
+        return pool
+    
+    def _rank_candidates(self, candidates: List[Dict], revenue: str, num_companies: int,
+                         keyword_scores: Optional[List[float]] = None,
+                         weights: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """
+        候補企業を適合度スコアで順位付けし、上位から指定数を返す
+        """
+        revenue_range = REVENUE_RANGES.get(revenue, (0, 10000))
+        scorer = LeadScorer(weights)
+        return scorer.rank(candidates, num_companies, revenue_range,
+                           domain_keywords=BUSINESS_DOMAIN_KEYWORDS,
+                           keyword_scores=keyword_scores)
+    
+    def _get_sample_data_by_industry(self, industry: str, revenue: str,
+                                     weights: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """
+        業界と売上規模に基づいたサンプルデータを生成（最大100社）
+        """
+        candidates = self._get_candidate_pool(industry)
+        return self._rank_candidates(candidates, revenue, 100, weights=weights)
     
     def _get_sample_data(self, num_companies: int) -> List[Dict]:
         """
@@ -3,13 +3,24 @@
 API キーや検索設定などを管理
 """
 
+import os
+
 # Google検索API設定（オプション - より高精度な検索を行う場合）
 GOOGLE_API_KEY = ""  # Google Custom Search API キー
 GOOGLE_CSE_ID = ""   # Google Custom Search Engine ID
 
 # 検索設定
+SEARCH_ENGINE_URL = os.getenv('SEARCH_ENGINE_URL', 'https://www.google.com/search')  # 検索エンジンのURL
 MAX_SEARCH_RESULTS = 10  # 各検索での最大結果数
-SEARCH_TIMEOUT = 30      # 検索タイムアウト（秒）
+COMPANY_OVERFETCH_FACTOR = float(os.getenv('COMPANY_OVERFETCH_FACTOR', '2'))  # 企業数の何倍の候補を並行して取得するか（1以下で無効: 1社ずつ順に取得）
+COMPANY_FETCH_WORKERS = int(os.getenv('COMPANY_FETCH_WORKERS', '4'))  # 候補の企業ページを並行して取得するスレッド数
+SEARCH_TIMEOUT = float(os.getenv('SEARCH_TIMEOUT', '30'))  # Webサービス・ワーカーの1件の検索の締め切り（秒、0で無制限）。過ぎた場合はそこまでの結果を返す
+CLI_SEARCH_TIMEOUT = float(os.getenv('CLI_SEARCH_TIMEOUT', '0'))  # コマンドライン版（main.py）の1件の検索の締め切り（秒、0で無制限。--timeout でも指定できる）
+
+# 企業ページの解析・抽出を別プロセスで実行する（parse_pool.py）
+PARSE_PROCESSES = int(os.getenv('PARSE_PROCESSES', '0'))  # 子プロセス数（0: 取得したスレッドで解析）
+PARSE_BATCH_SIZE = int(os.getenv('PARSE_BATCH_SIZE', '8'))  # 1回で子プロセスに送る解析の最大数
+PARSE_BATCH_WAIT = float(os.getenv('PARSE_BATCH_WAIT', '0.005'))  # 他の解析をまとめて送るために待つ秒数
 
 # SNS検索設定
 FACEBOOK_SEARCH_ENABLED = True
@@ -18,10 +29,57 @@ TWITTER_SEARCH_ENABLED = True
 # 出力設定
 OUTPUT_DIR = "output"
 OUTPUT_FILENAME = "sales_leads_{timestamp}.csv"
+RUN_CHECKPOINT_DIR = os.getenv('RUN_CHECKPOINT_DIR', os.path.join(OUTPUT_DIR, 'runs'))  # main.py の実行ごとの途中経過（--resume で再開。空で保存しない）
 
 # ユーザーエージェント
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
 # リクエスト間隔（秒） - サーバーに負荷をかけないため
-REQUEST_DELAY = 2
+REQUEST_DELAY = float(os.getenv('REQUEST_DELAY', '2'))
+# 同じホストへのリクエスト間隔（秒、0で無効）。すべてのスレッドで共有する（main.py --batch は --host-interval で指定）
+HOST_REQUEST_INTERVAL = float(os.getenv('HOST_REQUEST_INTERVAL', '0'))
+
+# メモリ内データストアの設定（USE_MEMORY_DB=true の場合）
+MEMORY_DB_CAPACITY = int(os.getenv('MEMORY_DB_CAPACITY', '500'))  # 保持する検索数の上限（0で無制限）
+MEMORY_DB_TTL = float(os.getenv('MEMORY_DB_TTL', '86400'))  # 検索を保持する秒数（0で無期限）
+MEMORY_DB_COMPRESS_MIN_BYTES = int(os.getenv('MEMORY_DB_COMPRESS_MIN_BYTES', '65536'))  # この大きさ以上の結果を圧縮（0で無効）
+
+# 検索ジョブの実行方法
+#   inline: Webサービスのプロセス内（scheduler.py のスケジューラー）で実行
+#   worker: 検索を保存するだけにして、worker.py のプロセスが取得して実行（共有のデータベースが必要）
+JOB_EXECUTION = os.getenv('JOB_EXECUTION', 'inline').lower()
+WORKER_LEASE_SECONDS = float(os.getenv('WORKER_LEASE_SECONDS', '60'))  # リースの有効期間（ハートビートで延長）
+WORKER_POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', '2'))  # 実行待ちがない場合の待機時間
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '1'))  # 1プロセスあたりの同時実行数
+WORKER_MAX_ATTEMPTS = int(os.getenv('WORKER_MAX_ATTEMPTS', '3'))  # ワーカーが停止した検索を再実行する上限
+WORKER_MAX_JOBS = int(os.getenv('WORKER_MAX_JOBS', '8'))  # 1プロセスが同時に取得しておく検索数（スケジューラーで交互に実行）
+WORKER_CHUNK_SECONDS = float(os.getenv('WORKER_CHUNK_SECONDS', '8'))  # api/worker.py の1回の呼び出しで実行する時間の上限（関数のタイムアウトより短くする）
+CHECKPOINT_INTERVAL = float(os.getenv('CHECKPOINT_INTERVAL', '10'))  # 実行中の検索の途中経過を保存する間隔（秒、0で1社ごと・負の値で保存しない）
+
+# 検索のスケジューリング（scheduler.py）
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', '4'))  # ステップを実行するスレッド数
+SCHEDULER_INTERACTIVE_MAX_COST = int(os.getenv('SCHEDULER_INTERACTIVE_MAX_COST', '30'))  # 優先度の指定がない場合に interactive とみなすコスト（企業数 × (キーマン数 + 1)）の上限
+
+# 検索の受付制御（admission.py）
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'true').lower() == 'true'
+ADMISSION_COST_PER_WORKER = int(os.getenv('ADMISSION_COST_PER_WORKER', '300'))  # 実行待ち・実行中のコストの上限（実行スレッド1つあたり）
+ADMISSION_MAX_JOB_COST = int(os.getenv('ADMISSION_MAX_JOB_COST', '600'))  # 1件の検索のコストの上限（100社 × 5名）
+ADMISSION_MAX_BATCH_COST = int(os.getenv('ADMISSION_MAX_BATCH_COST', '1500'))  # バッチ検索の合計コストの上限（既定の検索条件 × 50件）
+ADMISSION_SUBMITTER_SHARE = float(os.getenv('ADMISSION_SUBMITTER_SHARE', '0.5'))  # 1つの送信者が使える上限の割合
+ADMISSION_INTERACTIVE_HEADROOM = float(os.getenv('ADMISSION_INTERACTIVE_HEADROOM', '0.2'))  # interactive の検索だけが使える上限の超過分の割合
+ADMISSION_SECONDS_PER_COST = float(os.getenv('ADMISSION_SECONDS_PER_COST', '1.0'))  # コスト1あたりの処理時間の見積もり（Retry-After の計算用）
+ADMISSION_WORKERS = int(os.getenv('ADMISSION_WORKERS', '0'))  # 検索を実行するスレッド数の合計（0: inline は SCHEDULER_WORKERS、worker は WORKER_CONCURRENCY）
+
+# バッチ検索（POST /api/search/batch）
+BATCH_MAX_SEARCHES = int(os.getenv('BATCH_MAX_SEARCHES', '50'))  # 1回に受け付ける検索条件の数の上限
+
+# プロファイリング設定
+PROFILE_SEARCHES = os.getenv('PROFILE_SEARCHES', 'false').lower() == 'true'  # すべての検索をプロファイルする
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')  # プロファイルの保存先
+
+# メモリ監視設定（tracemalloc によるジョブ前後のスナップショット差分を記録する）
+TRACK_MEMORY = os.getenv('TRACK_MEMORY', 'false').lower() == 'true'
+
+# 管理用APIのトークン（未設定の場合は管理用APIを無効にする）
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
 
@@ -3,12 +3,14 @@
 検索履歴と結果を保存
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, JSON, inspect, text, or_, and_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 
+from storage import SearchStore, requeue_statuses, restart_checkpoint
+
 Base = declarative_base()
 
 class SearchHistory(Base):
@@ -22,6 +24,21 @@ class SearchHistory(Base):
     status = Column(String(50), default="pending")  # pending, processing, completed, failed
     results = Column(JSON, nullable=True)
     error_message = Column(Text, nullable=True)
+    stats = Column(JSON, nullable=True)  # 処理時間・通信量などの内訳
+    params = Column(JSON(none_as_null=True), nullable=True)  # ワーカーが実行するための検索パラメータ
+    lease_owner = Column(String(200), nullable=True)  # 実行中のワーカーID
+    lease_expires_at = Column(DateTime, nullable=True)  # この時刻を過ぎると他のワーカーが引き継げる
+    heartbeat_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=True)  # ワーカーが取得した回数
+    checkpoint = Column(JSON(none_as_null=True), nullable=True)  # 中断した検索の途中経過（api/worker.py）
+
+class SearchBatch(Base):
+    """バッチ検索テーブル（まとめて受け付けた検索）"""
+    __tablename__ = "search_batches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    search_ids = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 # グローバルなデータベースインスタンス
 _db_instance = None
@@ -29,24 +46,39 @@ _db_instance = None
 def init_db(db_url: str = "sqlite:///./sales_bot.db"):
     """データベースを初期化"""
     global _db_instance
-    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    connect_args = {"check_same_thread": False} if db_url.startswith("sqlite") else {}
+    engine = create_engine(db_url, connect_args=connect_args)
     Base.metadata.create_all(bind=engine)
+    _migrate(engine)
     _db_instance = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _migrate(engine):
+    """既存のテーブルに不足しているカラムを追加"""
+    existing = {column['name'] for column in inspect(engine).get_columns(SearchHistory.__tablename__)}
+    with engine.begin() as connection:
+        for column in SearchHistory.__table__.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(
+                    f"ALTER TABLE {SearchHistory.__tablename__} ADD COLUMN {column.name} {column_type}"
+                ))
+
 def _get_session():
     """セッションを取得"""
     if _db_instance is None:
         init_db()
     return _db_instance()
 
-def create_search(conditions: str, num_companies: int):
+def create_search(conditions: str, num_companies: int, params=None):
     """新しい検索を作成"""
     session = _get_session()
     try:
         search = SearchHistory(
             search_conditions=conditions,
             num_companies=num_companies,
-            status="pending"
+            status="pending",
+            params=params,
+            attempts=0
         )
         session.add(search)
         session.commit()
@@ -55,18 +87,68 @@ def create_search(conditions: str, num_companies: int):
     finally:
         session.close()
 
-def update_search_status(search_id: int, status: str, results=None, error_message=None):
-    """検索ステータスを更新"""
+def create_batch(searches):
+    """複数の検索をまとめて作成（1つのトランザクション）"""
     session = _get_session()
     try:
-        search = session.query(SearchHistory).filter(SearchHistory.id == search_id).first()
-        if search:
-            search.status = status
-            if results:
-                search.results = results
-            if error_message:
-                search.error_message = error_message
-            session.commit()
+        batch = SearchBatch(search_ids=[])
+        session.add(batch)
+        session.flush()
+        rows = [
+            SearchHistory(
+                search_conditions=search['conditions'],
+                num_companies=search['num_companies'],
+                status="pending",
+                params=dict(search['params'], batch_id=batch.id) if search.get('params') is not None else None,
+                attempts=0
+            )
+            for search in searches
+        ]
+        session.add_all(rows)
+        session.flush()
+        batch.search_ids = [row.id for row in rows]
+        session.commit()
+        return batch.id, list(batch.search_ids)
+    finally:
+        session.close()
+
+def get_batch(batch_id: int):
+    """バッチを取得"""
+    session = _get_session()
+    try:
+        batch = session.query(SearchBatch).filter(SearchBatch.id == batch_id).first()
+        if batch:
+            return {
+                'id': batch.id,
+                'search_ids': batch.search_ids or [],
+                'created_at': batch.created_at.isoformat() if batch.created_at else None
+            }
+        return None
+    finally:
+        session.close()
+
+def update_search_status(search_id: int, status: str, results=None, error_message=None, stats=None,
+                         owner=None) -> bool:
+    """検索ステータスを更新（owner を指定した場合はリースを持っているときのみ）。更新した場合は True"""
+    session = _get_session()
+    try:
+        values = {SearchHistory.status: status}
+        if results:
+            values[SearchHistory.results] = results
+        if error_message:
+            values[SearchHistory.error_message] = error_message
+        if stats is not None:
+            values[SearchHistory.stats] = stats
+        # 失敗した検索の途中経過は再実行（requeue_search）のために残す
+        if status == "completed":
+            values[SearchHistory.checkpoint] = None
+
+        query = session.query(SearchHistory).filter(SearchHistory.id == search_id)
+        if owner is not None:
+            query = query.filter(SearchHistory.lease_owner == owner)
+        updated = query.update(values, synchronize_session=False)
+        session.commit()
+        return updated == 1
     finally:
         session.close()
 
@@ -83,6 +165,8 @@ def get_search(search_id: int):
                 'status': search.status,
                 'results': search.results,
                 'error_message': search.error_message,
+                'stats': search.stats,
+                'params': search.params,
                 'created_at': search.created_at.isoformat() if search.created_at else None
             }
         return None
@@ -102,6 +186,8 @@ def get_all_searches(limit: int = 50):
                 'status': s.status,
                 'results': s.results,
                 'error_message': s.error_message,
+                'stats': s.stats,
+                'params': s.params,
                 'created_at': s.created_at.isoformat() if s.created_at else None
             }
             for s in searches
@@ -109,3 +195,236 @@ def get_all_searches(limit: int = 50):
     finally:
         session.close()
 
+
+def _claimable(now: datetime):
+    """ワーカーが取得できる検索（未実行、またはリースが切れた実行中の検索）"""
+    return and_(
+        SearchHistory.params.isnot(None),
+        or_(
+            SearchHistory.status == "pending",
+            # リースが切れた、または途中経過を保存してリースを解除した検索
+            and_(SearchHistory.status == "processing",
+                 or_(SearchHistory.lease_expires_at < now, SearchHistory.lease_expires_at.is_(None)))
+        )
+    )
+
+def claim_job(owner: str, lease_seconds: float, max_attempts: int = 3):
+    """
+    実行待ちの検索を1件取得してリースを設定（取得できなければ None）
+
+    候補を選んだあと、同じ条件つきの UPDATE で取得するため、
+    複数のワーカーが同時に呼んでも同じ検索を取得するのは1つだけ
+    """
+    session = _get_session()
+    try:
+        for _ in range(10):
+            now = datetime.utcnow()
+            candidate = session.query(SearchHistory.id, SearchHistory.attempts) \
+                .filter(_claimable(now)).order_by(SearchHistory.id).first()
+            if candidate is None:
+                return None
+
+            condition = session.query(SearchHistory).filter(SearchHistory.id == candidate.id, _claimable(now))
+            attempts = candidate.attempts or 0
+            if attempts >= max_attempts:
+                # ワーカーが何度も途中で停止した検索は諦める
+                condition.update({
+                    SearchHistory.status: "failed",
+                    SearchHistory.error_message: f"ワーカーが{attempts}回停止したため中断しました",
+                    SearchHistory.lease_owner: None,
+                    SearchHistory.lease_expires_at: None
+                }, synchronize_session=False)
+                session.commit()
+                continue
+
+            updated = condition.update({
+                SearchHistory.status: "processing",
+                SearchHistory.lease_owner: owner,
+                SearchHistory.lease_expires_at: now + timedelta(seconds=lease_seconds),
+                SearchHistory.heartbeat_at: now,
+                SearchHistory.attempts: attempts + 1
+            }, synchronize_session=False)
+            session.commit()
+
+            if updated == 1:
+                search = session.query(SearchHistory).filter(SearchHistory.id == candidate.id).first()
+                return {
+                    'id': search.id,
+                    'params': search.params,
+                    'attempts': search.attempts,
+                    'checkpoint': search.checkpoint
+                }
+            # 他のワーカーが先に取得した
+        return None
+    finally:
+        session.close()
+
+def renew_lease(search_id: int, owner: str, lease_seconds: float) -> bool:
+    """リースを延長（ハートビート）。リースを失っていた場合は False"""
+    session = _get_session()
+    try:
+        now = datetime.utcnow()
+        updated = session.query(SearchHistory).filter(
+            SearchHistory.id == search_id,
+            SearchHistory.lease_owner == owner,
+            SearchHistory.status == "processing"
+        ).update({
+            SearchHistory.lease_expires_at: now + timedelta(seconds=lease_seconds),
+            SearchHistory.heartbeat_at: now
+        }, synchronize_session=False)
+        session.commit()
+        return updated == 1
+    finally:
+        session.close()
+
+def release_lease(search_id: int, owner: str):
+    """リースを解除"""
+    session = _get_session()
+    try:
+        session.query(SearchHistory).filter(
+            SearchHistory.id == search_id,
+            SearchHistory.lease_owner == owner
+        ).update({
+            SearchHistory.lease_owner: None,
+            SearchHistory.lease_expires_at: None
+        }, synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+
+def save_checkpoint(search_id: int, owner: str, checkpoint) -> bool:
+    """途中経過を保存して取得回数を0に戻す。リースを失っていた場合は False"""
+    session = _get_session()
+    try:
+        updated = session.query(SearchHistory).filter(
+            SearchHistory.id == search_id,
+            SearchHistory.lease_owner == owner,
+            SearchHistory.status == "processing"
+        ).update({
+            SearchHistory.checkpoint: checkpoint,
+            SearchHistory.attempts: 0
+        }, synchronize_session=False)
+        session.commit()
+        return updated == 1
+    finally:
+        session.close()
+
+def save_progress(search_id: int, checkpoint) -> bool:
+    """リースのない実行中の検索の途中経過を保存"""
+    session = _get_session()
+    try:
+        updated = session.query(SearchHistory).filter(
+            SearchHistory.id == search_id,
+            SearchHistory.lease_owner.is_(None),
+            SearchHistory.status == "processing"
+        ).update({
+            SearchHistory.checkpoint: checkpoint
+        }, synchronize_session=False)
+        session.commit()
+        return updated == 1
+    finally:
+        session.close()
+
+def requeue_search(search_id: int, force: bool = False):
+    """失敗した検索を実行待ちに戻す（ステータスつきの UPDATE で、同時に呼ばれても戻すのは1回だけ）"""
+    session = _get_session()
+    try:
+        statuses = requeue_statuses(force)
+        search = session.query(SearchHistory).filter(
+            SearchHistory.id == search_id, SearchHistory.status.in_(statuses)).first()
+        if search is None:
+            return None
+        checkpoint = restart_checkpoint(search.checkpoint)
+        params = search.params
+        updated = session.query(SearchHistory).filter(
+            SearchHistory.id == search_id,
+            SearchHistory.status == search.status
+        ).update({
+            SearchHistory.status: "pending",
+            SearchHistory.error_message: None,
+            SearchHistory.lease_owner: None,
+            SearchHistory.lease_expires_at: None,
+            SearchHistory.attempts: 0,
+            SearchHistory.checkpoint: checkpoint
+        }, synchronize_session=False)
+        session.commit()
+        if updated != 1:
+            return None
+        return {'id': search_id, 'params': params, 'checkpoint': checkpoint}
+    finally:
+        session.close()
+
+def count_pending() -> int:
+    """実行待ちの検索数"""
+    session = _get_session()
+    try:
+        return session.query(SearchHistory).filter(_claimable(datetime.utcnow())).count()
+    finally:
+        session.close()
+
+def get_active_params():
+    """実行待ち・実行中の検索のパラメータ"""
+    session = _get_session()
+    try:
+        rows = session.query(SearchHistory.params).filter(
+            SearchHistory.params.isnot(None),
+            SearchHistory.status.in_(("pending", "processing"))
+        ).all()
+        return [row.params for row in rows]
+    finally:
+        session.close()
+
+
+class SQLSearchStore(SearchStore):
+    """SQLAlchemy のデータベースに保存するバックエンド"""
+    name = 'sql'
+
+    def __init__(self, db_url: str = "sqlite:///./sales_bot.db"):
+        self.db_url = db_url
+
+    def init_db(self):
+        init_db(self.db_url)
+
+    def create_search(self, conditions: str, num_companies: int, params=None) -> int:
+        return create_search(conditions, num_companies, params)
+
+    def get_search(self, search_id: int):
+        return get_search(search_id)
+
+    def update_search_status(self, search_id: int, status: str, results=None, error_message=None, stats=None,
+                             owner=None) -> bool:
+        return update_search_status(search_id, status, results=results, error_message=error_message, stats=stats,
+                                    owner=owner)
+
+    def get_all_searches(self, limit: int = 50):
+        return get_all_searches(limit)
+
+    def create_batch(self, searches):
+        return create_batch(searches)
+
+    def get_batch(self, batch_id: int):
+        return get_batch(batch_id)
+
+    def claim_job(self, owner: str, lease_seconds: float, max_attempts: int = 3):
+        return claim_job(owner, lease_seconds, max_attempts)
+
+    def renew_lease(self, search_id: int, owner: str, lease_seconds: float) -> bool:
+        return renew_lease(search_id, owner, lease_seconds)
+
+    def release_lease(self, search_id: int, owner: str):
+        release_lease(search_id, owner)
+
+    def save_checkpoint(self, search_id: int, owner: str, checkpoint) -> bool:
+        return save_checkpoint(search_id, owner, checkpoint)
+
+    def save_progress(self, search_id: int, checkpoint) -> bool:
+        return save_progress(search_id, checkpoint)
+
+    def requeue_search(self, search_id: int, force: bool = False):
+        return requeue_search(search_id, force)
+
+    def count_pending(self) -> int:
+        return count_pending()
+
+    def get_active_params(self):
+        return get_active_params()
@@ -1,12 +1,126 @@
 """
 メモリ内データストア（Vercel Serverless Functions用）
+
+件数の上限（MEMORY_DB_CAPACITY）を超えると終了した検索のうち最も長く参照されていないものから削除し、
+作成から MEMORY_DB_TTL 秒を過ぎた検索も削除する。
+大きな結果は zlib で圧縮して保持する（MEMORY_DB_COMPRESS_MIN_BYTES）
 """
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+import metrics
+from storage import SearchStore, requeue_statuses, restart_checkpoint
+from config import MEMORY_DB_CAPACITY, MEMORY_DB_TTL, MEMORY_DB_COMPRESS_MIN_BYTES
 
-# メモリ内データストア
-_searches = {}
+# メモリ内データストア（参照順: 末尾が最近参照したもの）
+_searches: 'OrderedDict[int, Dict]' = OrderedDict()
+# 作成順の索引（検索ID -> 作成時刻）。新しい順の一覧と期限切れの削除に使う
+_created: 'OrderedDict[int, float]' = OrderedDict()
 _search_counter = 0
+# バッチ検索（バッチID -> バッチ。作成順、件数の上限は検索と同じ）
+_batches: 'OrderedDict[int, Dict]' = OrderedDict()
+_batch_counter = 0
+_lock = threading.RLock()
+
+EVICTIONS = metrics.counter(
+    'sales_bot_memory_store_evictions_total', 'メモリ内データストアから削除した検索数（reason=capacity|ttl）',
+    ['reason'])
+
+
+class _CompressedResults:
+    """
+    zlib で圧縮した検索結果
+    """
+    __slots__ = ('data', 'count')
+
+    def __init__(self, data: bytes, count: int):
+        self.data = data
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def decode(self) -> List[Dict]:
+        return json.loads(zlib.decompress(self.data).decode('utf-8'))
+
+
+def _encode_results(results: List[Dict]):
+    """
+    大きな結果を圧縮（MEMORY_DB_COMPRESS_MIN_BYTES が0以下なら圧縮しない）
+    """
+    if MEMORY_DB_COMPRESS_MIN_BYTES <= 0 or not results:
+        return results
+    payload = json.dumps(results, ensure_ascii=False).encode('utf-8')
+    if len(payload) < MEMORY_DB_COMPRESS_MIN_BYTES:
+        return results
+    return _CompressedResults(zlib.compress(payload), len(results))
+
+
+# ワーカー用の内部の項目（呼び出し元には返さない）
+_LEASE_FIELDS = ('lease_owner', 'lease_expires_at', 'attempts', 'checkpoint')
+
+
+def _export(record: Dict) -> Dict:
+    """
+    呼び出し元に返す形（ワーカー用の項目を除き、圧縮された結果は展開したコピー）
+    """
+    exported = {key: value for key, value in record.items() if key not in _LEASE_FIELDS}
+    if isinstance(exported['results'], _CompressedResults):
+        exported['results'] = exported['results'].decode()
+    return exported
+
+
+# 上限超過では削除しない状態
+_ACTIVE_STATUSES = ('pending', 'processing')
+
+
+def _delete(search_id: int):
+    _searches.pop(search_id, None)
+    _created.pop(search_id, None)
+
+
+def _evict(now: float):
+    """
+    期限切れ・上限超過の検索を削除
+    """
+    if MEMORY_DB_TTL > 0:
+        # 作成順に並んでいるので、期限内のものが見つかった時点で終了
+        while _created:
+            search_id, created = next(iter(_created.items()))
+            if now - created < MEMORY_DB_TTL:
+                break
+            _delete(search_id)
+            EVICTIONS.inc(reason='ttl')
+
+    if MEMORY_DB_CAPACITY > 0 and len(_searches) > MEMORY_DB_CAPACITY:
+        # 実行待ち・実行中の検索は削除しない（完了時の更新が失われるため）。
+        # それらで上限を超えている間は、終了した検索が出るまで上限を超えて保持する
+        excess = len(_searches) - MEMORY_DB_CAPACITY
+        finished = [search_id for search_id, record in _searches.items()
+                    if record['status'] not in _ACTIVE_STATUSES]
+        for search_id in finished[:excess]:
+            _delete(search_id)
+            EVICTIONS.inc(reason='capacity')
+
+
+def _lookup(search_id: int) -> Optional[Dict]:
+    """
+    検索を取得して最近参照したものとして記録（期限切れの場合は削除して None）
+    """
+    record = _searches.get(search_id)
+    if record is None:
+        return None
+    if MEMORY_DB_TTL > 0 and time.monotonic() - _created[search_id] >= MEMORY_DB_TTL:
+        _delete(search_id)
+        EVICTIONS.inc(reason='ttl')
+        return None
+    _searches.move_to_end(search_id)
+    return record
 
 
 def init_db():
@@ -14,55 +128,282 @@ def init_db():
     pass
 
 
-def create_search(conditions: str, num_companies: int) -> int:
+def create_search(conditions: str, num_companies: int, params: Optional[Dict] = None) -> int:
     """新しい検索を作成"""
     global _search_counter
-    _search_counter += 1
-    
-    search_id = _search_counter
-    _searches[search_id] = {
-        'id': search_id,
-        'conditions': conditions,
-        'num_companies': num_companies,
-        'status': 'pending',
-        'results': None,
-        'error_message': None,
-        'created_at': datetime.now().isoformat(),
-        'updated_at': datetime.now().isoformat()
-    }
-    
+    with _lock:
+        _search_counter += 1
+
+        search_id = _search_counter
+        _searches[search_id] = {
+            'id': search_id,
+            'conditions': conditions,
+            'num_companies': num_companies,
+            'status': 'pending',
+            'results': None,
+            'error_message': None,
+            'stats': None,
+            'params': params,
+            'lease_owner': None,
+            'lease_expires_at': None,
+            'attempts': 0,
+            'checkpoint': None,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat()
+        }
+        now = time.monotonic()
+        _created[search_id] = now
+        _evict(now)
+
     return search_id
 
 
+def create_batch(searches: List[Dict]) -> Tuple[int, List[int]]:
+    """複数の検索をまとめて作成"""
+    global _batch_counter
+    with _lock:
+        _batch_counter += 1
+        batch_id = _batch_counter
+        search_ids = [
+            create_search(search['conditions'], search['num_companies'],
+                          dict(search['params'], batch_id=batch_id) if search.get('params') is not None else None)
+            for search in searches
+        ]
+        _batches[batch_id] = {
+            'id': batch_id,
+            'search_ids': search_ids,
+            'created_at': datetime.now().isoformat()
+        }
+        while MEMORY_DB_CAPACITY > 0 and len(_batches) > MEMORY_DB_CAPACITY:
+            _batches.popitem(last=False)
+    return batch_id, search_ids
+
+
+def get_batch(batch_id: int) -> Optional[Dict]:
+    """バッチを取得"""
+    with _lock:
+        batch = _batches.get(batch_id)
+        return dict(batch, search_ids=list(batch['search_ids'])) if batch is not None else None
+
+
 def get_search(search_id: int) -> Optional[Dict]:
     """検索情報を取得"""
-    return _searches.get(search_id)
+    with _lock:
+        record = _lookup(search_id)
+    return _export(record) if record is not None else None
+
+
+def update_search_status(search_id: int, status: str,
+                        results: Optional[List[Dict]] = None,
+                        error_message: Optional[str] = None,
+                        stats: Optional[Dict] = None,
+                        owner: Optional[str] = None) -> bool:
+    """検索ステータスを更新（owner を指定した場合はリースを持っているときのみ）。更新した場合は True"""
+    if results is not None:
+        # 圧縮はロックの外で行う
+        results = _encode_results(results)
 
+    with _lock:
+        record = _lookup(search_id)
+        if record is None or (owner is not None and record['lease_owner'] != owner):
+            return False
+
+        record['status'] = status
+        record['updated_at'] = datetime.now().isoformat()
 
-def update_search_status(search_id: int, status: str, 
-                        results: Optional[List[Dict]] = None, 
-                        error_message: Optional[str] = None):
-    """検索ステータスを更新"""
-    if search_id in _searches:
-        _searches[search_id]['status'] = status
-        _searches[search_id]['updated_at'] = datetime.now().isoformat()
-        
         if results is not None:
-            _searches[search_id]['results'] = results
-        
+            record['results'] = results
+
         if error_message is not None:
-            _searches[search_id]['error_message'] = error_message
+            record['error_message'] = error_message
+
+        if stats is not None:
+            record['stats'] = stats
+
+        # 失敗した検索の途中経過は再実行（requeue_search）のために残す
+        if status == 'completed':
+            record['checkpoint'] = None
+        return True
 
 
 def list_searches(limit: int = 10) -> List[Dict]:
-    """検索一覧を取得"""
-    all_searches = sorted(_searches.values(), 
-                         key=lambda x: x['created_at'], 
-                         reverse=True)
-    return all_searches[:limit]
+    """検索一覧を取得（新しい順）"""
+    with _lock:
+        _evict(time.monotonic())
+        records = []
+        for search_id in reversed(_created):
+            if len(records) >= limit:
+                break
+            records.append(_searches[search_id])
+    return [_export(record) for record in records]
 
 
 def get_all_searches(limit: int = 10) -> List[Dict]:
     """検索一覧を取得（別名）"""
     return list_searches(limit)
 
+
+def _claimable(record: Dict, now: float) -> bool:
+    """ワーカーが取得できる検索（未実行、またはリースが切れた・解除された実行中の検索）"""
+    if record.get('params') is None:
+        return False
+    if record['status'] == 'pending':
+        return True
+    return record['status'] == 'processing' and (record['lease_expires_at'] is None
+                                                 or record['lease_expires_at'] < now)
+
+
+def claim_job(owner: str, lease_seconds: float, max_attempts: int = 3) -> Optional[Dict]:
+    """実行待ちの検索を作成順に1件取得してリースを設定"""
+    with _lock:
+        now = time.monotonic()
+        _evict(now)
+        for search_id in _created:
+            record = _searches[search_id]
+            if not _claimable(record, now):
+                continue
+
+            attempts = record['attempts'] or 0
+            if attempts >= max_attempts:
+                # ワーカーが何度も途中で停止した検索は諦める
+                record.update(status='failed', error_message=f"ワーカーが{attempts}回停止したため中断しました",
+                              lease_owner=None, lease_expires_at=None, updated_at=datetime.now().isoformat())
+                continue
+
+            record.update(status='processing', lease_owner=owner, lease_expires_at=now + lease_seconds,
+                          attempts=attempts + 1, updated_at=datetime.now().isoformat())
+            return {
+                'id': search_id,
+                'params': record['params'],
+                'attempts': record['attempts'],
+                'checkpoint': record['checkpoint']
+            }
+    return None
+
+
+def _leased(search_id: int, owner: Optional[str]) -> Optional[Dict]:
+    record = _searches.get(search_id)
+    if record is None or record['lease_owner'] != owner:
+        return None
+    return record
+
+
+def renew_lease(search_id: int, owner: str, lease_seconds: float) -> bool:
+    """リースを延長。リースを失っていた場合は False"""
+    with _lock:
+        record = _leased(search_id, owner)
+        if record is None or record['status'] != 'processing':
+            return False
+        record['lease_expires_at'] = time.monotonic() + lease_seconds
+        return True
+
+
+def release_lease(search_id: int, owner: str):
+    """リースを解除"""
+    with _lock:
+        record = _leased(search_id, owner)
+        if record is not None:
+            record['lease_owner'] = None
+            record['lease_expires_at'] = None
+
+
+def save_checkpoint(search_id: int, owner: str, checkpoint: Dict) -> bool:
+    """途中経過を保存して取得回数を0に戻す。リースを失っていた場合は False"""
+    with _lock:
+        record = _leased(search_id, owner)
+        if record is None or record['status'] != 'processing':
+            return False
+        record['checkpoint'] = checkpoint
+        record['attempts'] = 0
+        return True
+
+
+def save_progress(search_id: int, checkpoint: Dict) -> bool:
+    """リースのない実行中の検索の途中経過を保存"""
+    with _lock:
+        record = _leased(search_id, None)
+        if record is None or record['status'] != 'processing':
+            return False
+        record['checkpoint'] = checkpoint
+        return True
+
+
+def requeue_search(search_id: int, force: bool = False) -> Optional[Dict]:
+    """失敗した検索を実行待ちに戻す"""
+    with _lock:
+        record = _lookup(search_id)
+        if record is None or record['status'] not in requeue_statuses(force):
+            return None
+        record.update(status='pending', error_message=None, lease_owner=None, lease_expires_at=None, attempts=0,
+                      checkpoint=restart_checkpoint(record['checkpoint']), updated_at=datetime.now().isoformat())
+        return {'id': search_id, 'params': record['params'], 'checkpoint': record['checkpoint']}
+
+
+def count_pending() -> int:
+    """実行待ちの検索数"""
+    with _lock:
+        now = time.monotonic()
+        return sum(1 for record in _searches.values() if _claimable(record, now))
+
+
+def get_active_params() -> List[Dict]:
+    """実行待ち・実行中の検索のパラメータ"""
+    with _lock:
+        return [record['params'] for record in _searches.values()
+                if record['params'] is not None and record['status'] in ('pending', 'processing')]
+
+
+class MemorySearchStore(SearchStore):
+    """
+    プロセス内のメモリに保存するバックエンド（他のプロセス・インスタンスからは見えない）
+
+    リースは同じプロセス内のワーカー（スケジューラー・api/worker.py の開発用サーバーなど）でのみ有効
+    """
+    name = 'memory'
+
+    def create_search(self, conditions: str, num_companies: int, params: Optional[Dict] = None) -> int:
+        return create_search(conditions, num_companies, params)
+
+    def get_search(self, search_id: int) -> Optional[Dict]:
+        return get_search(search_id)
+
+    def update_search_status(self, search_id: int, status: str,
+                             results: Optional[List[Dict]] = None,
+                             error_message: Optional[str] = None,
+                             stats: Optional[Dict] = None,
+                             owner: Optional[str] = None) -> bool:
+        return update_search_status(search_id, status, results=results, error_message=error_message, stats=stats,
+                                    owner=owner)
+
+    def get_all_searches(self, limit: int = 10) -> List[Dict]:
+        return get_all_searches(limit)
+
+    def create_batch(self, searches: List[Dict]) -> Tuple[int, List[int]]:
+        return create_batch(searches)
+
+    def get_batch(self, batch_id: int) -> Optional[Dict]:
+        return get_batch(batch_id)
+
+    def claim_job(self, owner: str, lease_seconds: float, max_attempts: int = 3) -> Optional[Dict]:
+        return claim_job(owner, lease_seconds, max_attempts)
+
+    def renew_lease(self, search_id: int, owner: str, lease_seconds: float) -> bool:
+        return renew_lease(search_id, owner, lease_seconds)
+
+    def release_lease(self, search_id: int, owner: str):
+        release_lease(search_id, owner)
+
+    def save_checkpoint(self, search_id: int, owner: str, checkpoint: Dict) -> bool:
+        return save_checkpoint(search_id, owner, checkpoint)
+
+    def save_progress(self, search_id: int, checkpoint: Dict) -> bool:
+        return save_progress(search_id, checkpoint)
+
+    def requeue_search(self, search_id: int, force: bool = False) -> Optional[Dict]:
+        return requeue_search(search_id, force)
+
+    def count_pending(self) -> int:
+        return count_pending()
+
+    def get_active_params(self) -> List[Dict]:
+        return get_active_params()
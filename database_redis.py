@@ -0,0 +1,379 @@
+"""
+Redis データストア
+複数のプロセス・サーバーレス関数のインスタンス間で検索状態と結果を共有する
+
+    REDIS_URL=redis://host:6379/0
+    REDIS_KEY_PREFIX=sales_bot       # キーの接頭辞
+    REDIS_SEARCH_TTL=604800          # 検索を保持する秒数（作成・ステータスの更新から。0で無期限）
+
+キー構成:
+    <prefix>:search_id          検索IDの採番（INCR）
+    <prefix>:search:<id>        検索1件（ハッシュ。results・stats・params・checkpoint は JSON 文字列）
+    <prefix>:searches           検索IDの作成順の索引（ソート済みセット、スコアは検索ID）
+    <prefix>:queue              ワーカーが実行する検索（params つき）のうち未完了のもの（ソート済みセット）
+    <prefix>:batch_id           バッチIDの採番（INCR）
+    <prefix>:batch:<id>         バッチ1件（ハッシュ。search_ids は JSON 文字列、TTL は検索と同じ）
+
+リース（lease_owner・lease_expires_at）は WATCH/MULTI で取得・更新し、
+複数のワーカー・サーバーレス関数のインスタンスが同時に呼んでも同じ検索を取得するのは1つだけ。
+ステータスの更新も WATCH/MULTI で検索の存在・リースの確認と書き込みを行い、期限切れの検索を TTL なしで作り直さない
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from storage import SearchStore, requeue_statuses, restart_checkpoint
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# 索引に残す検索IDの上限（ハッシュは TTL で消えるため、索引だけが増え続けないようにする）
+MAX_INDEX_SIZE = 10000
+
+# 1回の取得で確認する実行待ちの検索数
+CLAIM_SCAN = 100
+
+_JSON_FIELDS = ('results', 'stats', 'params')
+_LEASE_FIELDS = ('lease_owner', 'lease_expires_at')
+
+
+class RedisSearchStore(SearchStore):
+    """
+    Redis に保存するバックエンド
+
+    Args:
+        url: 接続先（redis://...）
+        client: 接続済みのクライアント（テスト用の代替実装などを渡す場合）
+    """
+    name = 'redis'
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', client=None):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("redis パッケージがインストールされていません（pip install redis）")
+            client = redis.Redis.from_url(url, decode_responses=True)
+
+        self.client = client
+        self.prefix = os.getenv('REDIS_KEY_PREFIX', 'sales_bot')
+        self.ttl = int(os.getenv('REDIS_SEARCH_TTL', str(7 * 24 * 3600)))
+
+    def _key(self, search_id: int) -> str:
+        return f"{self.prefix}:search:{search_id}"
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.prefix}:searches"
+
+    @property
+    def _queue_key(self) -> str:
+        return f"{self.prefix}:queue"
+
+    def init_db(self):
+        """接続を確認"""
+        self.client.ping()
+
+    def create_search(self, conditions: str, num_companies: int, params: Optional[Dict] = None) -> int:
+        search_id = int(self.client.incr(f"{self.prefix}:search_id"))
+        now = datetime.now().isoformat()
+
+        mapping = {
+            'id': search_id,
+            'conditions': conditions,
+            'num_companies': num_companies,
+            'status': 'pending',
+            'created_at': now,
+            'updated_at': now
+        }
+        if params is not None:
+            mapping['params'] = json.dumps(params, ensure_ascii=False)
+            mapping['attempts'] = 0
+
+        pipe = self.client.pipeline()
+        pipe.hset(self._key(search_id), mapping=mapping)
+        if self.ttl > 0:
+            pipe.expire(self._key(search_id), self.ttl)
+        pipe.zadd(self._index_key, {str(search_id): search_id})
+        pipe.zremrangebyrank(self._index_key, 0, -MAX_INDEX_SIZE - 1)
+        if params is not None:
+            pipe.zadd(self._queue_key, {str(search_id): search_id})
+        pipe.execute()
+
+        return search_id
+
+    def _decode(self, data: Dict[str, str]) -> Optional[Dict]:
+        if not data:
+            return None
+        search = {
+            'id': int(data['id']),
+            'conditions': data.get('conditions'),
+            'num_companies': int(data['num_companies']) if data.get('num_companies') else None,
+            'status': data.get('status'),
+            'results': None,
+            'error_message': data.get('error_message'),
+            'stats': None,
+            'params': None,
+            'created_at': data.get('created_at'),
+            'updated_at': data.get('updated_at')
+        }
+        for field in _JSON_FIELDS:
+            if data.get(field):
+                search[field] = json.loads(data[field])
+        return search
+
+    def get_search(self, search_id: int) -> Optional[Dict]:
+        return self._decode(self.client.hgetall(self._key(search_id)))
+
+    def update_search_status(self, search_id: int, status: str,
+                             results: Optional[List[Dict]] = None,
+                             error_message: Optional[str] = None,
+                             stats: Optional[Dict] = None,
+                             owner: Optional[str] = None) -> bool:
+        key = self._key(search_id)
+        mapping = {'status': status, 'updated_at': datetime.now().isoformat()}
+        if results is not None:
+            mapping['results'] = json.dumps(results, ensure_ascii=False)
+        if error_message is not None:
+            mapping['error_message'] = error_message
+        if stats is not None:
+            mapping['stats'] = json.dumps(stats, ensure_ascii=False)
+
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    # 期限切れ・削除済みの検索を作り直さない（確認から更新までに消えた場合は WatchError で確認し直す）
+                    exists, lease_owner = pipe.exists(key), pipe.hget(key, 'lease_owner')
+                    if not exists or (owner is not None and lease_owner != owner):
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    pipe.hset(key, mapping=mapping)
+                    if self.ttl > 0:
+                        pipe.expire(key, self.ttl)
+                    if status in ('completed', 'failed'):
+                        # 失敗した検索の途中経過は再実行（requeue_search）のために残す
+                        if status == 'completed':
+                            pipe.hdel(key, 'checkpoint')
+                        pipe.zrem(self._queue_key, str(search_id))
+                    pipe.execute()
+                    return True
+                except redis.WatchError:
+                    continue
+
+    def get_all_searches(self, limit: int = 50) -> List[Dict]:
+        search_ids = self.client.zrevrange(self._index_key, 0, limit - 1)
+        if not search_ids:
+            return []
+
+        pipe = self.client.pipeline()
+        for search_id in search_ids:
+            pipe.hgetall(self._key(int(search_id)))
+
+        searches = []
+        expired = []
+        for search_id, data in zip(search_ids, pipe.execute()):
+            search = self._decode(data)
+            if search is None:
+                expired.append(search_id)
+            else:
+                searches.append(search)
+
+        # TTL で消えた検索を索引からも削除
+        if expired:
+            self.client.zrem(self._index_key, *expired)
+
+        return searches
+
+    # ---- バッチ検索 ----
+
+    def _batch_key(self, batch_id: int) -> str:
+        return f"{self.prefix}:batch:{batch_id}"
+
+    def create_batch(self, searches: List[Dict]) -> Tuple[int, List[int]]:
+        batch_id = int(self.client.incr(f"{self.prefix}:batch_id"))
+        search_ids = [
+            self.create_search(search['conditions'], search['num_companies'],
+                               dict(search['params'], batch_id=batch_id) if search.get('params') is not None else None)
+            for search in searches
+        ]
+
+        pipe = self.client.pipeline()
+        pipe.hset(self._batch_key(batch_id), mapping={
+            'id': batch_id,
+            'search_ids': json.dumps(search_ids),
+            'created_at': datetime.now().isoformat()
+        })
+        if self.ttl > 0:
+            pipe.expire(self._batch_key(batch_id), self.ttl)
+        pipe.execute()
+
+        return batch_id, search_ids
+
+    def get_batch(self, batch_id: int) -> Optional[Dict]:
+        data = self.client.hgetall(self._batch_key(batch_id))
+        if not data:
+            return None
+        return {
+            'id': int(data['id']),
+            'search_ids': json.loads(data['search_ids']),
+            'created_at': data.get('created_at')
+        }
+
+    # ---- ワーカー用（リースによる検索の取得） ----
+
+    @staticmethod
+    def _claimable(data: Dict[str, str], now: float) -> bool:
+        if not data.get('params'):
+            return False
+        if data.get('status') == 'pending':
+            return True
+        # リースが切れた、または途中経過を保存してリースを解除した検索
+        expires = data.get('lease_expires_at')
+        return data.get('status') == 'processing' and (not expires or float(expires) < now)
+
+    def claim_job(self, owner: str, lease_seconds: float, max_attempts: int = 3) -> Optional[Dict]:
+        for search_id in self.client.zrange(self._queue_key, 0, CLAIM_SCAN - 1):
+            key = self._key(int(search_id))
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(key)
+                    data = pipe.hgetall(key)
+                    if not data:
+                        # TTL で消えた検索
+                        pipe.unwatch()
+                        self.client.zrem(self._queue_key, search_id)
+                        continue
+                    now = time.time()
+                    if not self._claimable(data, now):
+                        pipe.unwatch()
+                        continue
+
+                    attempts = int(data.get('attempts') or 0)
+                    pipe.multi()
+                    if attempts >= max_attempts:
+                        # ワーカーが何度も途中で停止した検索は諦める
+                        pipe.hset(key, mapping={
+                            'status': 'failed',
+                            'error_message': f"ワーカーが{attempts}回停止したため中断しました",
+                            'updated_at': datetime.now().isoformat()
+                        })
+                        pipe.hdel(key, *_LEASE_FIELDS)
+                        pipe.zrem(self._queue_key, search_id)
+                        pipe.execute()
+                        continue
+
+                    pipe.hset(key, mapping={
+                        'status': 'processing',
+                        'lease_owner': owner,
+                        'lease_expires_at': now + lease_seconds,
+                        'heartbeat_at': now,
+                        'attempts': attempts + 1,
+                        'updated_at': datetime.now().isoformat()
+                    })
+                    pipe.execute()
+                except redis.WatchError:
+                    # 他のワーカーが先に更新した
+                    continue
+
+            return {
+                'id': int(search_id),
+                'params': json.loads(data['params']),
+                'attempts': attempts + 1,
+                'checkpoint': json.loads(data['checkpoint']) if data.get('checkpoint') else None
+            }
+        return None
+
+    def _update_leased(self, search_id: int, owner: Optional[str], mapping: Optional[Dict] = None,
+                       delete: tuple = (), require_processing: bool = True) -> bool:
+        """リースを持っている場合のみ検索を更新"""
+        key = self._key(search_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    lease_owner, status = pipe.hmget(key, 'lease_owner', 'status')
+                    if lease_owner != owner or (require_processing and status != 'processing'):
+                        pipe.unwatch()
+                        return False
+                    pipe.multi()
+                    if mapping:
+                        pipe.hset(key, mapping=mapping)
+                    if delete:
+                        pipe.hdel(key, *delete)
+                    pipe.execute()
+                    return True
+                except redis.WatchError:
+                    continue
+
+    def renew_lease(self, search_id: int, owner: str, lease_seconds: float) -> bool:
+        now = time.time()
+        return self._update_leased(search_id, owner, {'lease_expires_at': now + lease_seconds, 'heartbeat_at': now})
+
+    def release_lease(self, search_id: int, owner: str):
+        self._update_leased(search_id, owner, delete=_LEASE_FIELDS, require_processing=False)
+
+    def save_checkpoint(self, search_id: int, owner: str, checkpoint: Dict) -> bool:
+        return self._update_leased(search_id, owner, {
+            'checkpoint': json.dumps(checkpoint, ensure_ascii=False),
+            'attempts': 0
+        })
+
+    def save_progress(self, search_id: int, checkpoint: Dict) -> bool:
+        # リースのない（lease_owner が設定されていない）実行中の検索のみ
+        return self._update_leased(search_id, None, {'checkpoint': json.dumps(checkpoint, ensure_ascii=False)})
+
+    def requeue_search(self, search_id: int, force: bool = False) -> Optional[Dict]:
+        key = self._key(search_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    data = pipe.hgetall(key)
+                    if not data or data.get('status') not in requeue_statuses(force):
+                        pipe.unwatch()
+                        return None
+                    checkpoint = restart_checkpoint(json.loads(data['checkpoint']) if data.get('checkpoint') else None)
+                    pipe.multi()
+                    pipe.hset(key, mapping={'status': 'pending', 'attempts': 0,
+                                            'updated_at': datetime.now().isoformat()})
+                    pipe.hdel(key, 'error_message', *_LEASE_FIELDS)
+                    if checkpoint is not None:
+                        pipe.hset(key, 'checkpoint', json.dumps(checkpoint, ensure_ascii=False))
+                    if data.get('params'):
+                        # ワーカーが実行する検索は実行待ちに戻す
+                        pipe.zadd(self._queue_key, {str(search_id): search_id})
+                    pipe.execute()
+                except redis.WatchError:
+                    continue
+                return {
+                    'id': search_id,
+                    'params': json.loads(data['params']) if data.get('params') else None,
+                    'checkpoint': checkpoint
+                }
+
+    def _queued(self, *fields: str) -> List[List[Optional[str]]]:
+        search_ids = self.client.zrange(self._queue_key, 0, -1)
+        if not search_ids:
+            return []
+        pipe = self.client.pipeline()
+        for search_id in search_ids:
+            pipe.hmget(self._key(int(search_id)), *fields)
+        return pipe.execute()
+
+    def count_pending(self) -> int:
+        now = time.time()
+        return sum(
+            1 for params, status, expires in self._queued('params', 'status', 'lease_expires_at')
+            if self._claimable({'params': params, 'status': status, 'lease_expires_at': expires}, now)
+        )
+
+    def get_active_params(self) -> List[Dict]:
+        return [
+            json.loads(params) for params, status in self._queued('params', 'status')
+            if params and status in ('pending', 'processing')
+        ]
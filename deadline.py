@@ -0,0 +1,130 @@
+"""
+締め切りモジュール
+1件の検索の締め切り（SEARCH_TIMEOUT）を企業検索・キーマン特定・SNS検索に渡し、
+個々の通信のタイムアウト・待機時間を残り時間に合わせて短くする
+
+締め切りを過ぎると通信を行わず（DeadlineExceeded）、呼び出し元はそこまでの結果を返す。
+作業を省略した場合は truncated が True になり、検索結果に truncated として記録される
+"""
+
+import math
+import threading
+import time
+from typing import Optional
+
+from config import SEARCH_TIMEOUT
+
+# 残り時間がこれより短い場合は通信を始めない（秒）
+MIN_REQUEST_TIMEOUT = 0.5
+
+
+class DeadlineExceeded(Exception):
+    """締め切りを過ぎたため通信を行わなかった"""
+
+
+class Cancelled(DeadlineExceeded):
+    """取り消された取得のため通信を行わなかった（CancellableDeadline）"""
+
+
+class Deadline:
+    """
+    検索の締め切り
+
+    解析の子プロセス（parse_pool）でも同じ締め切りを確認できるよう、時刻は time.time() で持つ。
+    途中経過を保存して別のプロセスで再開する場合（search_job.run_chunk）は残り時間を保存し、
+    再開した時点から残り時間の締め切りを作り直す
+
+    Args:
+        seconds: 締め切りまでの秒数
+        expires_at: 締め切りの時刻（time.time() の値。指定した場合は seconds より優先）
+    """
+
+    def __init__(self, seconds: float = SEARCH_TIMEOUT, expires_at: Optional[float] = None):
+        self.expires_at = expires_at if expires_at is not None else time.time() + seconds
+        self.truncated = False
+
+    def remaining(self) -> float:
+        """締め切りまでの秒数（過ぎた場合は0）"""
+        return max(self.expires_at - time.time(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def should_stop(self) -> bool:
+        """
+        残りの作業を省略するかどうか（省略する場合は truncated を記録する）
+        """
+        if self.expired:
+            self.truncated = True
+        return self.truncated
+
+    def timeout(self, timeout: float) -> float:
+        """
+        通信のタイムアウトを残り時間に合わせて短くする
+
+        Raises:
+            DeadlineExceeded: 通信を始めるだけの残り時間がない
+        """
+        remaining = self.remaining()
+        if remaining < MIN_REQUEST_TIMEOUT:
+            self.truncated = True
+            raise DeadlineExceeded(f"検索の締め切りを過ぎました（残り {remaining:.1f}秒）")
+        return min(timeout, remaining)
+
+    def sleep_seconds(self, seconds: float) -> float:
+        """待機時間を残り時間に合わせて短くする"""
+        return min(seconds, self.remaining())
+
+
+class CancellableDeadline(Deadline):
+    """
+    途中で取り消せる締め切り（並行して取得する企業候補のうち、不要になった取得の通信を止める）
+
+    parent（検索の締め切り。None の場合は無期限）と同じ時刻に期限が切れ、cancel() の後は残り時間が0になる。
+    http_client.get() は送信の直前に締め切りを確認するため、取り消した後は通信を始めない（Cancelled）。
+    締め切りで打ち切った場合は parent にも truncated を記録し、取り消しによる打ち切りは記録しない
+    """
+
+    def __init__(self, parent: Optional[Deadline] = None):
+        self._parent = parent
+        self._cancelled = threading.Event()
+        super().__init__(expires_at=parent.expires_at if parent is not None else math.inf)
+
+    @property
+    def truncated(self) -> bool:
+        return self._truncated
+
+    @truncated.setter
+    def truncated(self, value: bool):
+        self._truncated = value
+        if value and self._parent is not None and not self.cancelled:
+            self._parent.truncated = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """以降の通信・待機を行わない"""
+        self._cancelled.set()
+
+    def remaining(self) -> float:
+        if self.cancelled:
+            return 0.0
+        return super().remaining()
+
+    def timeout(self, timeout: float) -> float:
+        if self.cancelled:
+            self.truncated = True
+            raise Cancelled("取り消された取得のため通信を行いませんでした")
+        return super().timeout(timeout)
+
+
+def search_deadline(seconds: float = SEARCH_TIMEOUT) -> Optional[Deadline]:
+    """
+    検索の締め切りを作成（seconds が0以下の場合は締め切りなし: None）
+    """
+    if seconds <= 0:
+        return None
+    return Deadline(seconds)
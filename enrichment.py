@@ -0,0 +1,187 @@
+"""
+詳細取得モジュール
+lite モードの検索（検索結果のタイトル・スニペットから作った企業候補のみ）で選ばれた企業について、
+企業ページの詳細情報・キーマン・SNSアカウントを取得し、同じ検索の結果に書き戻す
+
+取得済みの企業は結果の「詳細取得済み」が True になり、再度選ばれても取得し直さない
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import metrics
+from deadline import search_deadline
+from storage import SearchStore
+
+if TYPE_CHECKING:
+    from company_search import CompanySearch
+    from keyman_finder import KeymanFinder
+    from sns_finder import SNSFinder
+
+# 検索モード
+#   full: すべての企業の詳細情報・キーマンを取得
+#   lite: 企業候補のみをすぐに返し、詳細は enrich_search() で選んだ企業だけ取得
+SEARCH_MODES = ('full', 'lite')
+
+ENRICHED_FIELD = '詳細取得済み'
+
+ENRICHED_COMPANIES = metrics.counter(
+    'sales_bot_enriched_companies_total', 'lite モードの検索で詳細を取得した企業数', ('cache',))
+
+# 同じ検索への書き戻しが重ならないようにする（プロセス内のみ。検索IDで分けたロック）
+_LOCK_STRIPES = 64
+_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+
+def validate_mode(mode: Optional[str]) -> str:
+    """
+    検索モードを検証（省略時は full）
+
+    Raises:
+        ValueError: 不明な検索モード
+    """
+    mode = mode or 'full'
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"不明な検索モードです: {mode}（{' / '.join(SEARCH_MODES)}）")
+    return mode
+
+
+def result_row(company: Dict, keyman: Optional[Dict] = None, sns: Optional[Dict] = None,
+               enriched: bool = True) -> Dict:
+    """
+    lite モードの検索結果の1行（詳細の取得前後で同じ列になるようにする）
+    """
+    keyman = keyman or {}
+    sns = sns or {}
+    return {
+        '企業名': company['企業名'],
+        '企業URL': company.get('企業URL', ''),
+        '事業概要': company.get('事業概要', ''),
+        '設立年': company.get('設立年', ''),
+        '売上': company.get('売上', ''),
+        '利益': company.get('利益', ''),
+        '従業員規模': company.get('従業員規模', ''),
+        '事業領域': company.get('事業領域', ''),
+        '注力ポイント': company.get('注力ポイント', ''),
+        'キーマン氏名': keyman.get('氏名', ''),
+        '役職名': keyman.get('役職', ''),
+        'Facebook URL': sns.get('Facebook', ''),
+        'X（旧Twitter） URL': sns.get('X（旧Twitter）', ''),
+        ENRICHED_FIELD: enriched
+    }
+
+
+def lite_rows(companies: List[Dict]) -> List[Dict]:
+    """
+    詳細を取得していない企業候補の結果
+    """
+    return [result_row(company, enriched=False) for company in companies]
+
+
+def _search_lock(search_id: int) -> threading.Lock:
+    return _locks[search_id % _LOCK_STRIPES]
+
+
+def enrich_search(store: SearchStore, company_search: 'CompanySearch', keyman_finder: 'KeymanFinder',
+                  sns_finder: 'SNSFinder', search_id: int, company_names: List[str],
+                  max_keymen: int = 5) -> Dict:
+    """
+    lite モードの検索で選ばれた企業の詳細を取得して、検索の結果に書き戻す
+
+    Args:
+        company_names: 詳細を取得する企業名
+        max_keymen: 1社あたりの最大キーマン数
+
+    Returns:
+        {'search_id', 'enriched'（今回取得した企業名）, 'cached'（取得済みだった企業名）,
+         'results'（選ばれた企業の結果）, 'truncated', 'stats'}
+
+    Raises:
+        KeyError: 検索または企業が見つからない
+        ValueError: 完了していない検索・lite モードでない検索
+    """
+    with _search_lock(search_id):
+        search = store.get_search(search_id)
+        if not search:
+            raise KeyError(f"検索が見つかりません: {search_id}")
+        if search['status'] != 'completed':
+            raise ValueError("完了していない検索の詳細は取得できません")
+
+        results = search['results'] or []
+        if results and ENRICHED_FIELD not in results[0]:
+            raise ValueError("lite モードの検索ではありません（すでにすべての詳細を取得済みです）")
+
+        # 企業ごとの結果（表示順を保つ）
+        rows_by_company: Dict[str, List[Dict]] = {}
+        for row in results:
+            rows_by_company.setdefault(row['企業名'], []).append(row)
+
+        missing = [name for name in company_names if name not in rows_by_company]
+        if missing:
+            raise KeyError(f"検索結果にない企業です: {'、'.join(missing)}")
+
+        selected = list(dict.fromkeys(company_names))
+        cached = [name for name in selected if rows_by_company[name][0][ENRICHED_FIELD]]
+        pending = [name for name in selected if name not in cached]
+
+        stats = search.get('stats') or {}
+        enrichment = dict(stats.get('enrichment') or {})
+        deadline = search_deadline()
+        enriched = []
+        with metrics.collect_stats() as enrich_stats:
+            # サンプル氏名は検索全体で重複しないように、前回の続きから割り当てる
+            names = keyman_finder.name_scope(f"search_{search_id}", enrichment.get('names_used', 0))
+            for name in pending:
+                if deadline is not None and deadline.should_stop():
+                    break
+                rows = _enrich_company(
+                    company_search, keyman_finder, sns_finder, rows_by_company[name][0], max_keymen, names, deadline)
+                if deadline is not None and deadline.truncated:
+                    # 締め切りで途中までになった企業は取得済みにせず、次の呼び出しで取得し直す
+                    break
+                rows_by_company[name] = rows
+                enriched.append(name)
+
+        ENRICHED_COMPANIES.inc(len(enriched), cache='miss')
+        ENRICHED_COMPANIES.inc(len(cached), cache='hit')
+
+        if enriched:
+            enrichment['companies'] = enrichment.get('companies', 0) + len(enriched)
+            enrichment['names_used'] = names.position
+            enrichment['http_requests'] = enrichment.get('http_requests', 0) + enrich_stats.http_requests
+            enrichment['wall_seconds'] = round(enrichment.get('wall_seconds', 0.0) + enrich_stats.wall_seconds, 3)
+            stats = dict(stats, enrichment=enrichment)
+            results = [row for rows in rows_by_company.values() for row in rows]
+            stats['rows'] = len(results)
+            with metrics.span('db_write'):
+                store.update_search_status(search_id, 'completed', results=results, stats=stats)
+
+        enrich_stats.truncated = deadline is not None and deadline.truncated
+        return {
+            'search_id': search_id,
+            'enriched': enriched,
+            'cached': cached,
+            'results': [row for name in selected for row in rows_by_company[name]],
+            'truncated': enrich_stats.truncated,
+            'stats': enrich_stats.to_dict()
+        }
+
+
+def _enrich_company(company_search: 'CompanySearch', keyman_finder: 'KeymanFinder', sns_finder: 'SNSFinder',
+                    row: Dict, max_keymen: int, names, deadline) -> List[Dict]:
+    print(f"[Enrich] 詳細を取得中: {row['企業名']}")
+    start = time.perf_counter()
+    company = company_search.enrich_company(
+        {'企業名': row['企業名'], '企業URL': row['企業URL'], '事業概要': row['事業概要']}, deadline=deadline)
+    keymen = keyman_finder.find_keymen(company['企業名'], company['企業URL'], max_keymen,
+                                       names=names, deadline=deadline)
+
+    rows = []
+    for keyman in keymen:
+        sns = sns_finder.find_sns_accounts(keyman['氏名'], company['企業名'], keyman['役職'], deadline=deadline)
+        rows.append(result_row(company, keyman, sns))
+    metrics.observe_stage('enrich_company', time.perf_counter() - start)
+
+    # キーマンが見つからなくても取得済みとして記録する
+    return rows or [result_row(company)]
@@ -0,0 +1,147 @@
+"""
+HTTP通信モジュール
+各検索モジュールが共通で使う GET リクエスト
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+import metrics
+from config import REQUEST_DELAY, HOST_REQUEST_INTERVAL
+from deadline import Deadline
+
+# ホスト別メトリクスのラベル数の上限（超えた分は "other" にまとめる）
+MAX_HOST_LABELS = 200
+
+_host_labels = set()
+_host_labels_lock = threading.Lock()
+
+# 同じホストへのリクエスト間隔（秒、0で無効）と、ホストごとの次に送信できる時刻（time.monotonic()）
+_host_interval = HOST_REQUEST_INTERVAL
+_host_next: Dict[str, float] = {}
+_host_next_lock = threading.Lock()
+# 送信時刻を記録するホスト数の上限（超えた場合は間隔を過ぎたホストを削除）
+MAX_TRACKED_HOSTS = 1000
+# 呼び出し元が min_host_interval() で指定した、同じホストへのリクエスト間隔の下限
+_min_host_interval: contextvars.ContextVar = contextvars.ContextVar('min_host_interval', default=0.0)
+
+# URL書き換えフック（ベンチマークでローカルのスタブサーバーに向ける場合などに使用）
+_url_rewriter: Optional[Callable[[str], str]] = None
+
+
+def set_url_rewriter(rewriter: Optional[Callable[[str], str]]):
+    """
+    送信前にURLを書き換える関数を設定（None で解除）
+    """
+    global _url_rewriter
+    _url_rewriter = rewriter
+
+
+def set_host_interval(seconds: float):
+    """
+    同じホストへのリクエスト間隔を設定（0で無効）。複数のスレッドから同じホストに送る場合も、
+    すべてのスレッドを合わせてこの間隔を空ける
+    """
+    global _host_interval
+    with _host_next_lock:
+        _host_interval = max(float(seconds), 0.0)
+        _host_next.clear()
+
+
+@contextmanager
+def min_host_interval(seconds: float):
+    """
+    with ブロック内のリクエストは、同じホストへの間隔を少なくとも seconds 秒空ける（set_host_interval() の間隔と大きい方）。
+    並行して取得する各スレッドが個別に待機する代わりに、すべてのスレッドで共有するホストごとの間隔で待つ
+    """
+    token = _min_host_interval.set(max(float(seconds), 0.0))
+    try:
+        yield
+    finally:
+        _min_host_interval.reset(token)
+
+
+def _wait_for_host(host: str, deadline: Optional[Deadline] = None):
+    """
+    同じホストへの前回のリクエストから間隔が空くまで待つ（締め切りを過ぎて待たない）
+    """
+    interval = _min_host_interval.get()
+    with _host_next_lock:
+        interval = max(interval, _host_interval)
+        if interval <= 0:
+            return
+        now = time.monotonic()
+        if len(_host_next) >= MAX_TRACKED_HOSTS:
+            for expired in [key for key, next_at in _host_next.items() if next_at <= now]:
+                del _host_next[expired]
+        slot = max(now, _host_next.get(host, 0.0))
+        _host_next[host] = slot + interval
+
+    seconds = slot - now
+    if deadline is not None:
+        seconds = deadline.sleep_seconds(seconds)
+    if seconds > 0:
+        time.sleep(seconds)
+        metrics.record_sleep(seconds)
+
+
+def _host_label(host: str) -> str:
+    """
+    メトリクス用のホスト名ラベル（種類数を上限で抑える）
+    """
+    with _host_labels_lock:
+        if host in _host_labels:
+            return host
+        if len(_host_labels) < MAX_HOST_LABELS:
+            _host_labels.add(host)
+            return host
+    return 'other'
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 10,
+        deadline: Optional[Deadline] = None) -> requests.Response:
+    """
+    GETリクエストを送信し、ホストごとの所要時間・通信量を記録
+
+    deadline を指定した場合、タイムアウトを締め切りまでの残り時間に合わせて短くする。
+    set_host_interval()・min_host_interval() で間隔を設定した場合は、同じホストへの前回のリクエストから間隔が空くまで待つ
+
+    Raises:
+        deadline.DeadlineExceeded: 締め切りを過ぎている（通信は行わない）
+    """
+    netloc = urlparse(url).netloc or 'unknown'
+    _wait_for_host(netloc, deadline)
+    if deadline is not None:
+        timeout = deadline.timeout(timeout)
+
+    host = _host_label(netloc)
+    if _url_rewriter is not None:
+        url = _url_rewriter(url)
+
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, headers=headers, timeout=timeout)
+    except Exception:
+        metrics.record_http(host, 'error', time.perf_counter() - start)
+        raise
+
+    metrics.record_http(host, str(response.status_code), time.perf_counter() - start, len(response.content))
+    return response
+
+
+def throttle(seconds: float = REQUEST_DELAY, deadline: Optional[Deadline] = None):
+    """
+    サーバーに負荷をかけないようにリクエスト間隔を空ける（締め切りを過ぎて待たない）
+    """
+    if deadline is not None:
+        seconds = deadline.sleep_seconds(seconds)
+    if seconds <= 0:
+        return
+    time.sleep(seconds)
+    metrics.record_sleep(seconds)
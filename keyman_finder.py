@@ -5,10 +5,42 @@
 
 import requests
 from bs4 import BeautifulSoup
-import time
 import re
-from typing import List, Dict
-from config import USER_AGENT, REQUEST_DELAY
+from typing import List, Dict, Optional
+import http_client
+import lookup_cache
+import metrics
+import parse_pool
+from config import USER_AGENT, SEARCH_ENGINE_URL
+from deadline import Deadline
+from name_allocator import NameAllocator, NameScope
+
+
+# サンプルデータ用の名前リスト（50名分）
+SAMPLE_FIRST_NAMES = [
+    '健一', '大輔', '翔太', '拓也', '直樹', '雄介', '修', '慎一', '和也', '康平',
+    '美穂', '優子', '麻衣', '智子', '由美', '真理子', '絵里', '加奈', '恵', '沙織',
+    '裕太', '勇気', '達也', '浩二', '正樹', '誠', '剛', '聡', '淳', '亮',
+    '陽子', '明美', '久美子', '千春', '愛', '舞', '香織', '美咲', 'さくら', '桜子',
+    '俊介', '賢治', '将太', '啓介', '優太', '孝之', '貴史', '克也', '浩之', '大樹'
+]
+SAMPLE_LAST_NAMES = [
+    '田中', '鈴木', '高橋', '渡辺', '伊藤', '山本', '中村', '小林', '加藤', '吉田',
+    '佐々木', '山田', '佐藤', '松本', '井上', '木村', '林', '斎藤', '清水', '山崎',
+    '森', '阿部', '池田', '橋本', '山口', '石川', '前田', '藤田', '後藤', '長谷川',
+    '村上', '近藤', '石井', '遠藤', '青木', '坂本', '西村', '福田', '太田', '岡田',
+    '竹内', '金子', '藤井', '原田', '中島', '野口', '岩崎', '堀', '上田', '杉山'
+]
+
+# サンプルデータ用の役職
+SAMPLE_POSITIONS = [
+    '代表取締役',
+    '副社長',
+    'マーケティング責任者',
+    '執行役員 事業開発',
+    '執行役員 営業本部長',
+    '執行役員 プロダクト開発'
+]
 
 
 class KeymanFinder:
@@ -16,10 +48,18 @@ class KeymanFinder:
         self.headers = {
             'User-Agent': USER_AGENT
         }
-        # 使用済み名前を追跡（グローバルで重複を防ぐ）
-        self.used_names = set()
+        # サンプルデータ用の氏名の順列（検索ごとのスコープで重複なく割り当てる）
+        self.name_allocator = NameAllocator(SAMPLE_LAST_NAMES, SAMPLE_FIRST_NAMES)
+    
+    def name_scope(self, key: str, offset: int = 0) -> NameScope:
+        """
+        サンプル氏名の割り当て範囲を作成（1回の検索で1つ作って find_keymen に渡す）
+        """
+        return self.name_allocator.scope(key, offset)
     
-    def find_keymen(self, company_name: str, company_url: str, max_keymen: int = 5) -> List[Dict]:
+    @metrics.timed('keyman_discovery')
+    def find_keymen(self, company_name: str, company_url: str, max_keymen: int = 5,
+                    names: Optional[NameScope] = None, deadline: Optional[Deadline] = None) -> List[Dict]:
         """
         企業のキーマンを特定
         
@@ -27,26 +67,38 @@ class KeymanFinder:
             company_name: 企業名
             company_url: 企業URL
             max_keymen: 最大キーマン数（デフォルト5名）
+            names: サンプル氏名の割り当て範囲（省略時は企業名ごと）
+            deadline: 検索の締め切り（過ぎた場合は残りのページを取得しない）
         
         Returns:
             キーマン情報のリスト
         """
+        # バッチ検索では、同じ企業のキーマンを他の検索条件と共有する
+        return lookup_cache.lookup(
+            'keymen', (company_name, company_url, max_keymen),
+            lambda: self._find_keymen(company_name, company_url, max_keymen, names, deadline), deadline)
+    
+    def _find_keymen(self, company_name: str, company_url: str, max_keymen: int,
+                     names: Optional[NameScope] = None, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """
+        公式サイト・Google検索からキーマンを特定
+        """
         print(f"  キーマン検索中: {company_name}")
         
         keymen = []
         
         # 1. 企業の公式サイトから情報を取得
-        keymen.extend(self._extract_from_website(company_url))
+        keymen.extend(self._extract_from_website(company_url, deadline))
         
         # 2. Google検索で追加情報を取得
         if len(keymen) < max_keymen:
-            keymen.extend(self._search_keymen_google(company_name))
+            keymen.extend(self._search_keymen_google(company_name, names, deadline))
         
         # 重複を削除し、最大数まで返す
         unique_keymen = self._remove_duplicates(keymen)
         return unique_keymen[:max_keymen]
     
-    def _extract_from_website(self, company_url: str) -> List[Dict]:
+    def _extract_from_website(self, company_url: str, deadline: Optional[Deadline] = None) -> List[Dict]:
         """
         企業の公式ウェブサイトからキーマン情報を抽出
         """
@@ -63,19 +115,19 @@ class KeymanFinder:
             ]
             
             for url in target_urls:
+                if deadline is not None and deadline.should_stop():
+                    break
                 try:
-                    response = requests.get(url, headers=self.headers, timeout=10)
+                    with metrics.span('page_fetch'):
+                        response = http_client.get(url, headers=self.headers, timeout=10, deadline=deadline)
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        text = soup.get_text()
-                        
                         # 役職と氏名のパターンを検索
-                        keymen.extend(self._extract_keymen_from_text(text))
+                        keymen.extend(self._parse_keymen(response.content, deadline))
                         
                         if keymen:
                             break
                     
-                    time.sleep(REQUEST_DELAY)
+                    http_client.throttle(deadline=deadline)
                 
                 except:
                     continue
@@ -85,6 +137,21 @@ class KeymanFinder:
         
         return keymen
     
+    def _parse_keymen(self, content: bytes, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """
+        ページを解析してキーマンを抽出（PARSE_PROCESSES が1以上なら子プロセスで行う）
+        """
+        pool = parse_pool.get_pool()
+        if pool is not None:
+            return pool.parse('keymen', content, deadline=deadline)
+        
+        with metrics.span('html_parse'):
+            soup = BeautifulSoup(content, 'html.parser')
+        with metrics.span('text_extraction'):
+            text = soup.get_text()
+        return self._extract_keymen_from_text(text)
+    
+    @metrics.timed('extract_keymen')
     def _extract_keymen_from_text(self, text: str) -> List[Dict]:
         """
         テキストからキーマン（氏名と役職）を抽出
@@ -125,7 +192,8 @@ class KeymanFinder:
         
         return keymen
     
-    def _search_keymen_google(self, company_name: str) -> List[Dict]:
+    def _search_keymen_google(self, company_name: str, names: Optional[NameScope] = None,
+                              deadline: Optional[Deadline] = None) -> List[Dict]:
         """
         Google検索でキーマン情報を取得
         """
@@ -134,12 +202,15 @@ class KeymanFinder:
         try:
             # 検索クエリ
             query = f"{company_name} 代表取締役 社長 役員"
-            search_url = f"https://www.google.com/search?q={requests.utils.quote(query)}"
+            search_url = f"{SEARCH_ENGINE_URL}?q={requests.utils.quote(query)}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=10)
+            with metrics.span('serp_fetch'):
+                response = http_client.get(search_url, headers=self.headers, timeout=10, deadline=deadline)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                text = soup.get_text()
+                with metrics.span('html_parse'):
+                    soup = BeautifulSoup(response.content, 'html.parser')
+                with metrics.span('text_extraction'):
+                    text = soup.get_text()
                 
                 keymen.extend(self._extract_keymen_from_text(text))
         
@@ -148,7 +219,7 @@ class KeymanFinder:
         
         # サンプルデータ（実際の検索が失敗した場合）
         if not keymen:
-            keymen = self._get_sample_keymen(company_name)
+            keymen = self._get_sample_keymen(company_name, names)
         
         return keymen
     
@@ -181,73 +252,18 @@ class KeymanFinder:
         
         return unique_keymen
     
-    def _get_sample_keymen(self, company_name: str) -> List[Dict]:
+    def _get_sample_keymen(self, company_name: str, names: Optional[NameScope] = None) -> List[Dict]:
         """
-        サンプルのキーマンデータを生成（重複なし）
+        サンプルのキーマンデータを生成（スコープ内で重複なし）
         """
-        import hashlib
-        import random
-        
-        # より多様な名前リスト（50名分）
-        first_names = [
-            '健一', '大輔', '翔太', '拓也', '直樹', '雄介', '修', '慎一', '和也', '康平',
-            '美穂', '優子', '麻衣', '智子', '由美', '真理子', '絵里', '加奈', '恵', '沙織',
-            '裕太', '勇気', '達也', '浩二', '正樹', '誠', '剛', '聡', '淳', '亮',
-            '陽子', '明美', '久美子', '千春', '愛', '舞', '香織', '美咲', 'さくら', '桜子',
-            '俊介', '賢治', '将太', '啓介', '優太', '孝之', '貴史', '克也', '浩之', '大樹'
-        ]
-        last_names = [
-            '田中', '鈴木', '高橋', '渡辺', '伊藤', '山本', '中村', '小林', '加藤', '吉田',
-            '佐々木', '山田', '佐藤', '松本', '井上', '木村', '林', '斎藤', '清水', '山崎',
-            '森', '阿部', '池田', '橋本', '山口', '石川', '前田', '藤田', '後藤', '長谷川',
-            '村上', '近藤', '石井', '遠藤', '青木', '坂本', '西村', '福田', '太田', '岡田',
-            '竹内', '金子', '藤井', '原田', '中島', '野口', '岩崎', '堀', '上田', '杉山'
-        ]
+        if names is None:
+            names = self.name_scope(company_name)
         
-        positions = [
-            '代表取締役',
-            '副社長',
-            'マーケティング責任者',
-            '執行役員 事業開発',
-            '執行役員 営業本部長',
-            '執行役員 プロダクト開発'
+        return [
+            {
+                '氏名': names.allocate(),
+                '役職': position
+            }
+            for position in SAMPLE_POSITIONS[:5]
         ]
-        
-        # 企業名と役職を組み合わせてユニークなシードを作成
-        selected_keymen = []
-        
-        for i, position in enumerate(positions[:5]):
-            # 企業名、役職、インデックスを組み合わせて完全にユニークなシードを生成
-            seed_string = f"{company_name}_{position}_{i}"
-            seed = int(hashlib.md5(seed_string.encode()).hexdigest(), 16)
-            
-            # ランダムジェネレータを初期化
-            rng = random.Random(seed)
-            
-            # 使用済みでない名前を見つけるまでループ
-            max_attempts = 100
-            for attempt in range(max_attempts):
-                first_name = rng.choice(first_names)
-                last_name = rng.choice(last_names)
-                name = f"{last_name} {first_name}"
-                
-                # 使用済みでなければ採用
-                if name not in self.used_names:
-                    self.used_names.add(name)
-                    selected_keymen.append({
-                        '氏名': name,
-                        '役職': position
-                    })
-                    break
-            else:
-                # 最悪の場合でもユニークな名前を生成
-                name = f"{last_names[i % len(last_names)]} {first_names[(i * 17) % len(first_names)]}"
-                if name not in self.used_names:
-                    self.used_names.add(name)
-                    selected_keymen.append({
-                        '氏名': name,
-                        '役職': position
-                    })
-        
-        return selected_keymen
 
@@ -0,0 +1,141 @@
+"""
+キーワード索引モジュール
+候補企業のタイトル・スニペットに対する転置インデックス（CJK対応 n-gram）
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Set, Tuple
+
+# 日本語（ひらがな・カタカナ・漢字）の連続部分
+_CJK_RUN = re.compile(r'[ぁ-んァ-ヶー一-龯々〆ヵヶ]+')
+# 英数字の連続部分
+_ASCII_RUN = re.compile(r'[a-z0-9]+')
+# キーワードの区切り文字（空白・カンマ・読点）
+_KEYWORD_SEPARATOR = re.compile(r'[\s,、，]+')
+
+# タイトルでの一致はスニペットより重く評価する
+TITLE_WEIGHT = 3.0
+SNIPPET_WEIGHT = 1.0
+
+
+def normalize_text(text: str) -> str:
+    """
+    全角・半角の揺れをなくし、小文字に統一
+    """
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    テキストを索引用トークンに分割
+
+    日本語部分・英数字部分とも1文字と2文字の n-gram に分割する
+    （検索は部分一致なので、英数字も単語の途中から一致させる。例: soft → software）
+    """
+    text = normalize_text(text)
+    tokens = []
+
+    for run in _CJK_RUN.findall(text) + _ASCII_RUN.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+
+    return tokens
+
+
+def split_keywords(keywords: str) -> List[str]:
+    """
+    ユーザー入力のキーワード文字列を個々のキーワードに分割
+    """
+    return [kw for kw in _KEYWORD_SEPARATOR.split(normalize_text(keywords)) if kw]
+
+
+class KeywordIndex:
+    """
+    候補企業の転置インデックス
+
+    トークン → 候補番号の集合 を保持し、キーワード検索を
+    全スニペットの走査ではなく集合の積で行う
+    """
+
+    def __init__(self, candidates: List[Dict]):
+        self.candidates = candidates
+        self._titles = []
+        self._snippets = []
+        self._postings: Dict[str, Set[int]] = {}
+
+        for doc_id, candidate in enumerate(candidates):
+            title = normalize_text(candidate.get('title', ''))
+            snippet = normalize_text(candidate.get('snippet', ''))
+            self._titles.append(title)
+            self._snippets.append(snippet)
+
+            for token in set(tokenize(title)) | set(tokenize(snippet)):
+                self._postings.setdefault(token, set()).add(doc_id)
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def _candidate_ids(self, keyword: str) -> Set[int]:
+        """
+        キーワードの全トークンを含む候補番号（n-gramの積）
+        """
+        tokens = set(tokenize(keyword))
+        if not tokens:
+            return set()
+
+        # 出現数の少ないトークンから積を取る
+        postings = sorted((self._postings.get(token, set()) for token in tokens), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+
+        return result
+
+    def search(self, keywords: str) -> List[Tuple[int, float]]:
+        """
+        すべてのキーワードを含む候補を一致度の高い順に返す
+
+        Returns:
+            (候補番号, スコア) のリスト
+        """
+        terms = split_keywords(keywords)
+        if not terms:
+            return [(doc_id, 0.0) for doc_id in range(len(self.candidates))]
+
+        matched = None
+        for term in terms:
+            ids = self._candidate_ids(term)
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return []
+
+        scored = []
+        for doc_id in matched:
+            title = self._titles[doc_id]
+            snippet = self._snippets[doc_id]
+            score = 0.0
+
+            for term in terms:
+                # n-gramの積は候補の絞り込みなので、実際の部分一致で確認する
+                title_hits = title.count(term)
+                snippet_hits = snippet.count(term)
+                if not title_hits and not snippet_hits:
+                    score = None
+                    break
+                score += TITLE_WEIGHT * title_hits + SNIPPET_WEIGHT * snippet_hits
+
+            if score is not None:
+                scored.append((doc_id, score))
+
+        # スコアの高い順、同点なら元の順序を保つ
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored
+
+    def filter(self, keywords: str) -> List[Dict]:
+        """
+        キーワードに一致する候補を一致度の高い順に返す
+        """
+        return [self.candidates[doc_id] for doc_id, _ in self.search(keywords)]
@@ -0,0 +1,200 @@
+"""
+リードスコアリングモジュール
+候補企業の属性を NumPy 配列にまとめ、適合度スコアを一括計算して上位k社を選ぶ
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# デフォルトの重み（検索ごとに一部だけ上書き可能）
+DEFAULT_WEIGHTS = {
+    'revenue': 1.0,     # 売上規模が指定範囲にどれだけ近いか
+    'profit': 0.15,     # 営業利益率
+    'employees': 0.1,   # 従業員規模
+    'founded': 0.05,    # 設立の新しさ
+    'domain': 0.1,      # 事業領域キーワードの該当数
+    'keyword': 0.3      # 追加キーワードの一致度
+}
+
+# スニペットから属性を補完するためのパターン
+_PROFIT_PATTERN = re.compile(r'営業利益\s*([0-9.]+)億円')
+_EMPLOYEE_PATTERN = re.compile(r'従業員数?\s*([0-9,]+)名')
+_FOUNDED_PATTERN = re.compile(r'(\d{4})年設立')
+
+# 正規化の基準値
+_MAX_PROFIT_MARGIN = 0.3
+_MAX_EMPLOYEES = 1000
+_OLDEST_YEAR = 2000
+_MAX_DOMAINS = 3
+
+
+def resolve_weights(weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    デフォルトの重みに検索ごとの指定を上書きする
+    """
+    resolved = dict(DEFAULT_WEIGHTS)
+    if weights:
+        unknown = set(weights) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"未対応の重みが指定されました: {', '.join(sorted(unknown))}")
+        resolved.update({name: float(value) for name, value in weights.items()})
+    return resolved
+
+
+# 全候補のスニペットを連結して1回で走査するときの区切り（キーワードに含まれない文字）
+_SNIPPET_SEPARATOR = '\x00'
+
+
+def _numbers(candidates: Sequence[Dict], snippets: Sequence[str], key: str, pattern: re.Pattern) -> np.ndarray:
+    """
+    候補の数値属性の列（なければスニペットから抽出、見つからなければ NaN）
+    """
+    values = np.array([c.get(key) for c in candidates], dtype=np.float64)
+    # スニペットは属性のない候補だけ走査する
+    for i in np.flatnonzero(np.isnan(values)):
+        match = pattern.search(snippets[i])
+        if match:
+            values[i] = float(match.group(1).replace(',', ''))
+    return values
+
+
+def build_features(candidates: Sequence[Dict],
+                   domain_keywords: Optional[Dict[str, List[str]]] = None,
+                   keyword_scores: Optional[Sequence[float]] = None) -> Dict[str, np.ndarray]:
+    """
+    候補企業の属性を列ごとの NumPy 配列に変換
+
+    Args:
+        candidates: 候補企業（title/url/snippet/revenue_value を持つ辞書）
+        domain_keywords: 事業領域 → キーワードのリスト
+        keyword_scores: 候補ごとのキーワード一致スコア
+    """
+    n = len(candidates)
+    snippets = [c.get('snippet', '') for c in candidates]
+
+    features = {
+        'revenue': np.fromiter((c.get('revenue_value', 0) for c in candidates), dtype=np.float64, count=n),
+        'profit': _numbers(candidates, snippets, 'profit_value', _PROFIT_PATTERN),
+        'employees': _numbers(candidates, snippets, 'employees_value', _EMPLOYEE_PATTERN),
+        'founded': _numbers(candidates, snippets, 'founded_year', _FOUNDED_PATTERN)
+    }
+
+    # 事業領域フラグ（候補 × 領域 の真偽値行列）
+    domain_keywords = domain_keywords or {}
+    flags = np.zeros((n, len(domain_keywords)), dtype=bool)
+    if domain_keywords:
+        # 全キーワードと区切りを1つの正規表現にまとめ、連結した全候補のスニペットを1回だけ走査する。
+        # 一致を領域の番号（区切りは -1）に変換し、候補の番号は区切りの累積数から求める
+        column = {}
+        for j, kws in enumerate(domain_keywords.values()):
+            for kw in kws:
+                column.setdefault(kw, j)
+        keywords = sorted(column, key=len, reverse=True)
+        pattern = re.compile('|'.join([re.escape(_SNIPPET_SEPARATOR)] + [re.escape(kw) for kw in keywords]))
+        column[_SNIPPET_SEPARATOR] = -1
+
+        found = pattern.findall(_SNIPPET_SEPARATOR.join(snippets))
+        codes = np.fromiter(map(column.__getitem__, found), dtype=np.intp, count=len(found))
+        separators = codes < 0
+        owners = np.cumsum(separators)[~separators]
+        flags[owners, codes[~separators]] = True
+    features['domain_flags'] = flags
+
+    if keyword_scores is None:
+        features['keyword'] = np.zeros(n, dtype=np.float64)
+    else:
+        features['keyword'] = np.asarray(keyword_scores, dtype=np.float64)
+
+    return features
+
+
+class LeadScorer:
+    """
+    重み付き適合度スコアで候補企業を順位付けする
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = resolve_weights(weights)
+
+    def score(self, features: Dict[str, np.ndarray], revenue_range: Tuple[float, float]) -> np.ndarray:
+        """
+        全候補のスコアを一括計算
+        """
+        min_rev, max_rev = revenue_range
+        revenue = features['revenue']
+
+        # 売上: 範囲内なら1、範囲外は対数距離に応じて0.5以下に減衰
+        # （他の属性の重みの合計より差が大きくなり、範囲内の企業が優先される）
+        safe_revenue = np.maximum(revenue, 0.1)
+        distance = (np.maximum(np.log(max(min_rev, 0.1) / safe_revenue), 0)
+                    + np.maximum(np.log(safe_revenue / max_rev), 0))
+        revenue_fit = np.where(distance > 0, 0.5 / (1.0 + distance), 1.0)
+
+        # 利益率
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = np.where(revenue > 0, features['profit'] / revenue, np.nan)
+        profit_fit = np.clip(np.nan_to_num(margin) / _MAX_PROFIT_MARGIN, 0.0, 1.0)
+
+        # 従業員規模（対数スケール）
+        employees = np.nan_to_num(features['employees'])
+        employee_fit = np.clip(np.log1p(np.maximum(employees, 0)) / np.log1p(_MAX_EMPLOYEES), 0.0, 1.0)
+
+        # 設立年の新しさ
+        founded = features['founded']
+        span = max(datetime.now().year - _OLDEST_YEAR, 1)
+        founded_fit = np.clip(np.nan_to_num((founded - _OLDEST_YEAR) / span), 0.0, 1.0)
+
+        # 事業領域
+        flags = features['domain_flags']
+        domain_fit = np.minimum(flags.sum(axis=1), _MAX_DOMAINS) / _MAX_DOMAINS
+
+        # キーワード一致度（最大値で正規化）
+        keyword = features['keyword']
+        keyword_max = keyword.max() if keyword.size else 0.0
+        keyword_fit = keyword / keyword_max if keyword_max > 0 else keyword
+
+        w = self.weights
+        return (w['revenue'] * revenue_fit
+                + w['profit'] * profit_fit
+                + w['employees'] * employee_fit
+                + w['founded'] * founded_fit
+                + w['domain'] * domain_fit
+                + w['keyword'] * keyword_fit)
+
+    def top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        スコア上位k件の添字を降順で返す（同点は元の順序）
+        """
+        n = scores.shape[0]
+        k = min(max(k, 0), n)
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+
+        if k < n:
+            # k番目のスコアを境界に、境界より高い候補と、境界と同点の候補を元の順に必要な数だけ選ぶ
+            # （argpartition は境界で同点の候補のどれを選ぶかが元の順序によらない）
+            boundary = np.partition(scores, n - k)[n - k]
+            above = np.flatnonzero(scores > boundary)
+            tied = np.flatnonzero(scores == boundary)[:k - above.size]
+            candidates = np.concatenate((above, tied))
+        else:
+            candidates = np.arange(n)
+
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order]
+
+    def rank(self, candidates: Sequence[Dict], k: int, revenue_range: Tuple[float, float],
+             domain_keywords: Optional[Dict[str, List[str]]] = None,
+             keyword_scores: Optional[Sequence[float]] = None) -> List[Dict]:
+        """
+        候補企業をスコア順に並べ、上位k社を返す
+        """
+        if not candidates:
+            return []
+
+        features = build_features(candidates, domain_keywords, keyword_scores)
+        scores = self.score(features, revenue_range)
+        return [candidates[i] for i in self.top_k(scores, k)]
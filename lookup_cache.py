@@ -0,0 +1,155 @@
+"""
+取得結果の共有モジュール
+バッチ検索（複数の検索条件をまとめて実行する検索）の中で、同じ企業ページの詳細情報・キーマン・SNSアカウントを
+1回だけ取得し、他の検索では取得済みの結果を使う
+
+    with lookup_cache.bind(lookup_cache.for_batch(batch_id)):
+        ...  # この中の CompanySearch・KeymanFinder・SNSFinder の取得が共有される
+
+同じ取得を複数のスレッドが同時に始めた場合は、最初のスレッドの取得が終わるのを待って結果を共有する。
+締め切りを過ぎて途中で打ち切った取得は共有しない（他の検索では取得し直す）
+"""
+
+import contextvars
+import copy
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+import metrics
+from deadline import Deadline
+
+# プロセス内に保持するバッチの数（古いバッチから破棄する）
+MAX_BATCHES = 16
+
+BATCH_LOOKUPS = metrics.counter(
+    'sales_bot_batch_lookups_total', 'バッチ検索の取得結果の共有（hit: 他の検索の結果を使った）', ('kind', 'result'))
+
+
+class LookupCache:
+    """
+    バッチ内で共有する取得結果（kind: company_page / keymen / sns）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Hashable], object] = {}
+        # 取得中のキー → 取得の完了を知らせるイベント
+        self._pending: Dict[Tuple[str, Hashable], threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, kind: str, key: Hashable, compute: Callable[[], object], deadline: Optional[Deadline] = None):
+        """
+        取得済みの結果（なければ compute() で取得して共有する）。呼び出し元には結果のコピーを返す
+        """
+        entry = (kind, key)
+        while True:
+            with self._lock:
+                if entry in self._values:
+                    self.hits += 1
+                    value = self._values[entry]
+                    hit = True
+                    break
+                event = self._pending.get(entry)
+                if event is None:
+                    self._pending[entry] = threading.Event()
+                    hit = False
+                    break
+            # 他のスレッドの取得を待つ（失敗・共有しなかった場合は自分で取得する）
+            event.wait()
+
+        if hit:
+            self._record(kind, True)
+            return copy.deepcopy(value)
+
+        truncated = deadline is not None and deadline.truncated
+        try:
+            value = compute()
+        except BaseException:
+            with self._lock:
+                self._pending.pop(entry).set()
+            raise
+
+        with self._lock:
+            self.misses += 1
+            if deadline is None or deadline.truncated == truncated:
+                self._values[entry] = copy.deepcopy(value)
+            self._pending.pop(entry).set()
+        self._record(kind, False)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._values), 'hits': self.hits, 'misses': self.misses}
+
+    @staticmethod
+    def _record(kind: str, hit: bool):
+        BATCH_LOOKUPS.inc(kind=kind, result='hit' if hit else 'miss')
+        metrics.record_cache(f"batch_{kind}", hit)
+
+
+# 実行中の検索が使う共有先（スレッド・タスクごと）
+_current: contextvars.ContextVar = contextvars.ContextVar('lookup_cache', default=None)
+
+_batches: 'OrderedDict[int, LookupCache]' = OrderedDict()
+_batches_lock = threading.Lock()
+
+
+def current() -> Optional[LookupCache]:
+    """
+    実行中の検索が使う共有先（バッチ検索の外では None）
+    """
+    return _current.get()
+
+
+@contextmanager
+def bind(cache: Optional[LookupCache]):
+    """
+    with ブロック内の取得を cache で共有する（None の場合は外側の設定のまま）
+    """
+    if cache is None:
+        yield None
+        return
+    token = _current.set(cache)
+    try:
+        yield cache
+    finally:
+        _current.reset(token)
+
+
+def lookup(kind: str, key: Hashable, compute: Callable[[], object], deadline: Optional[Deadline] = None):
+    """
+    共有先があれば取得済みの結果を使い、なければ compute() で取得する
+    """
+    cache = _current.get()
+    if cache is None:
+        return compute()
+    return cache.get(kind, key, compute, deadline)
+
+
+def for_batch(batch_id: int) -> LookupCache:
+    """
+    バッチの共有先（同じプロセスで実行する同じバッチの検索は同じものを使う）
+    """
+    with _batches_lock:
+        cache = _batches.get(batch_id)
+        if cache is None:
+            cache = _batches[batch_id] = LookupCache()
+            while len(_batches) > MAX_BATCHES:
+                _batches.popitem(last=False)
+        else:
+            _batches.move_to_end(batch_id)
+        return cache
+
+
+def peek_batch(batch_id: int) -> Optional[LookupCache]:
+    """
+    このプロセスにあるバッチの共有先（なければ None。作成はしない）
+    """
+    return _batches.get(batch_id)
+
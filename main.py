@@ -1,25 +1,63 @@
 """
 AI営業アポイント自動化BOT - メインスクリプト
 企業リストアップ、キーマン特定、SNSアカウント検索を自動実行
+
+使い方:
+    python main.py                                  # 条件・企業数を入力して実行
+    python main.py --batch conditions.txt           # ファイルの検索条件（1行1件）を入力待ちなしで並行実行
+    cat conditions.txt | python main.py --batch - --workers 8 --format json
+    python main.py --resume 20250101_120000         # 中断した実行を途中経過から続ける
 """
 
+import argparse
+import contextvars
+import json
 import os
-from typing import List, Dict
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Dict, Optional, Sequence, Tuple
 from company_search import CompanySearch
 from keyman_finder import KeymanFinder
 from sns_finder import SNSFinder
 from output_formatter import OutputFormatter
-from config import OUTPUT_DIR
+from config import CLI_SEARCH_TIMEOUT, OUTPUT_DIR, REQUEST_DELAY, RUN_CHECKPOINT_DIR
+from deadline import Deadline, search_deadline
+from name_allocator import NameScope
+from run_checkpoint import QueryCheckpoint, RunCheckpoint
+import http_client
+import lookup_cache
+import metrics
+import profiling
+import projection
+
+# バッチ実行（--batch）で並行して実行する検索条件の数
+DEFAULT_BATCH_WORKERS = 4
+
+# バッチ実行の結果ファイルの形式 → OutputFormatter のメソッド名・拡張子
+OUTPUT_FORMATS = {
+    'csv': ('save_as_csv', 'csv'),
+    'json': ('save_as_json', 'json'),
+    'markdown': ('save_as_markdown', 'md'),
+}
 
 
 class AISalesBot:
-    def __init__(self):
+    def __init__(self, search_timeout: float = CLI_SEARCH_TIMEOUT):
+        """
+        Args:
+            search_timeout: 1件の検索の締め切り（秒、0で無制限）。過ぎた場合はそこまでの結果を返す
+        """
+        self.search_timeout = search_timeout
         self.company_search = CompanySearch()
         self.keyman_finder = KeymanFinder()
         self.sns_finder = SNSFinder()
         self.formatter = OutputFormatter(OUTPUT_DIR)
     
-    def run(self, conditions: str, num_companies: int, max_keymen: int = 5):
+    def run(self, conditions: str, num_companies: int, max_keymen: int = 5, interactive: bool = True,
+            profile: Optional[bool] = None, fields: Optional[Sequence[str]] = None,
+            checkpoint: Optional[RunCheckpoint] = None):
         """
         営業リストアップフローを実行
         
@@ -27,6 +65,249 @@ class AISalesBot:
             conditions: 企業リストアップ条件
             num_companies: リストアップする企業数
             max_keymen: 各企業のキーマン最大数
+            interactive: False の場合は詳細表示・コピーメニューの入力待ちをしない
+            profile: プロファイルを取る（省略時は環境変数 PROFILE_SEARCHES に従う）
+            fields: 結果に必要な項目（projection.ALL_FIELDS の一部。省略時はすべて）。
+                    指定されていない項目のためのページ取得・抽出・キーマン特定・SNS検索は行わない
+            checkpoint: 再開する実行（resume() から。省略時は RUN_CHECKPOINT_DIR に新しい実行を作成する）
+        
+        Raises:
+            ValueError: 不明な項目
+        """
+        fields = projection.validate_fields(fields)
+        if checkpoint is None and RUN_CHECKPOINT_DIR:
+            checkpoint = RunCheckpoint.create('run', {
+                'conditions': conditions,
+                'num_companies': num_companies,
+                'max_keymen': max_keymen,
+                'fields': list(fields) if fields is not None else None
+            })
+        if checkpoint is not None:
+            print(f"実行ID: {checkpoint.run_id}（中断した場合は python main.py --resume {checkpoint.run_id} で続きから実行できます）")
+        
+        # 入力待ちの時間を含めないよう、検索部分のみをプロファイルする
+        with profiling.profile('bot', enabled=profiling.should_profile(profile)), metrics.collect_stats() as stats:
+            results = self._search(conditions, num_companies, max_keymen, fields,
+                                   checkpoint.query(1) if checkpoint is not None else None)
+        if checkpoint is not None:
+            # 締め切りで打ち切った場合は、再開すると残りの企業を処理する
+            checkpoint.finish('incomplete' if stats.truncated else 'completed')
+            if stats.truncated:
+                print(f"\n締め切りまでに処理できなかった企業は python main.py --resume {checkpoint.run_id} で続きを実行できます")
+        
+        if stats.skipped:
+            skipped = '、'.join(f"{work} {count}回" for work, count in sorted(stats.skipped.items()))
+            print(f"\n（指定されていない項目のため省略した処理: {skipped}）")
+        
+        # ステップ3: 結果表示
+        print("\n[ステップ3] 結果を表示しています...")
+        print("\n" + "=" * 70)
+        
+        # 簡易表示
+        self.formatter.display_results(results)
+        
+        if interactive:
+            # 詳細表示の確認
+            show_detail = input("\n詳細な結果を表示しますか？ (y/n): ").strip().lower()
+            if show_detail == 'y':
+                self.formatter.display_detailed_results(results)
+            
+            # ステップ4: コピー・保存オプション
+            print("\n[ステップ4] 結果のコピー・保存")
+            self.formatter.show_copy_menu(results)
+        
+        print("\n" + "=" * 70)
+        print(f"\n✓ すべての処理が完了しました！")
+        print(f"✓ 合計 {len(results)} 件のキーマン情報を取得しました")
+        print("\n" + "=" * 70)
+        
+        return results
+    
+    def resume(self, checkpoint: RunCheckpoint, interactive: bool = True, workers: Optional[int] = None):
+        """
+        中断した実行を途中経過から続ける（企業検索と処理の終わった企業・検索条件は実行し直さない）
+        
+        Args:
+            checkpoint: RunCheckpoint.load() で読み込んだ実行
+            interactive: run() の実行で入力待ちをするか
+            workers: バッチ実行で並行して実行する検索条件の数（省略時は前回と同じ）
+        
+        Returns:
+            run() の結果行、またはバッチ実行の要約
+        """
+        arguments = checkpoint.arguments
+        print(f"実行 {checkpoint.run_id} を途中経過から再開します（{checkpoint.manifest.get('resumed', 1)}回目）")
+        if checkpoint.kind == 'batch':
+            return self.run_batch([tuple(query) for query in arguments['queries']], arguments['max_keymen'],
+                                  workers or arguments['workers'], arguments['fields'], arguments['output_format'],
+                                  checkpoint=checkpoint)
+        return self.run(arguments['conditions'], arguments['num_companies'], arguments['max_keymen'], interactive,
+                        fields=arguments['fields'], checkpoint=checkpoint)
+    
+    def run_batch(self, queries: List[Tuple[str, int]], max_keymen: int = 5,
+                  workers: int = DEFAULT_BATCH_WORKERS, fields: Optional[Sequence[str]] = None,
+                  output_format: str = 'csv', run_id: Optional[str] = None,
+                  checkpoint: Optional[RunCheckpoint] = None) -> Dict:
+        """
+        複数の検索条件を入力待ちなしで並行して実行し、検索条件ごとの結果と実行結果の要約をファイルに保存する
+
+        企業ページ・キーマン・SNSの取得結果はすべての検索条件で共有し（lookup_cache）、
+        同じホストへのリクエスト間隔は http_client.set_host_interval() の設定をすべてのスレッドで共有する
+        
+        Args:
+            queries: (検索条件, 企業数) のリスト
+            max_keymen: 各企業のキーマン最大数
+            workers: 並行して実行する検索条件の数
+            fields: 結果に必要な項目（run() と同じ）
+            output_format: 結果ファイルの形式（OUTPUT_FORMATS）
+            run_id: 出力ファイル名に使うID（省略時は開始時刻）
+            checkpoint: 再開する実行（resume() から。完了した検索条件は実行せず、前回の結果を要約に含める）。
+                        省略時は RUN_CHECKPOINT_DIR に新しい実行を作成する
+        
+        Returns:
+            要約（{'run_id', 'summary_file', 'completed', 'failed', 'truncated', 'skipped', 'rows', 'queries'}）
+        
+        Raises:
+            ValueError: 不明な項目・出力形式
+        """
+        fields = projection.validate_fields(fields)
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不明な出力形式です: {output_format}（{' / '.join(OUTPUT_FORMATS)}）")
+        if checkpoint is None and RUN_CHECKPOINT_DIR:
+            checkpoint = RunCheckpoint.create('batch', {
+                'queries': [[conditions, num_companies] for conditions, num_companies in queries],
+                'max_keymen': max_keymen,
+                'workers': workers,
+                'fields': list(fields) if fields is not None else None,
+                'output_format': output_format
+            }, run_id)
+        if checkpoint is not None:
+            run_id = checkpoint.run_id
+        run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        # 前回の実行で完了した検索条件（締め切りで打ち切ったものは続きを実行する）は実行しない
+        entries: List[Optional[Dict]] = [None] * len(queries)
+        pending = []
+        for index in range(1, len(queries) + 1):
+            entry = checkpoint.query_entry(index) if checkpoint is not None else None
+            if entry is not None and entry['status'] == 'completed' and not entry.get('truncated'):
+                entries[index - 1] = entry
+            else:
+                pending.append(index)
+        skipped = len(queries) - len(pending)
+        workers = max(min(int(workers), len(pending)), 1)
+        
+        print("=" * 70)
+        print(f"バッチ実行 {run_id}: {len(queries)}件の検索条件（{workers}件ずつ並行して実行）")
+        if skipped:
+            print(f"前回の実行で完了した {skipped}件の検索条件は実行しません")
+        if checkpoint is not None:
+            print(f"中断した場合は python main.py --resume {run_id} で続きから実行できます")
+        print("=" * 70)
+        
+        progress = BatchProgress(len(pending))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-search')
+        # 取得結果の共有先を各スレッドに引き継ぐ
+        with lookup_cache.bind(lookup_cache.LookupCache()):
+            futures = {
+                pool.submit(contextvars.copy_context().run, self._run_batch_query, index, queries[index - 1][0],
+                            queries[index - 1][1], max_keymen, fields, output_format, run_id,
+                            checkpoint.query(index) if checkpoint is not None else None): index
+                for index in pending
+            }
+        
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                entry = future.result()
+                entries[index - 1] = entry
+                if checkpoint is not None:
+                    checkpoint.record_query(index, entry)
+                progress.update(entry['status'] == 'completed', entry['companies'], entry['rows'])
+                print(progress.line())
+        except KeyboardInterrupt:
+            print("\n中断しました。実行中の検索条件が終わりしだい、完了した分の要約を保存します")
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            pool.shutdown(wait=True)
+            summary = self._save_batch_summary(run_id, queries, entries, progress, skipped)
+            if checkpoint is not None:
+                finished = all(entry is not None and entry['status'] == 'completed' and not entry.get('truncated')
+                               for entry in entries)
+                checkpoint.finish('completed' if finished else 'incomplete')
+        
+        print("\n" + "=" * 70)
+        print(f"✓ バッチ実行が完了しました: 成功 {summary['completed']}件・失敗 {summary['failed']}件・"
+              f"合計 {summary['rows']}行（{progress.elapsed():.1f}秒）")
+        if summary['truncated']:
+            print(f"⚠ 締め切り（--timeout）を過ぎて途中までの結果になった検索条件: {summary['truncated']}件")
+        print(f"✓ 要約: {summary['summary_file']}")
+        if checkpoint is not None and checkpoint.manifest['status'] == 'incomplete':
+            print(f"失敗・締め切りで途中までになった検索条件は python main.py --resume {run_id} で続きを実行できます")
+        print("=" * 70)
+        return summary
+    
+    def _run_batch_query(self, index: int, conditions: str, num_companies: int, max_keymen: int,
+                         fields: Optional[Sequence[str]], output_format: str, run_id: str,
+                         query_checkpoint: Optional[QueryCheckpoint] = None) -> Dict:
+        """
+        バッチ実行の検索条件1件を実行して結果ファイルを保存（失敗しても他の検索条件は続ける）
+        """
+        entry = {'index': index, 'conditions': conditions, 'num_companies': num_companies,
+                 'status': 'completed', 'companies': 0, 'rows': 0, 'file': None, 'error': None}
+        with metrics.collect_stats() as stats:
+            try:
+                results = self._search(conditions, num_companies, max_keymen, fields, query_checkpoint)
+                entry['companies'] = len({row['企業名'] for row in results})
+                entry['rows'] = len(results)
+                if results:
+                    method, extension = OUTPUT_FORMATS[output_format]
+                    entry['file'] = getattr(self.formatter, method)(results, f"batch_{run_id}_{index:03d}.{extension}")
+            except Exception as e:
+                print(f"[バッチ] 検索条件 {index}（{conditions}）でエラーが発生しました: {e}")
+                entry['status'] = 'failed'
+                entry['error'] = str(e)
+        entry['truncated'] = stats.truncated
+        entry['stats'] = stats.to_dict()
+        return entry
+    
+    def _save_batch_summary(self, run_id: str, queries: List[Tuple[str, int]], entries: List[Optional[Dict]],
+                            progress: 'BatchProgress', skipped: int = 0) -> Dict:
+        """
+        バッチ実行の要約（検索条件ごとの状態・件数・結果ファイル）を JSON で保存
+        """
+        queries_summary = [
+            entry or {'index': index, 'conditions': conditions, 'num_companies': num_companies, 'status': 'cancelled'}
+            for index, ((conditions, num_companies), entry) in enumerate(zip(queries, entries), 1)
+        ]
+        summary = {
+            'run_id': run_id,
+            'completed': sum(1 for entry in queries_summary if entry['status'] == 'completed'),
+            'failed': sum(1 for entry in queries_summary if entry['status'] == 'failed'),
+            # 締め切り（--timeout）で途中までの結果になった検索条件の数（completed に含む）
+            'truncated': sum(1 for entry in queries_summary if entry.get('truncated')),
+            # 前回の実行で完了していた検索条件の数（--resume）
+            'skipped': skipped,
+            'rows': sum(entry.get('rows', 0) for entry in queries_summary),
+            'wall_seconds': round(progress.elapsed(), 3),
+            'queries': queries_summary
+        }
+        path = os.path.join(self.formatter.output_dir, f"batch_{run_id}_summary.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        summary['summary_file'] = path
+        return summary
+    
+    def _search(self, conditions: str, num_companies: int, max_keymen: int,
+                fields: Optional[Sequence[str]] = None,
+                query_checkpoint: Optional[QueryCheckpoint] = None) -> List[Dict]:
+        """
+        企業検索・キーマン特定・SNS検索を実行して結果行を返す
+
+        query_checkpoint を指定した場合は、企業検索の結果と1社ごとの結果行を保存し、
+        保存済みの企業検索・企業の処理は省略して続きから実行する
         """
         print("=" * 70)
         print("AI営業アポイント自動化BOT 開始")
@@ -37,85 +318,259 @@ class AISalesBot:
         print(f"キーマン数/企業: 最大{max_keymen}名")
         print("\n" + "=" * 70)
         
+        # 検索全体の締め切り（CLI_SEARCH_TIMEOUT、既定は無制限）。過ぎた場合はそこまでの結果を返す
+        deadline = search_deadline(self.search_timeout)
+        
         # ステップ1: 企業検索
-        print("\n[ステップ1] 企業検索を実行中...")
-        companies = self.company_search.search_companies(conditions, num_companies)
-        print(f"✓ {len(companies)}社の企業を取得しました\n")
+        if query_checkpoint is not None and query_checkpoint.companies is not None:
+            companies = query_checkpoint.companies
+            print(f"\n[ステップ1] 途中経過から再開します（企業検索を省略: {len(companies)}社、"
+                  f"処理済み: {query_checkpoint.completed}社）\n")
+        else:
+            print("\n[ステップ1] 企業検索を実行中...")
+            companies = self.company_search.search_companies(conditions, num_companies, deadline=deadline,
+                                                             fields=fields)
+            # 締め切りで打ち切った企業検索は、再開したときにやり直す
+            if query_checkpoint is not None and not (deadline is not None and deadline.truncated):
+                query_checkpoint.save_companies(companies)
+            print(f"✓ {len(companies)}社の企業を取得しました\n")
         
         # ステップ2: キーマン特定とSNS検索
         print("[ステップ2] キーマン特定とSNS検索を実行中...")
-        results = []
+        results = query_checkpoint.rows() if query_checkpoint is not None else []
+        completed = query_checkpoint.completed if query_checkpoint is not None else 0
+        names = self.keyman_finder.name_scope(
+            conditions, query_checkpoint.names_used if query_checkpoint is not None else 0)
         
-        for i, company in enumerate(companies, 1):
+        for i, company in enumerate(companies[completed:], completed + 1):
+            if deadline is not None and deadline.should_stop():
+                break
             print(f"\n企業 {i}/{len(companies)}: {company['企業名']}")
-            
-            # キーマン特定
-            keymen = self.keyman_finder.find_keymen(
-                company['企業名'],
-                company['企業URL'],
-                max_keymen
-            )
-            
-            print(f"  ✓ {len(keymen)}名のキーマンを特定しました")
-            
-            # 各キーマンのSNSアカウント検索
-            for keyman in keymen:
-                sns_accounts = self.sns_finder.find_sns_accounts(
-                    keyman['氏名'],
-                    company['企業名'],
-                    keyman['役職']
-                )
-                
-                # 結果を統合
-                result_row = {
-                    '企業名': company['企業名'],
-                    '企業URL': company['企業URL'],
-                    '事業概要': company['事業概要'],
-                    '設立年': company.get('設立年', ''),
-                    '売上': company.get('売上', ''),
-                    '利益': company.get('利益', ''),
-                    '従業員規模': company.get('従業員規模', ''),
-                    '事業領域': company.get('事業領域', ''),
-                    '注力ポイント': company.get('注力ポイント', ''),
-                    'キーマン氏名': keyman['氏名'],
-                    '役職名': keyman['役職'],
-                    'Facebook URL': sns_accounts['Facebook'],
-                    'X（旧Twitter） URL': sns_accounts['X（旧Twitter）']
-                }
-                
-                results.append(result_row)
-        
-        print("\n✓ キーマン特定とSNS検索が完了しました")
+            company_rows = self._company_rows(company, max_keymen, fields, names, deadline)
+            results.extend(company_rows)
+            # 締め切りで途中までになった企業は、再開したときに処理し直す
+            if query_checkpoint is not None and not (deadline is not None and deadline.truncated):
+                query_checkpoint.save_company(i - 1, company_rows, names.position)
         
-        # ステップ3: 結果表示
-        print("\n[ステップ3] 結果を表示しています...")
-        print("\n" + "=" * 70)
+        if deadline is not None and deadline.truncated:
+            # 呼び出し元（run() の途中経過・run_batch() の要約）が打ち切りを判定できるよう、検索の内訳に記録する
+            stats = metrics.current_stats()
+            if stats is not None:
+                stats.truncated = True
+            print("\n⚠ 締め切り（--timeout）を過ぎたため、途中までの結果を表示します")
+        else:
+            print("\n✓ キーマン特定とSNS検索が完了しました")
         
-        # 簡易表示
-        self.formatter.display_results(results)
+        return results
+    
+    def _company_rows(self, company: Dict, max_keymen: int, fields: Optional[Sequence[str]], names: NameScope,
+                      deadline: Optional[Deadline]) -> List[Dict]:
+        """
+        1社分のキーマン特定・SNS検索を実行して結果行を返す
+        """
+        if not projection.needs_keymen(fields):
+            # キーマン・SNSの項目が指定されていなければ、企業ごとに1行
+            metrics.record_skipped('keyman_discovery')
+            return [projection.project(company, fields)]
         
-        # 詳細表示の確認
-        show_detail = input("\n詳細な結果を表示しますか？ (y/n): ").strip().lower()
-        if show_detail == 'y':
-            self.formatter.display_detailed_results(results)
+        rows = []
+        # キーマン特定
+        keymen = self.keyman_finder.find_keymen(
+            company['企業名'],
+            company['企業URL'],
+            max_keymen,
+            names=names,
+            deadline=deadline
+        )
         
-        # ステップ4: コピー・保存オプション
-        print("\n[ステップ4] 結果のコピー・保存")
-        self.formatter.show_copy_menu(results)
+        print(f"  ✓ {len(keymen)}名のキーマンを特定しました")
         
-        print("\n" + "=" * 70)
-        print(f"\n✓ すべての処理が完了しました！")
-        print(f"✓ 合計 {len(results)} 件のキーマン情報を取得しました")
-        print("\n" + "=" * 70)
+        # 各キーマンのSNSアカウント検索
+        for keyman in keymen:
+            sns_accounts = self.sns_finder.find_sns_accounts(
+                keyman['氏名'],
+                company['企業名'],
+                keyman['役職'],
+                deadline=deadline,
+                fields=fields
+            )
+            
+            # 結果を統合
+            result_row = {
+                '企業名': company['企業名'],
+                '企業URL': company['企業URL'],
+                '事業概要': company['事業概要'],
+                '設立年': company.get('設立年', ''),
+                '売上': company.get('売上', ''),
+                '利益': company.get('利益', ''),
+                '従業員規模': company.get('従業員規模', ''),
+                '事業領域': company.get('事業領域', ''),
+                '注力ポイント': company.get('注力ポイント', ''),
+                'キーマン氏名': keyman['氏名'],
+                '役職名': keyman['役職'],
+                'Facebook URL': sns_accounts['Facebook'],
+                'X（旧Twitter） URL': sns_accounts['X（旧Twitter）']
+            }
+            
+            rows.append(projection.project(result_row, fields))
         
-        return results
+        return rows
+
+
+class BatchProgress:
+    """
+    バッチ実行の進み具合（処理量と残り時間の見積もり）
+    """
+    
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.companies = 0
+        self.rows = 0
+        self._start = time.perf_counter()
+    
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
     
+    def update(self, succeeded: bool, companies: int, rows: int):
+        self.done += 1
+        if not succeeded:
+            self.failed += 1
+        self.companies += companies
+        self.rows += rows
+    
+    def eta(self) -> Optional[float]:
+        """
+        残り時間の見積もり（秒。これまでの1件あたりの時間から。まだ1件も終わっていなければ None）
+        """
+        if not self.done:
+            return None
+        return self.elapsed() / self.done * (self.total - self.done)
+    
+    def line(self) -> str:
+        elapsed = self.elapsed()
+        minutes = max(elapsed, 1e-9) / 60
+        eta = self.eta()
+        return (f"[バッチ] {self.done}/{self.total}件完了（失敗 {self.failed}件） "
+                f"企業 {self.companies}社・{self.rows}行 | "
+                f"{self.done / minutes:.1f}件/分・{self.companies / minutes:.1f}社/分 | "
+                f"経過 {_format_seconds(elapsed)}・残り約 {_format_seconds(eta) if eta is not None else '-'}")
 
 
-def main():
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def parse_batch_lines(lines, num_companies: int = 5) -> List[Tuple[str, int]]:
+    """
+    バッチ実行の検索条件を読み込む
+
+    1行に1件の検索条件。タブ区切りで企業数を指定できる（省略時は num_companies）。
+    空行と # で始まる行は無視する
+
+    Raises:
+        ValueError: 企業数が正しくない行
+    """
+    queries = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        conditions, _, count = line.partition('\t')
+        count = count.strip()
+        try:
+            companies = int(count) if count else num_companies
+        except ValueError:
+            raise ValueError(f"{line_number}行目: 企業数が正しくありません: {count}")
+        if companies <= 0:
+            raise ValueError(f"{line_number}行目: 企業数は1以上にしてください: {companies}")
+        queries.append((conditions.strip(), companies))
+    return queries
+
+
+def _read_batch_file(path: str) -> List[str]:
+    if path == '-':
+        return sys.stdin.readlines()
+    with open(path, encoding='utf-8') as f:
+        return f.readlines()
+
+
+def run_batch_cli(args) -> int:
+    """
+    --batch の実行（失敗した検索条件があれば終了コード1）
+    """
+    try:
+        queries = parse_batch_lines(_read_batch_file(args.batch), args.num_companies)
+    except (OSError, ValueError) as e:
+        print(f"検索条件を読み込めませんでした: {e}", file=sys.stderr)
+        return 2
+    if not queries:
+        print("検索条件がありません", file=sys.stderr)
+        return 2
+    
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()] if args.fields else None
+    http_client.set_host_interval(args.host_interval)
+    bot = AISalesBot(args.timeout)
+    if args.output_dir:
+        bot.formatter = OutputFormatter(args.output_dir)
+    try:
+        summary = bot.run_batch(queries, args.max_keymen, args.workers or DEFAULT_BATCH_WORKERS, fields, args.format)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    return 1 if summary['failed'] else 0
+
+
+def run_resume_cli(args) -> int:
+    """
+    --resume の実行（バッチ実行で失敗した検索条件があれば終了コード1）
+    """
+    try:
+        checkpoint = RunCheckpoint.load(args.resume)
+    except (OSError, ValueError) as e:
+        print(f"途中経過を読み込めませんでした: {e}", file=sys.stderr)
+        return 2
+    
+    bot = AISalesBot(args.timeout)
+    if args.output_dir:
+        bot.formatter = OutputFormatter(args.output_dir)
+    if checkpoint.kind == 'batch':
+        http_client.set_host_interval(args.host_interval)
+        summary = bot.resume(checkpoint, workers=args.workers)
+        return 1 if summary['failed'] else 0
+    bot.resume(checkpoint)
+    return 0
+
+
+def main(argv=None) -> int:
     """
     メイン関数
     """
+    parser = argparse.ArgumentParser(description="AI営業アポイント自動化BOT")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="検索条件を1行1件で書いたファイル（- で標準入力）。指定すると入力待ちをせずに並行して実行する")
+    parser.add_argument('--resume', metavar='RUN_ID',
+                        help=f"中断した実行を途中経過（{RUN_CHECKPOINT_DIR or 'RUN_CHECKPOINT_DIR'}/<実行ID>）から続ける")
+    parser.add_argument('--num-companies', type=int, default=5, help="企業数（バッチ実行で行に指定がない場合）")
+    parser.add_argument('--max-keymen', type=int, default=5, help="各企業のキーマン最大数")
+    parser.add_argument('--workers', type=int, help=f"並行して実行する検索条件の数（既定: {DEFAULT_BATCH_WORKERS}。--resume では前回と同じ）")
+    parser.add_argument('--fields', help="結果に必要な項目（カンマ区切り。省略時はすべて）")
+    parser.add_argument('--format', choices=tuple(OUTPUT_FORMATS), default='csv', help="結果ファイルの形式")
+    parser.add_argument('--output-dir', help=f"結果ファイルの保存先（既定: {OUTPUT_DIR}）")
+    parser.add_argument('--host-interval', type=float, default=REQUEST_DELAY,
+                        help="同じホストへのリクエスト間隔（秒。すべてのワーカーで共有）")
+    parser.add_argument('--timeout', type=float, default=CLI_SEARCH_TIMEOUT,
+                        help="1件の検索の締め切り（秒。過ぎた場合はそこまでの結果を返す。既定: CLI_SEARCH_TIMEOUT、0で無制限）")
+    args = parser.parse_args(argv)
+    
+    if args.resume:
+        return run_resume_cli(args)
+    if args.batch:
+        return run_batch_cli(args)
+    
     print("\n" + "=" * 70)
     print(" AI営業アポイント自動化BOT")
     print(" - 企業リストアップ & SNSアカウント特定 -")
@@ -140,10 +595,11 @@ def main():
         print(f"（デフォルト値を使用: {num_companies}）")
     
     # BOT実行
-    bot = AISalesBot()
+    bot = AISalesBot(args.timeout)
     bot.run(conditions, num_companies)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
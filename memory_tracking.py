@@ -0,0 +1,214 @@
+"""
+メモリ監視モジュール
+サブシステムごとのメモリ使用量の集計と、ジョブ前後の tracemalloc スナップショット差分を記録する
+
+tracemalloc は負荷が大きいため、環境変数 TRACK_MEMORY=true または
+enable_tracing() で有効にした場合のみスナップショットを取る
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from config import TRACK_MEMORY
+
+# 保持するジョブごとの差分の数
+MAX_JOB_DIFFS = 20
+
+# 差分に載せる行数
+DIFF_TOP_N = 15
+
+# tracemalloc で記録するスタックの深さ
+TRACEMALLOC_FRAMES = 5
+
+_lock = threading.Lock()
+_subsystems: Dict[str, Callable[[], object]] = {}
+_job_diffs: deque = deque(maxlen=MAX_JOB_DIFFS)
+
+
+def approx_size(obj, _seen: Optional[set] = None) -> int:
+    """
+    コンテナをたどって使用バイト数を概算（共有されたオブジェクトは1回だけ数える）
+    """
+    seen = set() if _seen is None else _seen
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+    return total
+
+
+def register_subsystem(name: str, target: Callable[[], object], documentation: str = ''):
+    """
+    メモリ使用量を監視するサブシステムを登録
+
+    Args:
+        name: サブシステム名（ゲージ名 sales_bot_<name>_entries にも使う）
+        target: 監視対象のオブジェクト（dict・list・set など）を返す関数
+        documentation: ゲージの説明
+    """
+    with _lock:
+        _subsystems[name] = target
+
+    def entries() -> float:
+        return float(len(target()))
+
+    metrics.gauge(f'sales_bot_{name}_entries', documentation or f'{name} の要素数', callback=entries)
+
+
+def subsystem_report() -> Dict[str, Dict]:
+    """
+    サブシステムごとの要素数と概算バイト数
+    """
+    with _lock:
+        subsystems = dict(_subsystems)
+
+    report = {}
+    for name, target in subsystems.items():
+        try:
+            obj = target()
+            report[name] = {'entries': len(obj), 'approx_bytes': approx_size(obj)}
+        except Exception as e:
+            report[name] = {'error': str(e)}
+    return report
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """
+    プロセス全体のメモリ使用量（取得できない環境では None）
+    """
+    rss = None
+    try:
+        with open('/proc/self/statm') as f:
+            rss = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+
+    max_rss = None
+    try:
+        import resource
+        # Linux は KiB、macOS はバイト単位
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != 'darwin':
+            max_rss *= 1024
+    except (ImportError, OSError):
+        pass
+
+    return {'rss_bytes': rss, 'max_rss_bytes': max_rss}
+
+
+def enable_tracing(frames: int = TRACEMALLOC_FRAMES):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def disable_tracing():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def tracing_report() -> Dict:
+    if not tracemalloc.is_tracing():
+        return {'enabled': False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {'enabled': True, 'current_bytes': current, 'peak_bytes': peak}
+
+
+class JobTracker:
+    """
+    ジョブの開始時と終了時に tracemalloc のスナップショットを取り、差分を記録する
+
+    同時に実行中の他のジョブの確保分も差分に含まれる点に注意
+    """
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self._before = None
+        self._started_at = None
+
+    def start(self):
+        if tracemalloc.is_tracing():
+            self._before = tracemalloc.take_snapshot()
+            self._started_at = datetime.now().isoformat()
+
+    def stop(self):
+        before, self._before = self._before, None
+        if before is not None and tracemalloc.is_tracing():
+            _record_diff(self.tag, self._started_at, before, tracemalloc.take_snapshot())
+
+
+@contextmanager
+def track_job(tag: str):
+    """
+    with ブロックの前後のスナップショットの差分を記録する
+    """
+    tracker = JobTracker(tag)
+    tracker.start()
+    try:
+        yield
+    finally:
+        tracker.stop()
+
+
+def _record_diff(tag: str, started_at: str, before, after):
+    # tracemalloc 自身の確保分は除外
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    top = [
+        {
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_diff_bytes': stat.size_diff,
+            'count_diff': stat.count_diff
+        }
+        for stat in stats[:DIFF_TOP_N]
+    ]
+    with _lock:
+        _job_diffs.append({
+            'tag': tag,
+            'started_at': started_at,
+            'finished_at': datetime.now().isoformat(),
+            'size_diff_bytes': sum(stat.size_diff for stat in stats),
+            'top': top
+        })
+
+
+def job_diffs() -> List[Dict]:
+    """
+    記録済みのジョブごとの差分（新しい順）
+    """
+    with _lock:
+        return list(reversed(_job_diffs))
+
+
+def report() -> Dict:
+    """
+    管理用APIで返すメモリ使用状況
+    """
+    return {
+        'process': process_memory(),
+        'tracemalloc': tracing_report(),
+        'subsystems': subsystem_report(),
+        'jobs': job_diffs()
+    }
+
+
+metrics.gauge('sales_bot_process_resident_bytes', 'プロセスの常駐メモリ（バイト）',
+              callback=lambda: float(process_memory()['rss_bytes'] or 0))
+
+if TRACK_MEMORY:
+    enable_tracing()
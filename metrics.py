@@ -0,0 +1,448 @@
+"""
+メトリクスモジュール
+処理段階ごとの所要時間・HTTP通信量などを集計し、Prometheus のテキスト形式で出力する
+"""
+
+import contextvars
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 所要時間ヒストグラムのバケット（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# 通信量ヒストグラムのバケット（バイト）
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class _Metric:
+    """
+    ラベルつきメトリクスの基底クラス
+    """
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        # 出力時に値を取得する関数（ラベルなしのゲージのみ）
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        if self._callback is not None:
+            return self._callback()
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        if self._callback is not None:
+            try:
+                self.set(self._callback())
+            except Exception:
+                pass
+        return super().render()
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def summary(self, **labels) -> Dict[str, float]:
+        """
+        件数と合計値を返す
+        """
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if not state:
+                return {'count': 0, 'sum': 0.0}
+            return {'count': state['count'], 'sum': state['sum']}
+
+    def _render_sample(self, key, state) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['counts']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """
+    メトリクスの登録先
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (),
+          callback: Optional[Callable[[], float]] = None) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames, callback))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render() -> str:
+    """
+    すべてのメトリクスを Prometheus のテキスト形式で出力
+    """
+    return REGISTRY.render()
+
+
+# ---- 共通メトリクス ----
+
+STAGE_SECONDS = histogram(
+    'sales_bot_stage_duration_seconds', '処理段階ごとの所要時間（秒）', ['stage'])
+
+HTTP_REQUEST_SECONDS = histogram(
+    'sales_bot_http_request_duration_seconds', 'ホストごとのHTTPリクエスト所要時間（秒）', ['host'])
+
+HTTP_REQUESTS = counter(
+    'sales_bot_http_requests_total', 'ホスト・結果ごとのHTTPリクエスト数', ['host', 'status'])
+
+HTTP_RESPONSE_BYTES = counter(
+    'sales_bot_http_response_bytes_total', 'ホストごとのダウンロード量（バイト）', ['host'])
+
+HTTP_RESPONSE_SIZE = histogram(
+    'sales_bot_http_response_size_bytes', 'ホストごとのレスポンス1件のサイズ（バイト）', ['host'],
+    buckets=BYTES_BUCKETS)
+
+CACHE_REQUESTS = counter(
+    'sales_bot_cache_requests_total', 'キャッシュ参照数（result=hit|miss）', ['cache', 'result'])
+
+JOB_QUEUE_DEPTH = gauge(
+    'sales_bot_job_queue_depth', '実行待ちの検索ジョブ数')
+
+JOBS_IN_PROGRESS = gauge(
+    'sales_bot_jobs_in_progress', '実行中の検索ジョブ数')
+
+RATE_LIMIT_SLEEP_SECONDS = counter(
+    'sales_bot_rate_limit_sleep_seconds_total', 'リクエスト間隔の待機に費やした時間（秒）')
+
+SKIPPED_WORK = counter(
+    'sales_bot_skipped_work_total', '指定されていない項目のために省略した処理の数（取得・抽出）', ['work'])
+
+
+class SearchStats:
+    """
+    1回の検索で使った時間・通信量などの内訳
+
+    処理段階は入れ子になるため（例: keyman_discovery の中の page_fetch）、
+    段階ごとの時間を合計しても全体の所要時間とは一致しない
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.wall_seconds = 0.0
+        self.stages: Dict[str, float] = {}
+        self.http_requests = 0
+        self.http_errors = 0
+        self.bytes_downloaded = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rate_limit_sleep_seconds = 0.0
+        self.rows = 0
+        self.truncated = False  # 締め切りを過ぎて途中で打ち切った
+        self.skipped: Dict[str, int] = {}  # 指定されていない項目のために省略した処理の数
+
+    def add_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_http(self, num_bytes: int = 0, error: bool = False):
+        with self._lock:
+            self.http_requests += 1
+            self.bytes_downloaded += num_bytes
+            if error:
+                self.http_errors += 1
+
+    def add_cache(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+
+    def add_sleep(self, seconds: float):
+        with self._lock:
+            self.rate_limit_sleep_seconds += seconds
+
+    def add_skipped(self, work: str, count: int = 1):
+        with self._lock:
+            self.skipped[work] = self.skipped.get(work, 0) + count
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self._start
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> 'SearchStats':
+        """
+        to_dict() の値から復元（中断した検索を再開して加算を続ける）
+        """
+        stats = cls()
+        if not data:
+            return stats
+        stats._start -= data.get('wall_seconds', 0.0)
+        stats.stages = dict(data.get('stages') or {})
+        stats.skipped = dict(data.get('skipped') or {})
+        for name in ('http_requests', 'http_errors', 'bytes_downloaded', 'cache_hits', 'cache_misses',
+                     'rate_limit_sleep_seconds', 'rows', 'truncated'):
+            setattr(stats, name, data.get(name, getattr(stats, name)))
+        return stats
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'wall_seconds': round(self.wall_seconds or time.perf_counter() - self._start, 3),
+                'stages': {stage: round(seconds, 3) for stage, seconds in sorted(self.stages.items())},
+                'http_requests': self.http_requests,
+                'http_errors': self.http_errors,
+                'bytes_downloaded': self.bytes_downloaded,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'rate_limit_sleep_seconds': round(self.rate_limit_sleep_seconds, 3),
+                'rows': self.rows,
+                'truncated': self.truncated,
+                'skipped': dict(sorted(self.skipped.items()))
+            }
+
+
+# 実行中の検索の内訳（スレッド・タスクごと）
+_current_stats: contextvars.ContextVar = contextvars.ContextVar('search_stats', default=None)
+
+
+def current_stats() -> Optional[SearchStats]:
+    """
+    実行中の検索の内訳（検索の外では None）
+    """
+    return _current_stats.get()
+
+
+@contextmanager
+def collect_stats():
+    """
+    with ブロック内の処理を1回の検索の内訳として集計する
+    """
+    stats = SearchStats()
+    with bind_stats(stats):
+        try:
+            yield stats
+        finally:
+            stats.finish()
+
+
+@contextmanager
+def bind_stats(stats: SearchStats):
+    """
+    with ブロック内の処理を既存の内訳に加算する（複数のスレッドで段階的に実行する検索用）
+    """
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def observe_stage(stage: str, seconds: float):
+    """
+    処理段階の所要時間を記録
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add_stage(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    with ブロックの所要時間を処理段階として記録
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """
+    関数の所要時間を処理段階として記録するデコレーター
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe_stage(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache: str, hit: bool):
+    """
+    キャッシュの参照結果を記録
+    """
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add_cache(hit)
+
+
+def record_http(host: str, status: str, seconds: float, num_bytes: int = 0):
+    """
+    HTTPリクエストの結果を記録
+    """
+    HTTP_REQUEST_SECONDS.observe(seconds, host=host)
+    HTTP_REQUESTS.inc(host=host, status=status)
+    if status != 'error':
+        HTTP_RESPONSE_SIZE.observe(num_bytes, host=host)
+    if num_bytes:
+        HTTP_RESPONSE_BYTES.inc(num_bytes, host=host)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add_http(num_bytes, error=(status == 'error'))
+
+
+def record_skipped(work: str, count: int = 1):
+    """
+    指定されていない項目のために省略した処理を記録
+    """
+    if count <= 0:
+        return
+    SKIPPED_WORK.inc(count, work=work)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add_skipped(work, count)
+
+
+def record_sleep(seconds: float):
+    """
+    リクエスト間隔の待機時間を記録
+    """
+    RATE_LIMIT_SLEEP_SECONDS.inc(seconds)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.add_sleep(seconds)
@@ -0,0 +1,76 @@
+"""
+氏名割り当てモジュール
+サンプルキーマンの氏名を、検索ごとの範囲（スコープ）内で重複なく割り当てる
+
+姓 × 名 の全組み合わせを事前に1回だけシャッフルした順列を持ち、
+スコープごとに開始位置とカーソルだけを保持するため、
+割り当ては O(1)・メモリはスコープ数に関係なく一定
+"""
+
+import itertools
+import random
+import zlib
+from typing import List, Sequence
+
+
+class NameScope:
+    """
+    1回の検索（またはバッチ）内での氏名の割り当て
+
+    順列を開始位置から順にたどるため、プールの大きさ（姓の数 × 名の数）までは重複しない。
+    使い切った場合は同じ順序で先頭から再利用する（結果は常に決定的）
+    """
+
+    def __init__(self, allocator: 'NameAllocator', start: int, offset: int = 0):
+        self._allocator = allocator
+        self._start = start
+        # next() はスレッドセーフ（並列に割り当てても同じ番号は返らない）
+        self._counter = itertools.count(offset)
+        self._position = offset
+
+    @property
+    def position(self) -> int:
+        """
+        割り当て済みの数（中断した検索を offset に渡して再開する。並列に割り当て中の値は概算）
+        """
+        return self._position
+
+    def allocate(self) -> str:
+        """
+        次の氏名を返す
+        """
+        index = next(self._counter)
+        self._position = max(self._position, index + 1)
+        return self._allocator.name_at(self._start + index)
+
+
+class NameAllocator:
+    """
+    姓 × 名 の組み合わせの順列（シード固定）
+
+    Args:
+        last_names: 姓のリスト
+        first_names: 名のリスト
+        seed: 順列の乱数シード
+    """
+
+    def __init__(self, last_names: Sequence[str], first_names: Sequence[str], seed: int = 0):
+        if not last_names or not first_names:
+            raise ValueError("姓・名のリストが空です")
+
+        self._names: List[str] = [f"{last} {first}" for last in last_names for first in first_names]
+        random.Random(seed).shuffle(self._names)
+
+    @property
+    def size(self) -> int:
+        return len(self._names)
+
+    def name_at(self, index: int) -> str:
+        return self._names[index % len(self._names)]
+
+    def scope(self, key: str, offset: int = 0) -> NameScope:
+        """
+        スコープを作成（同じキーなら同じ開始位置・同じ氏名の並びになる。offset 件目から割り当てる）
+        """
+        start = zlib.crc32(str(key).encode('utf-8')) % len(self._names)
+        return NameScope(self, start, offset)
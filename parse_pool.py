@@ -0,0 +1,276 @@
+"""
+解析プロセスプールモジュール
+取得した企業ページの HTML 解析（BeautifulSoup・get_text()）と詳細情報・キーマンの抽出（正規表現）を
+別プロセスで実行する
+
+解析・抽出は Python のコードで GIL を保持するため、取得のスレッドを増やしても大きなページでは速くならない。
+PARSE_PROCESSES を1以上にすると、CompanySearch・KeymanFinder はページの内容（bytes）をこのプールに渡し、
+抽出結果だけを受け取る（0の場合は従来どおり取得したスレッドで解析する）
+
+プロセス間通信の回数を減らすため、依頼は PARSE_BATCH_SIZE 件まで（最初の依頼から PARSE_BATCH_WAIT 秒まで）
+まとめて1回で送る。子プロセスで計測した処理段階の時間・省略した抽出は、依頼したスレッドの検索の内訳に加算する
+
+締め切りを過ぎた依頼は送る前に除き、送った後も子プロセスが解析を始める前に締め切り（time.time() の時刻）を
+確認して省略する。解析を始めた後は止められないため、依頼元が待つのをやめた場合も最後まで解析して結果を捨てる
+"""
+
+import math
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import metrics
+import projection
+from config import PARSE_PROCESSES, PARSE_BATCH_SIZE, PARSE_BATCH_WAIT
+from deadline import Deadline, DeadlineExceeded
+
+# 解析の種類
+#   company: 企業ページ → 詳細情報（CompanySearch._extract_details）
+#   keymen : 企業ページ → キーマン（KeymanFinder._extract_keymen_from_text）
+TASK_KINDS = ('company', 'keymen')
+
+PARSE_TASKS = metrics.counter(
+    'sales_bot_parse_pool_tasks_total', '解析プロセスプールで実行した解析の数', ('kind', 'result'))
+PARSE_POOL_STARTS = metrics.counter(
+    'sales_bot_parse_pool_starts_total', '解析プロセスプールの起動の数（error: 起動できずにスレッドで解析）', ('result',))
+PARSE_BATCH_SIZES = metrics.histogram(
+    'sales_bot_parse_pool_batch_size', '解析プロセスプールに1回で送った解析の数', (),
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+
+
+# ---- 子プロセス ----
+
+_company_search = None
+_keyman_finder = None
+
+
+def _init_worker():
+    """
+    子プロセスの初期化（抽出に使うインスタンスを1回だけ作成）
+    """
+    global _company_search, _keyman_finder
+    from company_search import CompanySearch
+    from keyman_finder import KeymanFinder
+    # 子プロセスの中ではさらにプールを作らない
+    set_pool(None)
+    _company_search = CompanySearch()
+    _keyman_finder = KeymanFinder()
+
+
+def parse_page(kind: str, content: bytes, snippet: str = '', fields: Optional[Sequence[str]] = None):
+    """
+    ページを解析して抽出結果を返す（company: 詳細情報の辞書 / keymen: キーマンのリスト）
+    """
+    from bs4 import BeautifulSoup
+    if _company_search is None:
+        _init_worker()
+
+    with metrics.span('html_parse'):
+        soup = BeautifulSoup(content, 'html.parser')
+    with metrics.span('text_extraction'):
+        text = soup.get_text()
+
+    if kind == 'company':
+        detailed_info = {field: '' for field in projection.DETAIL_FIELDS}
+        _company_search._extract_details(detailed_info, text, snippet, fields)
+        return detailed_info
+    if kind == 'keymen':
+        return _keyman_finder._extract_keymen_from_text(text)
+    raise ValueError(f"不明な解析の種類です: {kind}（{' / '.join(TASK_KINDS)}）")
+
+
+def _parse_batch(tasks: List[Tuple[Tuple, Optional[float]]]) -> List[Dict]:
+    """
+    まとめて送られた解析（解析の引数, 締め切りの時刻）を順に実行（1件の失敗は他の解析に影響させない）。
+    締め切りを過ぎた解析は始めない（expired）
+    """
+    results = []
+    for task, expires_at in tasks:
+        if expires_at is not None and time.time() >= expires_at:
+            results.append({'value': None, 'error': None, 'expired': True, 'stages': {}, 'skipped': {}})
+            continue
+        with metrics.collect_stats() as stats:
+            try:
+                value, error = parse_page(*task), None
+            except Exception as e:
+                value, error = None, f"{type(e).__name__}: {e}"
+        results.append({'value': value, 'error': error, 'expired': False, 'stages': stats.stages,
+                        'skipped': stats.skipped})
+    return results
+
+
+# ---- 親プロセス ----
+
+class ParsePool:
+    """
+    解析を子プロセスで実行するプール（依頼は少しの間ためてからまとめて送る）
+
+    Args:
+        processes: 子プロセス数
+        batch_size: 1回で送る解析の最大数
+        batch_wait: 最初の依頼から送るまでに他の依頼を待つ秒数
+    """
+
+    def __init__(self, processes: int = PARSE_PROCESSES, batch_size: int = PARSE_BATCH_SIZE,
+                 batch_wait: float = PARSE_BATCH_WAIT):
+        self.processes = max(int(processes), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.batch_wait = max(float(batch_wait), 0.0)
+        # fork はスレッドを使う親プロセスで安全でないため spawn で起動する
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=get_context('spawn'),
+                                             initializer=_init_worker)
+        self._queue: List[Tuple[Tuple, Future, Optional[Deadline]]] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._dispatch, name='parse-pool-dispatch', daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, content: bytes, snippet: str = '',
+               fields: Optional[Sequence[str]] = None, deadline: Optional[Deadline] = None) -> Future:
+        """
+        解析を依頼（結果は _parse_batch() の1件分: {'value', 'error', 'expired', 'stages', 'skipped'}）。
+        deadline を過ぎた依頼は子プロセスに送らず、DeadlineExceeded で完了する
+        """
+        if kind not in TASK_KINDS:
+            raise ValueError(f"不明な解析の種類です: {kind}（{' / '.join(TASK_KINDS)}）")
+        future = Future()
+        task = (kind, content, snippet, tuple(fields) if fields is not None else None)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("解析プロセスプールは停止しています")
+            self._queue.append((task, future, deadline))
+            self._cond.notify()
+        return future
+
+    def parse(self, kind: str, content: bytes, snippet: str = '', fields: Optional[Sequence[str]] = None,
+              deadline: Optional[Deadline] = None):
+        """
+        解析して抽出結果を返す（子プロセスの処理段階の時間・省略した抽出は呼び出し元の内訳に加算する）
+
+        Raises:
+            DeadlineExceeded: 締め切りまでに解析が終わらなかった
+            RuntimeError: 子プロセスでの解析に失敗した
+        """
+        future = self.submit(kind, content, snippet, fields, deadline)
+        timeout = deadline.remaining() if deadline is not None else None
+        try:
+            with metrics.span('parse_pool'):
+                # 期限のない締め切り（deadline.CancellableDeadline）は完了まで待つ
+                result = future.result(timeout=None if timeout == math.inf else timeout)
+        except (FutureTimeoutError, DeadlineExceeded):
+            # まだ送っていなければ取り消す（送った後の解析は止められず、結果は使わない）
+            future.cancel()
+            deadline.truncated = True
+            PARSE_TASKS.inc(kind=kind, result='expired')
+            raise DeadlineExceeded("締め切りまでにページの解析が終わりませんでした")
+
+        for stage, seconds in result['stages'].items():
+            metrics.observe_stage(stage, seconds)
+        for work, count in result['skipped'].items():
+            metrics.record_skipped(work, count)
+        if result['error'] is not None:
+            PARSE_TASKS.inc(kind=kind, result='error')
+            raise RuntimeError(f"ページの解析に失敗しました: {result['error']}")
+        PARSE_TASKS.inc(kind=kind, result='ok')
+        return result['value']
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # 最初の依頼から batch_wait 秒までは、batch_size 件たまるのを待つ
+                send_at = time.monotonic() + self.batch_wait
+                while len(self._queue) < self.batch_size and not self._closed:
+                    remaining = send_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+
+            # 送る前に取り消された依頼・締め切りを過ぎた依頼は除く
+            pending = []
+            for task, future, deadline in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if deadline is not None and deadline.expired:
+                    future.set_exception(DeadlineExceeded("締め切りを過ぎたためページを解析しませんでした"))
+                    continue
+                # 子プロセスでも解析を始める前に確認する（期限のない締め切りは確認しない）
+                expires_at = deadline.expires_at if deadline is not None and deadline.expires_at != math.inf else None
+                pending.append(((task, expires_at), future))
+            if pending:
+                self._send(pending)
+
+    def _send(self, batch: List[Tuple[Tuple, Future]]):
+        PARSE_BATCH_SIZES.observe(len(batch))
+        try:
+            sent = self._executor.submit(_parse_batch, [task for task, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        sent.add_done_callback(lambda done: self._resolve(batch, done))
+
+    @staticmethod
+    def _resolve(batch: List[Tuple[Tuple, Future]], done: Future):
+        try:
+            results = done.result()
+        except Exception as e:
+            # 子プロセスが異常終了した場合など
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if result['expired']:
+                future.set_exception(DeadlineExceeded("締め切りを過ぎたためページを解析しませんでした"))
+            else:
+                future.set_result(result)
+
+
+_pool: Optional[ParsePool] = None
+_pool_lock = threading.Lock()
+_pool_failed = False
+
+
+def get_pool() -> Optional[ParsePool]:
+    """
+    プロセス共通の解析プロセスプール（PARSE_PROCESSES が0の場合・起動に失敗した場合は None）
+    """
+    global _pool, _pool_failed
+    if _pool is not None or _pool_failed or PARSE_PROCESSES <= 0:
+        return _pool
+    with _pool_lock:
+        if _pool is None and not _pool_failed:
+            try:
+                _pool = ParsePool()
+                PARSE_POOL_STARTS.inc(result='ok')
+            except Exception as e:
+                # 子プロセスを起動できない環境では、取得したスレッドで解析する
+                PARSE_POOL_STARTS.inc(result='error')
+                print(f"解析プロセスプールを起動できませんでした（スレッドで解析します）: {e}")
+                traceback.print_exc()
+                _pool_failed = True
+    return _pool
+
+
+def set_pool(pool: Optional[ParsePool]):
+    """
+    プロセス共通の解析プロセスプールを差し替える（ベンチマークなど。None で無効）
+    """
+    global _pool, _pool_failed
+    with _pool_lock:
+        _pool = pool
+        _pool_failed = pool is None
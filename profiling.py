@@ -0,0 +1,162 @@
+"""
+プロファイリングモジュール
+検索を cProfile で計測し、検索IDつきのプロファイルファイルとして保存する
+
+有効化の方法:
+    - リクエストごと: SearchRequest.profile = true
+    - すべての検索: 環境変数 PROFILE_SEARCHES=true
+
+保存されたファイルは python -m pstats <ファイル> や snakeviz などで確認できる
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import PROFILE_DIR, PROFILE_SEARCHES
+
+# プロファイルのファイル名（パストラバーサル防止のため、この形式以外は扱わない）
+PROFILE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+\.(prof|txt)$')
+
+# テキスト要約に載せる関数の数
+SUMMARY_LIMIT = 60
+
+
+def should_profile(requested: Optional[bool] = None) -> bool:
+    """
+    プロファイルを取るかどうか（リクエストの指定がなければ環境変数に従う）
+    """
+    if requested is not None:
+        return bool(requested)
+    return PROFILE_SEARCHES
+
+
+def _safe_tag(tag: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_\-]', '_', str(tag))
+
+
+@contextmanager
+def profile(tag: str, enabled: bool = True, profile_dir: str = PROFILE_DIR):
+    """
+    with ブロック内の処理をプロファイルし、<tag>_<日時>.prof と要約の .txt を保存する
+
+    Yields:
+        保存するファイル名（拡張子なし）。無効時・他のプロファイラが動作中の場合は None
+    """
+    if not enabled:
+        yield None
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # 同じスレッドで別のプロファイラが動作中
+        print(f"  ⚠️ プロファイラを開始できませんでした（{tag}）")
+        yield None
+        return
+
+    name = f"{_safe_tag(tag)}_{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    try:
+        yield name
+    finally:
+        profiler.disable()
+        try:
+            _save(profiler, name, profile_dir)
+        except Exception as e:
+            print(f"  ⚠️ プロファイルの保存に失敗しました: {e}")
+
+
+class JobProfiler:
+    """
+    複数回に分けて（別々のスレッドで）実行されるジョブのプロファイルを1つにまとめる
+
+    step() の with ブロックごとに計測し、save() で保存する
+    """
+
+    def __init__(self, tag: str, enabled: bool = True, profile_dir: str = PROFILE_DIR):
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+        self.name = f"{_safe_tag(tag)}_{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        self._profiler = cProfile.Profile() if enabled else None
+        self._lock = threading.Lock()
+        self._used = False
+
+    @contextmanager
+    def step(self):
+        if not self.enabled:
+            yield
+            return
+        # 同じ Profile を同時に複数のスレッドで有効にはできない
+        with self._lock:
+            try:
+                self._profiler.enable()
+            except ValueError:
+                yield
+                return
+            self._used = True
+            try:
+                yield
+            finally:
+                self._profiler.disable()
+
+    def save(self):
+        if not self.enabled or not self._used:
+            return
+        try:
+            _save(self._profiler, self.name, self.profile_dir)
+        except Exception as e:
+            print(f"  ⚠️ プロファイルの保存に失敗しました: {e}")
+
+
+def _save(profiler: cProfile.Profile, name: str, profile_dir: str):
+    os.makedirs(profile_dir, exist_ok=True)
+    profiler.dump_stats(os.path.join(profile_dir, f"{name}.prof"))
+
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats('cumulative').print_stats(SUMMARY_LIMIT)
+    with open(os.path.join(profile_dir, f"{name}.txt"), 'w', encoding='utf-8') as f:
+        f.write(summary.getvalue())
+
+    print(f"  ✓ プロファイルを保存しました: {os.path.join(profile_dir, name)}.prof")
+
+
+def list_profiles(tag: Optional[str] = None, profile_dir: str = PROFILE_DIR) -> List[Dict]:
+    """
+    保存済みのプロファイル一覧（新しい順）
+    """
+    if not os.path.isdir(profile_dir):
+        return []
+
+    prefix = f"{_safe_tag(tag)}_" if tag else ''
+    profiles = []
+    for filename in os.listdir(profile_dir):
+        if not PROFILE_NAME_PATTERN.match(filename) or not filename.startswith(prefix):
+            continue
+        path = os.path.join(profile_dir, filename)
+        stat = os.stat(path)
+        profiles.append({
+            'name': filename,
+            'size': stat.st_size,
+            'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat()
+        })
+
+    profiles.sort(key=lambda p: (p['created_at'], p['name']), reverse=True)
+    return profiles
+
+
+def profile_path(name: str, profile_dir: str = PROFILE_DIR) -> Optional[str]:
+    """
+    プロファイルのファイルパス（存在しない・不正な名前の場合は None）
+    """
+    if not PROFILE_NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(profile_dir, name)
+    return path if os.path.isfile(path) else None
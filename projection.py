@@ -0,0 +1,67 @@
+"""
+項目指定モジュール
+検索結果に必要な項目（列）を指定し、指定されていない項目のためだけの取得・抽出・検索を省略する
+
+    詳細情報（DETAIL_FIELDS）: どれも指定されていなければ企業ページを取得しない。抽出は指定された項目のみ
+    キーマン（KEYMAN_FIELDS）: キーマン・SNSの項目がどれも指定されていなければキーマンを特定しない
+    SNS（SNS_FIELDS）      : 指定された SNS のみ検索する
+
+省略した処理は metrics.record_skipped() で検索の内訳（stats の skipped）とメトリクスに記録する
+"""
+
+from typing import Dict, Optional, Sequence, Tuple
+
+BASIC_FIELDS = ('企業名', '企業URL', '事業概要')
+DETAIL_FIELDS = ('設立年', '売上', '利益', '従業員規模', '事業領域', '注力ポイント')
+KEYMAN_FIELDS = ('キーマン氏名', '役職名')
+# 結果の項目 → SNSFinder.find_sns_accounts() のキー
+SNS_FIELDS = {
+    'Facebook URL': 'Facebook',
+    'X（旧Twitter） URL': 'X（旧Twitter）',
+}
+
+ALL_FIELDS = BASIC_FIELDS + DETAIL_FIELDS + KEYMAN_FIELDS + tuple(SNS_FIELDS)
+# Webサービス版（SNS検索は行わない）で指定できる項目
+SEARCH_FIELDS = BASIC_FIELDS + DETAIL_FIELDS + KEYMAN_FIELDS
+
+# 企業ごとの結果をまとめるため、常に含める項目
+KEY_FIELD = '企業名'
+
+
+def validate_fields(fields: Optional[Sequence[str]], allowed: Sequence[str] = ALL_FIELDS) -> Optional[Tuple[str, ...]]:
+    """
+    指定された項目を検証（省略時は None: すべての項目）。企業名は常に含める
+
+    Raises:
+        ValueError: 不明な項目
+    """
+    if fields is None:
+        return None
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"指定できない項目です: {'、'.join(unknown)}（{' / '.join(allowed)}）")
+    return tuple(dict.fromkeys([KEY_FIELD, *fields]))
+
+
+def wants(fields: Optional[Sequence[str]], field: str) -> bool:
+    """項目が必要かどうか（fields が None の場合はすべて必要）"""
+    return fields is None or field in fields
+
+
+def wants_any(fields: Optional[Sequence[str]], candidates: Sequence[str]) -> bool:
+    return fields is None or any(field in fields for field in candidates)
+
+
+def needs_keymen(fields: Optional[Sequence[str]]) -> bool:
+    """キーマンの特定が必要かどうか（SNS の検索にもキーマンが必要）"""
+    return wants_any(fields, KEYMAN_FIELDS + tuple(SNS_FIELDS))
+
+
+def project(row: Dict, fields: Optional[Sequence[str]]) -> Dict:
+    """
+    結果の行を指定された項目に絞り込む（fields が None の場合はそのまま）
+    """
+    if fields is None:
+        return row
+    return {field: row.get(field, '') for field in fields}
+
@@ -0,0 +1,257 @@
+"""
+実行の途中経過モジュール（コマンドライン版）
+AISalesBot.run()・run_batch() の途中経過を実行ごとのディレクトリに保存し、中断した実行を続きから再開する
+
+    <RUN_CHECKPOINT_DIR>/<実行ID>/
+        manifest.json     実行の内容（種類・検索条件・企業数・項目など）と検索条件ごとの状態
+        query_001.jsonl   検索条件ごとの途中経過（1行1レコード、追記のみ）
+            {"type": "companies", "companies": [...]}                         企業検索の結果
+            {"type": "company", "index": 0, "rows": [...], "names_used": 5}   SNS検索まで終わった企業
+
+途中経過は1社ごとに追記して flush・fsync するため、プロセスが途中で停止しても完了した企業は失われない
+（書きかけの最終行は読み込み時に切り捨てる）。再開すると企業検索と完了した企業の処理を省略して次の企業から続ける
+
+    python main.py --resume 20250101_120000
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import RUN_CHECKPOINT_DIR
+
+MANIFEST_FILE = 'manifest.json'
+
+# 実行の種類
+#   run  : AISalesBot.run()（検索条件1件）
+#   batch: AISalesBot.run_batch()（検索条件ごとの状態を manifest の queries に記録）
+RUN_KINDS = ('run', 'batch')
+
+_RUN_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def validate_run_id(run_id: str) -> str:
+    """
+    実行IDを検証（ディレクトリ名に使うため英数字・_・-・. のみ）
+
+    Raises:
+        ValueError: 使えない文字を含む実行ID
+    """
+    if not run_id or not _RUN_ID_PATTERN.match(run_id) or run_id in ('.', '..'):
+        raise ValueError(f"実行IDに使えない文字が含まれています: {run_id!r}（英数字・_・-・. のみ）")
+    return run_id
+
+
+class QueryCheckpoint:
+    """
+    検索条件1件の途中経過（取得済みの企業と、SNS検索まで終わった企業の結果行）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.companies: Optional[List[Dict]] = None
+        self.names_used = 0
+        self._rows: Dict[int, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def completed(self) -> int:
+        """
+        先頭から続けて処理の終わった企業数（再開する企業の番号）
+        """
+        index = 0
+        while index in self._rows:
+            index += 1
+        return index
+
+    def rows(self) -> List[Dict]:
+        """
+        処理の終わった企業の結果行（企業の順）
+        """
+        return [row for index in range(self.completed) for row in self._rows[index]]
+
+    def save_companies(self, companies: List[Dict]):
+        self.companies = companies
+        self._append({'type': 'companies', 'companies': companies})
+
+    def save_company(self, index: int, rows: List[Dict], names_used: int):
+        self._rows[index] = rows
+        self.names_used = names_used
+        self._append({'type': 'company', 'index': index, 'rows': rows, 'names_used': names_used})
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        valid_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                # 書き込み中に停止した行（以降は読まない）
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+                if record.get('type') == 'companies':
+                    self.companies = record['companies']
+                    # 企業検索をやり直した場合は、それまでの企業の結果を使わない
+                    self._rows = {}
+                    self.names_used = 0
+                elif record.get('type') == 'company':
+                    self._rows[record['index']] = record['rows']
+                    self.names_used = record.get('names_used', self.names_used)
+
+        # 書きかけの行を切り捨ててから追記する
+        if valid_bytes < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+
+
+class RunCheckpoint:
+    """
+    1回の実行（run / batch）の途中経過
+
+    Args:
+        directory: 実行のディレクトリ（<RUN_CHECKPOINT_DIR>/<実行ID>）
+        manifest: manifest.json の内容
+    """
+
+    def __init__(self, directory: str, manifest: Dict):
+        self.directory = directory
+        self.manifest = manifest
+        self._lock = threading.Lock()
+        self._queries: Dict[int, QueryCheckpoint] = {}
+
+    @classmethod
+    def create(cls, kind: str, arguments: Dict, run_id: Optional[str] = None,
+               base_dir: str = RUN_CHECKPOINT_DIR) -> 'RunCheckpoint':
+        """
+        新しい実行を作成（run_id を省略した場合は開始時刻。同じ実行IDがあれば末尾に番号をつける）
+
+        Raises:
+            ValueError: 不明な種類・使えない実行ID
+        """
+        if kind not in RUN_KINDS:
+            raise ValueError(f"不明な実行の種類です: {kind}（{' / '.join(RUN_KINDS)}）")
+        base_id = validate_run_id(run_id or datetime.now().strftime("%Y%m%d_%H%M%S"))
+        os.makedirs(base_dir, exist_ok=True)
+        run_id, suffix = base_id, 1
+        while True:
+            directory = os.path.join(base_dir, run_id)
+            try:
+                os.makedirs(directory)
+                break
+            except FileExistsError:
+                suffix += 1
+                run_id = f"{base_id}_{suffix}"
+
+        now = datetime.now().isoformat()
+        checkpoint = cls(directory, {
+            'run_id': run_id,
+            'kind': kind,
+            'status': 'running',
+            'created_at': now,
+            'updated_at': now,
+            'resumed': 0,
+            'arguments': arguments,
+            'queries': {}
+        })
+        checkpoint._write_manifest()
+        return checkpoint
+
+    @classmethod
+    def load(cls, run_id: str, base_dir: str = RUN_CHECKPOINT_DIR) -> 'RunCheckpoint':
+        """
+        保存された実行を読み込む（再開した回数を記録する）
+
+        Raises:
+            FileNotFoundError: 実行が見つからない
+            ValueError: 使えない実行ID・壊れた manifest.json
+        """
+        directory = os.path.join(base_dir, validate_run_id(run_id))
+        path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"実行が見つかりません: {run_id}（{directory}）")
+        try:
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"実行の manifest.json を読み込めません: {e}")
+        if manifest.get('kind') not in RUN_KINDS:
+            raise ValueError(f"不明な実行の種類です: {manifest.get('kind')}")
+
+        checkpoint = cls(directory, manifest)
+        with checkpoint._lock:
+            manifest['resumed'] = manifest.get('resumed', 0) + 1
+            manifest['status'] = 'running'
+            checkpoint._write_manifest()
+        return checkpoint
+
+    @property
+    def run_id(self) -> str:
+        return self.manifest['run_id']
+
+    @property
+    def kind(self) -> str:
+        return self.manifest['kind']
+
+    @property
+    def arguments(self) -> Dict:
+        return self.manifest['arguments']
+
+    def query(self, index: int) -> QueryCheckpoint:
+        """
+        検索条件（1から数える番号）の途中経過
+        """
+        with self._lock:
+            progress = self._queries.get(index)
+            if progress is None:
+                progress = self._queries[index] = QueryCheckpoint(
+                    os.path.join(self.directory, f"query_{index:03d}.jsonl"))
+            return progress
+
+    def query_entry(self, index: int) -> Optional[Dict]:
+        """
+        終わった検索条件の結果（run_batch() の要約の1件分。まだ終わっていなければ None）
+        """
+        return self.manifest['queries'].get(str(index))
+
+    def record_query(self, index: int, entry: Dict):
+        """
+        検索条件が終わったことを記録
+        """
+        with self._lock:
+            self.manifest['queries'][str(index)] = entry
+            self._write_manifest()
+
+    def finish(self, status: str):
+        """
+        実行の終了を記録（completed: すべて完了 / incomplete: 失敗・中断した検索条件がある）
+        """
+        with self._lock:
+            self.manifest['status'] = status
+            self._write_manifest()
+
+    def _write_manifest(self):
+        # 書き込み中に停止しても壊れないよう、一時ファイルに書いてから置き換える
+        self.manifest['updated_at'] = datetime.now().isoformat()
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
@@ -0,0 +1,256 @@
+"""
+スケジューラーモジュール
+検索ジョブを企業単位のステップに分け、送信者（APIキー・クライアント）ごとに公平に実行する
+
+重み付き公平キュー（WFQ）:
+    送信者 × 優先度クラスごとにフローを作り、各フローの次のステップに
+    仮想終了時刻 = max(仮想時刻, フローの前回の終了時刻) + ステップのコスト / 重み
+    を付けて、最も小さいものから実行する。大きなバッチ検索が実行中でも、
+    他の送信者の小さな検索のステップが間に入るため、数秒で完了する
+
+優先度クラス（PRIORITY_WEIGHTS）:
+    interactive: 画面からの小さな検索（省略時、コストが SCHEDULER_INTERACTIVE_MAX_COST 以下なら自動で選ばれる）
+    normal     : 通常の検索
+    batch      : 急がない大きな検索
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
+
+import metrics
+from config import SCHEDULER_WORKERS, SCHEDULER_INTERACTIVE_MAX_COST
+
+# 優先度クラスごとの重み（大きいほど多く実行される）
+PRIORITY_WEIGHTS = {
+    'interactive': 8.0,
+    'normal': 2.0,
+    'batch': 1.0,
+}
+
+DEFAULT_SUBMITTER = 'anonymous'
+
+SCHEDULER_STEPS = metrics.counter(
+    'sales_bot_scheduler_steps_total', 'スケジューラーが実行したステップ数', ('priority',))
+SCHEDULER_STEP_COST = metrics.counter(
+    'sales_bot_scheduler_step_cost_total', 'スケジューラーが実行したステップのコストの合計', ('priority',))
+SCHEDULER_WAIT_SECONDS = metrics.histogram(
+    'sales_bot_scheduler_wait_seconds', '検索の受付から最初のステップの実行までの待ち時間（秒）', ('priority',))
+
+
+def classify(cost: int, priority: Optional[str] = None) -> str:
+    """
+    優先度クラスを決める（指定がなければジョブのコストから判定）
+
+    Raises:
+        ValueError: 不明な優先度クラス
+    """
+    if priority:
+        if priority not in PRIORITY_WEIGHTS:
+            raise ValueError(f"不明な優先度です: {priority}（{' / '.join(PRIORITY_WEIGHTS)}）")
+        return priority
+    return 'interactive' if cost <= SCHEDULER_INTERACTIVE_MAX_COST else 'normal'
+
+
+class _Entry:
+    """スケジューラー内の検索ジョブ1件"""
+
+    def __init__(self, job, priority: str, on_done: Optional[Callable]):
+        self.job = job
+        self.priority = priority
+        self.on_done = on_done
+        self.started = False
+        self.submitted_at = time.perf_counter()
+
+
+class _Flow:
+    """送信者 × 優先度クラスごとの実行待ち"""
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.finish = 0.0
+        self.ready: Deque[_Entry] = deque()  # 次のステップを実行できるジョブ（ジョブごとに実行中のステップは1つまで）
+        self.entries: Set[_Entry] = set()  # 実行中のステップがあるものも含めたジョブ
+
+
+class FairScheduler:
+    """
+    検索ジョブのステップを公平に実行するスケジューラー
+
+    ジョブは run_step()（まだステップが残っていれば True）と step_cost・cost を持つ
+    （search_job.SearchJob・search_job.BatchJob）
+
+    Args:
+        workers: ステップを実行するスレッド数
+    """
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS):
+        self.workers = max(int(workers), 1)
+        self._flows: Dict[Tuple[str, str], _Flow] = {}
+        self._vtime = 0.0
+        self._jobs = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._names = itertools.count()
+
+    @property
+    def active_jobs(self) -> int:
+        """受け付けてまだ完了していないジョブ数"""
+        with self._cond:
+            return self._jobs
+
+    def outstanding_cost(self, submitter: Optional[str] = None) -> int:
+        """
+        受け付け済みのジョブの残りのコストの合計（submitter を指定した場合はその送信者の分のみ）
+        """
+        with self._cond:
+            return sum(
+                entry.job.remaining_cost
+                for (flow_submitter, _), flow in self._flows.items()
+                if submitter is None or flow_submitter == submitter
+                for entry in flow.entries
+            )
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._run, name=f"search-scheduler-{next(self._names)}", daemon=True)
+                for _ in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, wait: bool = True):
+        """
+        スケジューラーを停止（wait=True の場合は受け付け済みのジョブの完了を待つ）
+        """
+        with self._cond:
+            if wait:
+                while self._jobs:
+                    self._cond.wait()
+            self._stopping = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        受け付け済みのジョブがすべて完了するまで待つ（タイムアウトした場合は False）
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._jobs == 0, timeout)
+
+    def submit(self, job, submitter: Optional[str] = None, priority: Optional[str] = None,
+               on_done: Optional[Callable] = None) -> str:
+        """
+        ジョブを受け付ける
+
+        Args:
+            job: 検索ジョブ
+            submitter: 送信者（APIキー・クライアントのアドレスなど。公平に扱う単位）
+            priority: 優先度クラス（省略時はジョブのコストから判定）
+            on_done: ジョブの完了時に呼ぶ関数（引数はジョブ）
+
+        Returns:
+            適用した優先度クラス
+        """
+        priority = classify(job.cost, priority)
+        key = (submitter or DEFAULT_SUBMITTER, priority)
+        with self._cond:
+            flow = self._flows.get(key)
+            if flow is None:
+                flow = self._flows[key] = _Flow(PRIORITY_WEIGHTS[priority])
+            entry = _Entry(job, priority, on_done)
+            flow.ready.append(entry)
+            flow.entries.add(entry)
+            self._jobs += 1
+            metrics.JOB_QUEUE_DEPTH.inc()
+            self._cond.notify()
+        self.start()
+        return priority
+
+    def _next(self) -> Optional[Tuple[Tuple[str, str], _Entry]]:
+        # 仮想終了時刻が最も小さいフローの先頭のジョブを選ぶ
+        best = None
+        for key, flow in self._flows.items():
+            if not flow.ready:
+                continue
+            start = max(self._vtime, flow.finish)
+            tag = start + flow.ready[0].job.step_cost / flow.weight
+            if best is None or tag < best[0]:
+                best = (tag, start, key)
+        if best is None:
+            return None
+
+        tag, start, key = best
+        flow = self._flows[key]
+        flow.finish = tag
+        self._vtime = start
+        return key, flow.ready.popleft()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                selected = self._next()
+                while selected is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                    selected = self._next()
+                key, entry = selected
+                if not entry.started:
+                    entry.started = True
+                    metrics.JOB_QUEUE_DEPTH.dec()
+                    SCHEDULER_WAIT_SECONDS.observe(time.perf_counter() - entry.submitted_at, priority=entry.priority)
+
+            SCHEDULER_STEPS.inc(priority=entry.priority)
+            SCHEDULER_STEP_COST.inc(entry.job.step_cost, priority=entry.priority)
+            try:
+                more = entry.job.run_step()
+            except Exception as e:
+                print(f"[Scheduler] ステップの実行に失敗しました: {e}")
+                more = False
+
+            with self._cond:
+                flow = self._flows[key]
+                if more:
+                    # 同じフローの他のジョブと交互に実行
+                    flow.ready.append(entry)
+                else:
+                    flow.entries.discard(entry)
+                    if not flow.entries:
+                        del self._flows[key]
+                self._cond.notify_all()
+
+            if not more:
+                if entry.on_done is not None:
+                    try:
+                        entry.on_done(entry.job)
+                    except Exception as e:
+                        print(f"[Scheduler] 完了時の処理に失敗しました: {e}")
+                with self._cond:
+                    self._jobs -= 1
+                    self._cond.notify_all()
+
+
+_scheduler: Optional[FairScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairScheduler:
+    """
+    プロセス共通のスケジューラー（初回呼び出し時に作成）
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairScheduler()
+    return _scheduler
@@ -0,0 +1,547 @@
+"""
+検索ジョブモジュール
+1件の検索（企業検索 → キーマン特定 → 結果の保存）を実行する
+
+Webサービス（app.py）とワーカー（worker.py）の両方から、scheduler.FairScheduler を通して使う。
+検索には開始から SEARCH_TIMEOUT 秒の締め切りがあり、過ぎた場合はそこまでの結果で完了する（stats の truncated）。
+実行中は CHECKPOINT_INTERVAL 秒ごとに途中経過（checkpoint）を保存し、失敗した検索は保存した途中経過から
+再実行できる（storage.SearchStore.requeue_search）
+"""
+
+import time
+import traceback
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+import enrichment
+import lookup_cache
+import memory_tracking
+import metrics
+import profiling
+import projection
+from config import CHECKPOINT_INTERVAL, WORKER_CHUNK_SECONDS, WORKER_MAX_ATTEMPTS
+from deadline import Deadline, search_deadline
+from storage import SearchStore
+
+if TYPE_CHECKING:
+    # 起動時に requests・BeautifulSoup・numpy を読み込まないよう、型ヒントでのみ参照する
+    from company_search import CompanySearch
+    from keyman_finder import KeymanFinder
+
+# 検索パラメータ（SearchRequest のうち、ジョブの実行に必要なもの）
+PARAM_NAMES = ('industry', 'revenue', 'keywords', 'num_companies', 'max_keymen', 'weights', 'profile', 'mode',
+               'fields')
+
+SEARCHES_TRUNCATED = metrics.counter(
+    'sales_bot_searches_truncated_total', '締め切りを過ぎて途中の結果で完了した検索の数')
+CHECKPOINTS = metrics.counter(
+    'sales_bot_search_checkpoints_total', '実行中に保存した検索の途中経過の数（lost: リースを失っていた）', ('result',))
+
+
+def build_params(industry: str, revenue: str, keywords: str, num_companies: int, max_keymen: int = 5,
+                 weights: Optional[Dict[str, float]] = None, profile: Optional[bool] = None,
+                 submitter: Optional[str] = None, priority: Optional[str] = None, mode: str = 'full',
+                 fields: Optional[Sequence[str]] = None) -> Dict:
+    """
+    ワーカーが実行できるように保存する検索パラメータ（submitter・priority はスケジューラー用）
+    """
+    return {
+        'industry': industry,
+        'revenue': revenue,
+        'keywords': keywords or '',
+        'num_companies': num_companies,
+        'max_keymen': max_keymen,
+        'weights': weights,
+        'profile': profile,
+        'mode': mode,
+        'fields': list(fields) if fields is not None else None,
+        'submitter': submitter,
+        'priority': priority
+    }
+
+
+class SearchJob:
+    """
+    1件の検索を企業単位のステップに分けて実行する
+
+    1回目の run_step() で企業候補を選び、以降は1社ずつ企業ページの詳細情報を取得してキーマンを特定し、
+    最後に結果を保存する。
+    ステップごとに別のスレッドで実行してもよい（scheduler.FairScheduler が他の検索と交互に実行する）
+
+    mode='lite' の場合は企業ページ・キーマンを取得せず、企業候補のみを1ステップで保存する
+    （詳細は enrichment.enrich_search() で選ばれた企業だけ取得する）。
+    fields を指定した場合は結果をその項目に絞り、指定されていない項目のための取得・抽出を省略する（projection）。
+    lookups を指定した場合は企業ページ・キーマンの取得結果を同じバッチの他の検索と共有する（lookup_cache）。
+    owner はワーカーのリースの所有者（途中経過・結果をリースつきで保存する。None の場合はリースを使わずに保存する）。
+    リースを失った場合（lose_lease()・途中経過を保存できなかった場合）は、次のステップから実行せず結果も保存しない
+    """
+
+    def __init__(self, store: SearchStore, company_search: 'CompanySearch', keyman_finder: 'KeymanFinder',
+                 search_id: int, industry: str, revenue: str, keywords: str, num_companies: int,
+                 max_keymen: int = 5, weights: Optional[Dict[str, float]] = None, profile: Optional[bool] = None,
+                 mode: str = 'full', fields: Optional[Sequence[str]] = None,
+                 lookups: Optional[lookup_cache.LookupCache] = None, owner: Optional[str] = None):
+        self.store = store
+        self.company_search = company_search
+        self.keyman_finder = keyman_finder
+        self.search_id = search_id
+        self.industry = industry
+        self.revenue = revenue
+        self.keywords = keywords
+        self.num_companies = num_companies
+        self.max_keymen = max_keymen
+        self.weights = weights
+        self.mode = mode
+        self.fields = tuple(fields) if fields is not None else None
+        self.lookups = lookups
+        self.owner = owner
+        # 再実行（requeue_search）でジョブを作り直すための検索パラメータ
+        self.params = build_params(industry, revenue, keywords, num_companies, max_keymen, weights, profile,
+                                   mode=mode, fields=fields)
+        # 1社あたりに特定するキーマン数（キーマンの項目が指定されていなければ0）
+        self._keymen = max_keymen if projection.needs_keymen(self.fields) else 0
+
+        self.companies: Optional[List[Dict]] = None
+        self.results: List[Dict] = []
+        self.done = False
+        self._index = 0
+        self._names = None
+        self._start = None
+        self._deadline: Optional[Deadline] = None
+        self._saved_at: Optional[float] = None
+        self._lease_lost = False
+        # 検索ごとの処理時間・通信量の内訳
+        self.stats = metrics.SearchStats()
+        self._profiler = profiling.JobProfiler(f"search_{search_id}", enabled=profiling.should_profile(profile))
+        self._memory = memory_tracking.JobTracker(f"search_{search_id}")
+
+    @property
+    def cost(self) -> int:
+        """
+        ジョブ全体の重さの見積もり（企業数 × (キーマン数 + 1)）
+        """
+        return job_cost(self.num_companies, self.max_keymen, self.mode, self.fields)
+
+    @property
+    def remaining_cost(self) -> int:
+        """
+        まだ実行していないステップのコストの合計
+        """
+        if self.done:
+            return 0
+        if self.companies is None:
+            return self.cost
+        return (len(self.companies) - self._index) * (self._keymen + 1)
+
+    @property
+    def processed(self) -> int:
+        """
+        キーマンの特定まで終わった企業数
+        """
+        return self._index
+
+    @property
+    def step_cost(self) -> int:
+        """
+        次のステップの重さの見積もり（企業検索は1、1社分のキーマン特定は キーマン数 + 1）
+        """
+        return 1 if self.companies is None else self._keymen + 1
+
+    def run(self):
+        """
+        すべてのステップを続けて実行
+        """
+        while self.run_step():
+            pass
+
+    def run_step(self, until: Optional[float] = None, keep_partial: bool = True) -> bool:
+        """
+        次のステップを実行（まだステップが残っていれば True）
+
+        Args:
+            until: ステップを打ち切る時刻（time.time() の値。検索の締め切りより前の場合のみ使う）
+            keep_partial: until で打ち切った企業の途中までの結果を残すか。
+                          False の場合は結果を捨て、次の呼び出しでその企業からやり直す
+        """
+        if self.done:
+            return False
+        if self._lease_lost:
+            # 他のワーカーが引き継いだ可能性があるため、続きを実行しない
+            print(f"[Search {self.search_id}] リースを失ったため実行を中止します")
+            self.done = True
+            self._stop_tracking()
+            return False
+
+        with metrics.bind_stats(self.stats), lookup_cache.bind(self.lookups), self._profiler.step():
+            try:
+                if self.companies is None:
+                    self._begin()
+                elif self._index < len(self.companies) and not self._should_stop():
+                    deadline = self._step_deadline(until)
+                    rows = len(self.results)
+                    self._process_company(self.companies[self._index], deadline)
+                    if deadline is self._deadline or not deadline.truncated:
+                        self._index += 1
+                    elif keep_partial:
+                        # やり直しても終わらない企業は、途中までの結果で先へ進む
+                        self.stats.truncated = True
+                        self._index += 1
+                    else:
+                        del self.results[rows:]
+
+                # 締め切りを過ぎた場合は残りの企業を処理せず、ここまでの結果で完了する
+                if not self.done and (self._index >= len(self.companies) or self._truncated()):
+                    self._complete()
+                elif not self.done:
+                    self._save_progress()
+
+            except Exception as e:
+                # エラーが発生した場合
+                error_message = f"{str(e)}\n{traceback.format_exc()}"
+                print(f"[Search {self.search_id}] エラー発生:\n{error_message}")
+                self._end("failed", error_message=str(e))
+
+        return not self.done
+
+    def checkpoint(self) -> Dict:
+        """
+        途中経過（取得済みの企業・処理済みの企業数・結果・内訳）。restore() で続きから再開できる
+        """
+        return {
+            'params': self.params,
+            # 企業が見つからずに失敗した検索は、再実行したときに企業検索からやり直す
+            'companies': self.companies or None,
+            'index': self._index,
+            # 保存後に追加される行を含めないようにコピーする
+            'results': list(self.results),
+            'names_used': self._names.position if self._names is not None else 0,
+            # 締め切りまでの残り時間（保存から再開までの待ち時間は締め切りに含めない）
+            'deadline_remaining': self._deadline.remaining() if self._deadline is not None else None,
+            'stats': self.stats.to_dict()
+        }
+
+    def restore(self, checkpoint: Dict):
+        """
+        checkpoint() の途中経過から再開する（run_step() の前に呼ぶ）
+        """
+        self.companies = checkpoint.get('companies')
+        self._index = checkpoint.get('index', 0)
+        self.results = checkpoint.get('results') or []
+        self.stats = metrics.SearchStats.from_dict(checkpoint.get('stats'))
+        # 締め切りは実行していた時間だけを数え、残り時間がなければ新しい締め切りで始める（再実行）
+        remaining = checkpoint.get('deadline_remaining')
+        self._deadline = Deadline(remaining) if remaining is not None else search_deadline()
+        if self.companies is not None:
+            self._names = self.keyman_finder.name_scope(f"search_{self.search_id}", checkpoint.get('names_used', 0))
+            self._start_tracking()
+            print(f"[Search {self.search_id}] 再開: {self._index}/{len(self.companies)}社を処理済み")
+
+    def lose_lease(self):
+        """
+        リースを失ったことを伝える（ワーカーのハートビートから。別のスレッドから呼んでもよい）
+        """
+        self._lease_lost = True
+
+    def suspend(self) -> Dict:
+        """
+        実行を中断して途中経過を返す（続きは別のプロセス・呼び出しで restore() して実行する）
+        """
+        if self._start is not None:
+            metrics.JOBS_IN_PROGRESS.dec()
+            self._start = None
+        self._memory.stop()
+        self._profiler.save()
+        return self.checkpoint()
+
+    def _start_tracking(self):
+        metrics.JOBS_IN_PROGRESS.inc()
+        # 再開した検索の search_total は再開後の時間のみ
+        self._start = time.perf_counter()
+        self._memory.start()
+
+    def _begin(self):
+        self._start_tracking()
+        if self._deadline is None:
+            self._deadline = search_deadline()
+
+        print(f"\n[Search {self.search_id}] 検索開始")
+        # ステータスを処理中に更新
+        with metrics.span('db_write'):
+            self.store.update_search_status(self.search_id, "processing", owner=self.owner)
+
+        # サンプル氏名は検索内で重複しないように割り当てる
+        self._names = self.keyman_finder.name_scope(f"search_{self.search_id}")
+
+        # 企業検索（企業ページは取得せず、候補の順位付けのみ。詳細情報は企業ごとのステップで取得する）
+        print(f"[Search {self.search_id}] 企業検索中...")
+        companies = self.company_search.search_companies_by_criteria(
+            self.industry, self.revenue, self.keywords, self.num_companies, weights=self.weights,
+            deadline=self._deadline, detailed=False, fields=self.fields)
+        print(f"[Search {self.search_id}] {len(companies)}社を取得")
+
+        if not companies and not self._truncated():
+            error_msg = "企業が見つかりませんでした。検索条件を変更してください。"
+            print(f"[Search {self.search_id}] エラー: {error_msg}")
+            self.companies = []
+            self._end("failed", error_message=error_msg)
+            return
+
+        self.companies = companies
+        if self.mode == 'lite':
+            # 企業候補のみを保存して完了する
+            self.results = enrichment.lite_rows(companies)
+            self._index = len(companies)
+
+    def _process_company(self, company: Dict, deadline: Optional[Deadline]):
+        print(f"[Search {self.search_id}] 企業 {self._index + 1}/{len(self.companies)}: {company['企業名']}")
+        company = self.company_search.enrich_company(company, deadline, self.fields)
+        if not self._keymen:
+            # キーマンの項目が指定されていなければ、企業ごとに1行
+            metrics.record_skipped('keyman_discovery')
+            self.results.append(projection.project(company, self.fields))
+            return
+
+        # 役員・責任者を特定
+        keymen = self.keyman_finder.find_keymen(
+            company['企業名'],
+            company['企業URL'],
+            self.max_keymen,
+            names=self._names,
+            deadline=deadline
+        )
+
+        # 結果を統合
+        for keyman in keymen:
+            result_row = {
+                '企業名': company['企業名'],
+                '事業概要': company['事業概要'],
+                '設立年': company.get('設立年', ''),
+                '売上': company.get('売上', ''),
+                '利益': company.get('利益', ''),
+                '従業員規模': company.get('従業員規模', ''),
+                '事業領域': company.get('事業領域', ''),
+                '注力ポイント': company.get('注力ポイント', ''),
+                'キーマン氏名': keyman['氏名'],
+                '役職名': keyman['役職']
+            }
+            if self.fields is not None:
+                result_row = projection.project(dict(result_row, 企業URL=company['企業URL']), self.fields)
+
+            self.results.append(result_row)
+
+    def _save_progress(self, force: bool = False):
+        """
+        CHECKPOINT_INTERVAL 秒ごとに途中経過を保存（force=True の場合は間隔によらず保存する）。
+        保存に失敗しても検索は続ける
+        """
+        now = time.monotonic()
+        if not force:
+            if CHECKPOINT_INTERVAL < 0:
+                return
+            if self._saved_at is not None and now - self._saved_at < CHECKPOINT_INTERVAL:
+                return
+        self._saved_at = now
+        try:
+            with metrics.span('db_write'):
+                if self.owner is not None:
+                    saved = self.store.save_checkpoint(self.search_id, self.owner, self.checkpoint())
+                else:
+                    saved = self.store.save_progress(self.search_id, self.checkpoint())
+        except Exception as e:
+            CHECKPOINTS.inc(result='error')
+            print(f"[Search {self.search_id}] 途中経過を保存できませんでした: {e}")
+            return
+        CHECKPOINTS.inc(result='saved' if saved else 'lost')
+        if not saved and self.owner is not None:
+            self.lose_lease()
+
+    def _step_deadline(self, until: Optional[float]) -> Optional[Deadline]:
+        """
+        1ステップの締め切り（until が検索の締め切りより前なら until。打ち切っても検索の truncated にはしない）
+        """
+        if until is None or (self._deadline is not None and self._deadline.expires_at <= until):
+            return self._deadline
+        return Deadline(expires_at=until)
+
+    def _should_stop(self) -> bool:
+        return self._deadline is not None and self._deadline.should_stop()
+
+    def _truncated(self) -> bool:
+        return self._deadline is not None and self._deadline.truncated
+
+    def _complete(self):
+        # 結果を保存して完了
+        self.stats.rows = len(self.results)
+        if self._truncated() or self.stats.truncated:
+            self.stats.truncated = True
+            SEARCHES_TRUNCATED.inc()
+            print(f"[Search {self.search_id}] 締め切りを過ぎたため、途中の結果で完了します")
+        print(f"[Search {self.search_id}] 完了: {len(self.results)}件の役員・責任者情報を取得")
+        self._end("completed", results=self.results)
+
+    def _end(self, status: str, results: Optional[List[Dict]] = None, error_message: Optional[str] = None):
+        self.done = True
+        if status == 'failed':
+            # 再実行したときに、処理済みの企業から続けられるようにする
+            self._save_progress(force=True)
+        try:
+            with metrics.span('db_write'):
+                updated = self.store.update_search_status(self.search_id, status, results=results,
+                                                          error_message=error_message, stats=self.stats.to_dict(),
+                                                          owner=self.owner)
+            if not updated and self.owner is not None:
+                print(f"[Search {self.search_id}] リースを失ったため結果を保存しませんでした")
+        finally:
+            self._stop_tracking()
+
+    def _stop_tracking(self):
+        self.stats.finish()
+        if self._start is not None:
+            metrics.JOBS_IN_PROGRESS.dec()
+            metrics.observe_stage('search_total', time.perf_counter() - self._start)
+            self._start = None
+        self._memory.stop()
+        self._profiler.save()
+
+
+def job_cost(num_companies: int, max_keymen: int, mode: str = 'full',
+             fields: Optional[Sequence[str]] = None) -> int:
+    """
+    検索の重さの見積もり（1社ごとに企業ページの取得とキーマン数分の処理を行う。lite モードは企業検索のみ、
+    キーマンの項目が指定されていなければ企業ページの取得のみ）
+    """
+    if mode == 'lite':
+        return 1
+    if not projection.needs_keymen(fields):
+        max_keymen = 0
+    return max(int(num_companies), 0) * (max(int(max_keymen), 0) + 1)
+
+
+def create_job(store: SearchStore, company_search: 'CompanySearch', keyman_finder: 'KeymanFinder',
+               search_id: int, params: Dict, owner: Optional[str] = None) -> SearchJob:
+    """
+    保存された検索パラメータからジョブを作成（バッチ検索の検索は同じプロセスの同じバッチと取得結果を共有する）
+    """
+    lookups = lookup_cache.for_batch(params['batch_id']) if params.get('batch_id') is not None else None
+    return SearchJob(store, company_search, keyman_finder, search_id, lookups=lookups, owner=owner,
+                     **{name: params[name] for name in PARAM_NAMES if name in params})
+
+
+class BatchJob:
+    """
+    バッチ検索（複数の検索条件）を1つのジョブとしてスケジューラーで実行する
+
+    検索は受け付けた順に1件ずつステップを進め、企業ページ・キーマン・SNSの取得結果をバッチ内で共有する
+    （後の検索ほど取得済みの結果を使える）。各検索の結果・ステータスは検索IDごとに保存される
+    """
+
+    def __init__(self, batch_id: int, jobs: List[SearchJob], lookups: Optional[lookup_cache.LookupCache] = None):
+        self.batch_id = batch_id
+        self.jobs = jobs
+        self.lookups = lookups if lookups is not None else lookup_cache.for_batch(batch_id)
+        for job in jobs:
+            job.lookups = self.lookups
+
+    @property
+    def done(self) -> bool:
+        return all(job.done for job in self.jobs)
+
+    @property
+    def cost(self) -> int:
+        return sum(job.cost for job in self.jobs)
+
+    @property
+    def remaining_cost(self) -> int:
+        return sum(job.remaining_cost for job in self.jobs)
+
+    @property
+    def step_cost(self) -> int:
+        job = self._next_job()
+        return job.step_cost if job is not None else 0
+
+    def run(self):
+        while self.run_step():
+            pass
+
+    def run_step(self) -> bool:
+        """
+        実行中の検索の次のステップを実行（まだステップが残っていれば True）
+        """
+        job = self._next_job()
+        if job is None:
+            return False
+        job.run_step()
+        return not self.done
+
+    def _next_job(self) -> Optional[SearchJob]:
+        return next((job for job in self.jobs if not job.done), None)
+
+
+def run_chunk(store: SearchStore, company_search: 'CompanySearch', keyman_finder: 'KeymanFinder',
+              owner: str, time_budget: float = WORKER_CHUNK_SECONDS,
+              max_attempts: int = WORKER_MAX_ATTEMPTS) -> Optional[Dict]:
+    """
+    実行待ちの検索を1件取得し、time_budget 秒以内に終わる見込みの分だけ実行する
+
+    終わらなかった分は途中経過（checkpoint）を保存してリースを解除し、次の呼び出しで続きから実行する。
+    サーバーレス関数（api/worker.py）のように1回の実行時間に上限がある環境で使う
+
+    Returns:
+        {'search_id', 'status', 'done', 'processed', 'total'}。実行待ちがなければ None
+    """
+    deadline = time.monotonic() + time_budget
+    until = time.time() + time_budget
+    # 途中で停止した場合に、次の呼び出しがすぐに引き継げる長さ
+    claimed = store.claim_job(owner, time_budget * 2, max_attempts)
+    if claimed is None:
+        return None
+
+    search_id = claimed['id']
+    job = create_job(store, company_search, keyman_finder, search_id, claimed['params'] or {}, owner)
+    try:
+        if claimed.get('checkpoint'):
+            job.restore(claimed['checkpoint'])
+
+        slowest = 0.0
+        first = True
+        while True:
+            started = time.monotonic()
+            # 予算内に終わらなかった企業は次の呼び出しでやり直す（1回の予算でも終わらない企業は途中までの結果を残す）
+            if not job.run_step(until, keep_partial=first):
+                break
+            first = False
+            slowest = max(slowest, time.monotonic() - started)
+            # 次のステップが予算内に終わらない見込みなら中断
+            if time.monotonic() + slowest > deadline:
+                break
+
+        if not job.done:
+            store.save_checkpoint(search_id, owner, job.suspend())
+    finally:
+        store.release_lease(search_id, owner)
+
+    search = store.get_search(search_id) or {}
+    return {
+        'search_id': search_id,
+        'status': search.get('status'),
+        'done': job.done,
+        'processed': job.processed,
+        'total': len(job.companies) if job.companies is not None else None
+    }
+
+
+def run_search(store: SearchStore, company_search: 'CompanySearch', keyman_finder: 'KeymanFinder',
+               search_id: int, industry: str, revenue: str, keywords: str, num_companies: int,
+               max_keymen: int = 5, weights: Optional[Dict[str, float]] = None, profile: Optional[bool] = None):
+    """
+    検索を実行して結果・ステータスを保存
+    """
+    SearchJob(store, company_search, keyman_finder, search_id, industry, revenue, keywords, num_companies,
+              max_keymen, weights, profile).run()
+
+
+def run_job(store: SearchStore, company_search: 'CompanySearch', keyman_finder: 'KeymanFinder',
+            search_id: int, params: Dict):
+    """
+    保存された検索パラメータで検索を実行
+    """
+    create_job(store, company_search, keyman_finder, search_id, params).run()
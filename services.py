@@ -0,0 +1,68 @@
+"""
+サービスモジュール
+企業検索・キーマン特定・SNS検索のインスタンスをプロセス内で共有する
+
+インスタンスは初回の呼び出し時に作成する。company_search などは requests・BeautifulSoup・numpy を
+読み込むため、起動時（Vercel のコールドスタートなど）に読み込まないようにしている
+"""
+
+import importlib
+import threading
+from typing import Dict, Optional
+
+# サービス名 → (モジュール名, クラス名)
+_FACTORIES = {
+    'company_search': ('company_search', 'CompanySearch'),
+    'keyman_finder': ('keyman_finder', 'KeymanFinder'),
+    'sns_finder': ('sns_finder', 'SNSFinder'),
+}
+
+_instances: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def get(name: str):
+    """
+    サービスのインスタンス（初回呼び出し時に作成）
+    """
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                module_name, class_name = _FACTORIES[name]
+                instance = getattr(importlib.import_module(module_name), class_name)()
+                _instances[name] = instance
+    return instance
+
+
+def peek(name: str) -> Optional[object]:
+    """
+    作成済みのインスタンス（まだ作成されていなければ None。作成はしない）
+    """
+    return _instances.get(name)
+
+
+def set_service(name: str, instance: Optional[object]):
+    """
+    インスタンスを差し替える（ベンチマークなど）
+    """
+    if name not in _FACTORIES:
+        raise KeyError(name)
+    with _lock:
+        if instance is None:
+            _instances.pop(name, None)
+        else:
+            _instances[name] = instance
+
+
+def get_company_search():
+    return get('company_search')
+
+
+def get_keyman_finder():
+    return get('keyman_finder')
+
+
+def get_sns_finder():
+    return get('sns_finder')
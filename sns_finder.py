@@ -5,10 +5,14 @@ Facebook、X（旧Twitter）アカウントを検索・特定する
 
 import requests
 from bs4 import BeautifulSoup
-import time
 import re
-from typing import Dict, Optional
-from config import USER_AGENT, REQUEST_DELAY, FACEBOOK_SEARCH_ENABLED, TWITTER_SEARCH_ENABLED
+from typing import Dict, Optional, Sequence
+import http_client
+import lookup_cache
+import metrics
+import projection
+from config import USER_AGENT, SEARCH_ENGINE_URL, FACEBOOK_SEARCH_ENABLED, TWITTER_SEARCH_ENABLED
+from deadline import Deadline
 
 
 class SNSFinder:
@@ -17,7 +21,10 @@ class SNSFinder:
             'User-Agent': USER_AGENT
         }
     
-    def find_sns_accounts(self, keyman_name: str, company_name: str, position: str) -> Dict[str, str]:
+    @metrics.timed('sns_lookup')
+    def find_sns_accounts(self, keyman_name: str, company_name: str, position: str,
+                          deadline: Optional[Deadline] = None,
+                          fields: Optional[Sequence[str]] = None) -> Dict[str, str]:
         """
         キーマンのSNSアカウントを検索
         
@@ -25,45 +32,73 @@ class SNSFinder:
             keyman_name: キーマンの氏名
             company_name: 企業名
             position: 役職
+            deadline: 検索の締め切り（過ぎた場合は検索せず「なし」を返す）
+            fields: 必要な項目（projection。指定されていない SNS は検索しない）
         
         Returns:
             SNSアカウントURLの辞書
         """
-        print(f"    SNS検索中: {keyman_name} ({company_name})")
-        
         sns_accounts = {
             'Facebook': 'なし',
             'X（旧Twitter）': 'なし'
         }
         
+        search_facebook = FACEBOOK_SEARCH_ENABLED and projection.wants(fields, 'Facebook URL')
+        search_twitter = TWITTER_SEARCH_ENABLED and projection.wants(fields, 'X（旧Twitter） URL')
+        if FACEBOOK_SEARCH_ENABLED and not search_facebook:
+            metrics.record_skipped('facebook_lookup')
+        if TWITTER_SEARCH_ENABLED and not search_twitter:
+            metrics.record_skipped('x_lookup')
+        if not (search_facebook or search_twitter):
+            return sns_accounts
+        
+        print(f"    SNS検索中: {keyman_name} ({company_name})")
+        
+        if deadline is not None and deadline.should_stop():
+            return sns_accounts
+        
+        # バッチ検索では、同じキーマンのアカウントを他の検索条件と共有する
+        return lookup_cache.lookup(
+            'sns', (keyman_name, company_name, search_facebook, search_twitter),
+            lambda: self._search_accounts(keyman_name, company_name, sns_accounts, search_facebook, search_twitter,
+                                          deadline), deadline)
+    
+    def _search_accounts(self, keyman_name: str, company_name: str, sns_accounts: Dict[str, str],
+                         search_facebook: bool, search_twitter: bool,
+                         deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """
+        Facebook・X（旧Twitter）のアカウントを検索して sns_accounts に設定
+        """
         # Facebookアカウント検索
-        if FACEBOOK_SEARCH_ENABLED:
-            facebook_url = self._find_facebook(keyman_name, company_name)
+        if search_facebook:
+            facebook_url = self._find_facebook(keyman_name, company_name, deadline)
             if facebook_url:
                 sns_accounts['Facebook'] = facebook_url
         
         # X（旧Twitter）アカウント検索
-        if TWITTER_SEARCH_ENABLED:
-            twitter_url = self._find_twitter(keyman_name, company_name)
+        if search_twitter:
+            twitter_url = self._find_twitter(keyman_name, company_name, deadline)
             if twitter_url:
                 sns_accounts['X（旧Twitter）'] = twitter_url
         
-        time.sleep(REQUEST_DELAY)
+        http_client.throttle(deadline=deadline)
         
         return sns_accounts
     
-    def _find_facebook(self, name: str, company: str) -> Optional[str]:
+    def _find_facebook(self, name: str, company: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """
         Facebookアカウントを検索
         """
         try:
             # Google検索でFacebookプロフィールを検索
             query = f"{name} {company} site:facebook.com"
-            search_url = f"https://www.google.com/search?q={requests.utils.quote(query)}"
+            search_url = f"{SEARCH_ENGINE_URL}?q={requests.utils.quote(query)}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=10)
+            with metrics.span('serp_fetch'):
+                response = http_client.get(search_url, headers=self.headers, timeout=10, deadline=deadline)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                with metrics.span('html_parse'):
+                    soup = BeautifulSoup(response.content, 'html.parser')
                 
                 # Facebookのリンクを抽出
                 for link in soup.find_all('a', href=True):
@@ -79,18 +114,20 @@ class SNSFinder:
         
         return None
     
-    def _find_twitter(self, name: str, company: str) -> Optional[str]:
+    def _find_twitter(self, name: str, company: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """
         X（旧Twitter）アカウントを検索
         """
         try:
             # Google検索でTwitterプロフィールを検索
             query = f"{name} {company} site:twitter.com OR site:x.com"
-            search_url = f"https://www.google.com/search?q={requests.utils.quote(query)}"
+            search_url = f"{SEARCH_ENGINE_URL}?q={requests.utils.quote(query)}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=10)
+            with metrics.span('serp_fetch'):
+                response = http_client.get(search_url, headers=self.headers, timeout=10, deadline=deadline)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                with metrics.span('html_parse'):
+                    soup = BeautifulSoup(response.content, 'html.parser')
                 
                 # TwitterまたはX.comのリンクを抽出
                 for link in soup.find_all('a', href=True):
@@ -0,0 +1,199 @@
+"""
+ストレージモジュール
+検索履歴・結果の保存先（バックエンド）の共通インターフェースと切り替え
+
+バックエンドは環境変数 STORAGE_BACKEND で指定する（省略時は自動判定）:
+    - redis : Redis（REDIS_URL）。複数のプロセス・インスタンスで検索状態を共有できる
+    - memory: プロセス内のメモリ（USE_MEMORY_DB=true のときの既定）
+    - sql   : SQLAlchemy のデータベース（DATABASE_URL、既定は sqlite:///./sales_bot.db）
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+
+class SearchStore(ABC):
+    """
+    検索履歴・結果の保存先
+    """
+    name = ''
+
+    def init_db(self):
+        """保存先の初期化"""
+        pass
+
+    @abstractmethod
+    def create_search(self, conditions: str, num_companies: int, params: Optional[Dict] = None) -> int:
+        """新しい検索を作成して検索IDを返す（params はワーカーが実行するための検索パラメータ）"""
+
+    @abstractmethod
+    def get_search(self, search_id: int) -> Optional[Dict]:
+        """検索を取得（存在しない場合は None）"""
+
+    @abstractmethod
+    def update_search_status(self, search_id: int, status: str,
+                             results: Optional[List[Dict]] = None,
+                             error_message: Optional[str] = None,
+                             stats: Optional[Dict] = None,
+                             owner: Optional[str] = None) -> bool:
+        """
+        検索ステータス・結果を更新（検索が存在しない場合は更新せずに False）
+
+        Args:
+            owner: ワーカーのリースの所有者。指定した場合はリースを持っているときのみ更新する
+                   （リースを失った後に他のワーカーが引き継いだ検索の結果を上書きしない）
+        """
+
+    @abstractmethod
+    def get_all_searches(self, limit: int = 50) -> List[Dict]:
+        """検索一覧を取得（新しい順）"""
+
+    # ---- バッチ検索 ----
+
+    @abstractmethod
+    def create_batch(self, searches: List[Dict]) -> Tuple[int, List[int]]:
+        """
+        複数の検索をまとめて作成し、バッチIDと検索IDのリスト（searches と同じ順）を返す
+
+        Args:
+            searches: {'conditions', 'num_companies', 'params'} のリスト。
+                      params（ワーカーで実行する検索）には batch_id を追加して保存する
+        """
+
+    @abstractmethod
+    def get_batch(self, batch_id: int) -> Optional[Dict]:
+        """バッチを取得（{'id', 'search_ids', 'created_at'}。存在しない場合は None）"""
+
+    # ---- 途中経過・再実行 ----
+
+    @abstractmethod
+    def save_progress(self, search_id: int, checkpoint: Dict) -> bool:
+        """
+        リースを使わずに実行中の検索（Webサービスのスケジューラー）の途中経過を保存。
+        実行中でない・ワーカーがリースを持っている場合は保存せずに False
+        """
+
+    @abstractmethod
+    def requeue_search(self, search_id: int, force: bool = False) -> Optional[Dict]:
+        """
+        失敗した検索を実行待ちに戻す（途中経過は残し、エラーメッセージ・リース・取得回数は消す）。
+        再実行は新しい締め切りで始めるため、途中経過の締め切りの残り時間（deadline_remaining）は消す
+
+        Args:
+            force: 実行していたプロセスが停止して「処理中」のまま残った検索も戻す
+
+        Returns:
+            {'id', 'params', 'checkpoint'}。検索が見つからない・戻せるステータスでなければ None
+        """
+
+    # ---- ワーカー用（リースによる検索の取得） ----
+
+    @abstractmethod
+    def claim_job(self, owner: str, lease_seconds: float, max_attempts: int = 3) -> Optional[Dict]:
+        """
+        実行待ちの検索を1件取得してリースを設定
+
+        Returns:
+            {'id', 'params', 'attempts', 'checkpoint'}。実行待ちがなければ None
+        """
+
+    @abstractmethod
+    def renew_lease(self, search_id: int, owner: str, lease_seconds: float) -> bool:
+        """リースを延長。リースを失っていた場合は False"""
+
+    @abstractmethod
+    def release_lease(self, search_id: int, owner: str):
+        """リースを解除"""
+
+    @abstractmethod
+    def save_checkpoint(self, search_id: int, owner: str, checkpoint: Dict) -> bool:
+        """
+        途中経過を保存してリースの取得回数を0に戻す（次に取得したワーカーが続きから実行する）。
+        リースを失っていた場合は保存せずに False
+        """
+
+    @abstractmethod
+    def count_pending(self) -> int:
+        """実行待ちの検索数"""
+
+    @abstractmethod
+    def get_active_params(self) -> List[Dict]:
+        """実行待ち・実行中の検索のパラメータ（受付制御でワーカーの負荷を見積もる）"""
+
+
+def requeue_statuses(force: bool = False) -> Tuple[str, ...]:
+    """
+    requeue_search() で実行待ちに戻せるステータス
+    """
+    return ('failed', 'processing') if force else ('failed',)
+
+
+def restart_checkpoint(checkpoint: Optional[Dict]) -> Optional[Dict]:
+    """
+    再実行用の途中経過（締め切りの残り時間を消して、再開した時点から数え直す）
+    """
+    if not checkpoint:
+        return None
+    return dict(checkpoint, deadline_remaining=None)
+
+
+_store: Optional[SearchStore] = None
+_store_lock = threading.Lock()
+
+
+def backend_name() -> str:
+    """
+    使用するバックエンド名（環境変数から判定）
+    """
+    backend = os.getenv('STORAGE_BACKEND', '').lower()
+    if backend:
+        return backend
+    if os.getenv('REDIS_URL'):
+        return 'redis'
+    if os.getenv('USE_MEMORY_DB', 'false').lower() == 'true':
+        return 'memory'
+    return 'sql'
+
+
+def create_store(backend: Optional[str] = None) -> SearchStore:
+    """
+    バックエンドを作成して初期化
+    """
+    backend = backend or backend_name()
+    if backend == 'redis':
+        from database_redis import RedisSearchStore
+        store = RedisSearchStore(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+    elif backend == 'memory':
+        from database_memory import MemorySearchStore
+        store = MemorySearchStore()
+    elif backend == 'sql':
+        from database import SQLSearchStore
+        store = SQLSearchStore(os.getenv('DATABASE_URL', 'sqlite:///./sales_bot.db'))
+    else:
+        raise ValueError(f"不明なストレージバックエンドです: {backend}（redis / memory / sql）")
+
+    store.init_db()
+    return store
+
+
+def get_store() -> SearchStore:
+    """
+    プロセス共通のバックエンド（初回呼び出し時に作成）
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store()
+    return _store
+
+
+def set_store(store: Optional[SearchStore]):
+    """
+    バックエンドを差し替える（ベンチマーク・ワーカーの起動時など）
+    """
+    global _store
+    with _store_lock:
+        _store = store
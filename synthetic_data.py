@@ -0,0 +1,284 @@
+"""
+合成データ生成モジュール
+負荷試験用に、シード固定で大量の企業・キーマンデータを生成する
+
+使い方:
+    python synthetic_data.py --industry it_saas --companies 1000000 --seed 42 --output companies.jsonl
+    python synthetic_data.py --kind results --companies 100000 --format csv --output results.csv
+"""
+
+import argparse
+import csv
+import json
+import re
+import sys
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from keyman_finder import SAMPLE_FIRST_NAMES, SAMPLE_LAST_NAMES, SAMPLE_POSITIONS
+
+# バリエーション用のプレフィックス・地域・サフィックス
+PREFIXES = ['', 'ネクスト', 'アドバンス', 'プレミアム', 'グローバル', 'ジャパン', 'デジタル',
+            'スマート', 'フューチャー', 'モダン', 'エキスパート', 'プロ', 'トップ', 'エリート',
+            'ハイクオリティ', 'イノベーティブ', 'クリエイティブ', 'ダイナミック']
+
+LOCATIONS = ['東京', '大阪', '名古屋', '福岡', '札幌', '横浜', '神戸', '京都', '仙台', '広島',
+             '関西', '関東', '九州', '北海道', '東北', '中部', '中国', '四国']
+
+SUFFIXES = ['ホールディングス', 'グループ', 'ラボ', 'スタジオ', 'ワークス', 'システムズ',
+            'ソリューションズ', 'サービス', 'パートナーズ', 'アソシエイツ', 'エンタープライズ']
+
+# 従業員数のバリエーション
+EMPLOYEE_RANGES = np.array([
+    (15, 30), (30, 50), (50, 80), (80, 120), (120, 200),
+    (200, 350), (350, 500), (500, 1000)
+])
+
+# 設立年のバリエーション
+FOUNDED_YEARS = np.arange(2015, 2023)
+
+# 内部の生成単位（バッチサイズに関係なく同じシードなら同じ行になる）
+BLOCK_SIZE = 8192
+
+# 出力する結果行の列（app.perform_search / main.AISalesBot.run と同じ）
+RESULT_FIELDS = [
+    '企業名', '企業URL', '事業概要', '設立年', '売上', '利益',
+    '従業員規模', '事業領域', '注力ポイント', 'キーマン氏名', '役職名'
+]
+
+
+def default_seed(base_companies: List[Dict]) -> int:
+    """
+    基本データから安定したシードを導出（同じ業界なら毎回同じプールになる）
+    """
+    key = '\n'.join(company['title'] for company in base_companies)
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def _snippet_template(snippet: str) -> str:
+    """
+    スニペットの数値部分を置換用のプレースホルダーに変換（基本企業ごとに1回だけ）
+    """
+    template = snippet.replace('{', '{{').replace('}', '}}')
+    template = re.sub(r'\d{4}年設立', '{year}年設立', template)
+    template = re.sub(r'従業員\d+名', '従業員{employees}名', template)
+    template = re.sub(r'売上高\d+億円', '売上高{revenue}億円', template)
+    template = re.sub(r'営業利益\d+(\.\d+)?億円', '営業利益{profit}億円', template)
+    return template
+
+
+class SyntheticCompanyGenerator:
+    """
+    基本企業データからバリエーション企業を生成する
+
+    乱数は BLOCK_SIZE 行ごとに (seed, ブロック番号) で初期化するため、
+    バッチサイズや生成の開始位置に関係なく同じ行が得られる
+    """
+
+    def __init__(self, base_companies: List[Dict], seed: Optional[int] = None):
+        if not base_companies:
+            raise ValueError("基本企業データが空です")
+
+        self.base_companies = base_companies
+        self.seed = default_seed(base_companies) if seed is None else seed
+
+        # 基本企業ごとの前処理（行ごとの文字列処理を避ける）
+        self._base_names = [c['title'].split(' | ')[0].replace('株式会社', '').strip() for c in base_companies]
+        self._base_categories = [c['title'].split(' | ')[1] if ' | ' in c['title'] else '' for c in base_companies]
+        self._base_revenues = np.array([c.get('revenue_value', 50) for c in base_companies], dtype=np.float64)
+        self._templates = [_snippet_template(c['snippet']) for c in base_companies]
+
+    def _block(self, block_index: int) -> Dict[str, np.ndarray]:
+        """
+        1ブロック分の属性を配列でまとめて生成
+        """
+        rng = np.random.default_rng([self.seed, block_index])
+        n = BLOCK_SIZE
+
+        # バリエーション番号は1始まり（_generate_company_variations と同じ）
+        variation_index = np.arange(block_index * n + 1, (block_index + 1) * n + 1)
+        base_index = (variation_index - 1) % len(self.base_companies)
+
+        revenue = (self._base_revenues[base_index] * rng.uniform(0.9, 1.1, n)).astype(np.int64)
+        profit = np.round(revenue * rng.uniform(0.05, 0.15, n), 1)
+
+        ranges = EMPLOYEE_RANGES[rng.integers(0, len(EMPLOYEE_RANGES), n)]
+        employees = rng.integers(ranges[:, 0], ranges[:, 1], endpoint=True)
+
+        return {
+            'variation_index': variation_index,
+            'base_index': base_index,
+            'variation_type': variation_index % 3,
+            'prefix': rng.integers(0, len(PREFIXES), n),
+            'location': rng.integers(0, len(LOCATIONS), n),
+            'suffix': rng.integers(0, len(SUFFIXES), n),
+            'revenue': revenue,
+            'profit': profit,
+            'employees': employees,
+            'year': FOUNDED_YEARS[rng.integers(0, len(FOUNDED_YEARS), n)],
+            'first_names': rng.integers(0, len(SAMPLE_FIRST_NAMES), (n, len(SAMPLE_POSITIONS))),
+            'last_names': rng.integers(0, len(SAMPLE_LAST_NAMES), (n, len(SAMPLE_POSITIONS)))
+        }
+
+    def _iter_blocks(self, start: int, stop: int) -> Iterator[tuple]:
+        """
+        [start, stop) の行を含むブロックを (ブロック, ブロック内の開始, 終了) で返す
+        """
+        for block_index in range(start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE + 1):
+            block_start = block_index * BLOCK_SIZE
+            lo = max(start - block_start, 0)
+            hi = min(stop - block_start, BLOCK_SIZE)
+            yield self._block(block_index), lo, hi
+
+    def _company_rows(self, block: Dict[str, np.ndarray], lo: int, hi: int) -> List[Dict]:
+        """
+        ブロックの一部を企業データ（候補企業の行形式）に変換
+        """
+        rows = []
+        base_names = self._base_names
+        categories = self._base_categories
+        templates = self._templates
+
+        columns = zip(*(block[key][lo:hi].tolist() for key in (
+            'variation_index', 'base_index', 'variation_type', 'prefix', 'location',
+            'suffix', 'revenue', 'profit', 'employees', 'year')))
+
+        for index, base, kind, prefix, location, suffix, revenue, profit, employees, year in columns:
+            base_name = base_names[base]
+            if kind == 0:
+                new_name = f"{PREFIXES[prefix]}{base_name}"
+            elif kind == 1:
+                new_name = f"{LOCATIONS[location]}{base_name}"
+            else:
+                new_name = f"{base_name}{SUFFIXES[suffix]}"
+
+            url_slug = new_name.replace(' ', '-').lower()
+            rows.append({
+                'title': f'株式会社{new_name} | {categories[base]}',
+                'url': f"https://example-{index}-{url_slug[:20]}.com",
+                'snippet': templates[base].format(year=year, employees=employees, revenue=revenue, profit=profit),
+                'revenue_value': revenue,
+                'profit_value': profit,
+                'employees_value': employees,
+                'founded_year': year
+            })
+
+        return rows
+
+    def companies(self, count: int, start: int = 0) -> List[Dict]:
+        """
+        start 行目から count 社分の企業データを生成
+        """
+        rows = []
+        for block, lo, hi in self._iter_blocks(start, start + count):
+            rows.extend(self._company_rows(block, lo, hi))
+        return rows
+
+    def iter_company_batches(self, total: int, batch_size: int = 10000) -> Iterator[List[Dict]]:
+        """
+        企業データをバッチ単位で順に生成
+        """
+        for start in range(0, total, batch_size):
+            yield self.companies(min(batch_size, total - start), start)
+
+    def iter_result_batches(self, total_companies: int, keymen_per_company: int = 5,
+                            batch_size: int = 10000) -> Iterator[List[Dict]]:
+        """
+        企業 × キーマンの結果行（検索結果と同じ形式）をバッチ単位で生成
+        """
+        from company_search import CompanySearch
+
+        keymen_per_company = min(keymen_per_company, len(SAMPLE_POSITIONS))
+
+        # 事業領域・注力ポイントは基本企業ごとに1回だけ抽出する
+        extractor = CompanySearch()
+        domains = [extractor._extract_business_domain('', c['snippet']) for c in self.base_companies]
+        focus_points = [extractor._extract_focus_points('', c['snippet']) for c in self.base_companies]
+
+        for start in range(0, total_companies, batch_size):
+            stop = min(start + batch_size, total_companies)
+            rows = []
+            for block, lo, hi in self._iter_blocks(start, stop):
+                companies = self._company_rows(block, lo, hi)
+                first_names = block['first_names'][lo:hi].tolist()
+                last_names = block['last_names'][lo:hi].tolist()
+                base_indexes = block['base_index'][lo:hi].tolist()
+
+                for company, firsts, lasts, base in zip(companies, first_names, last_names, base_indexes):
+                    row = {
+                        '企業名': company['title'].split(' | ')[0],
+                        '企業URL': company['url'],
+                        '事業概要': company['snippet'][:200],
+                        '設立年': f"{company['founded_year']}年",
+                        '売上': f"{company['revenue_value']}億円",
+                        '利益': f"{company['profit_value']}億円",
+                        '従業員規模': f"{company['employees_value']}名",
+                        '事業領域': domains[base],
+                        '注力ポイント': focus_points[base]
+                    }
+                    for k in range(keymen_per_company):
+                        keyman_row = dict(row)
+                        keyman_row['キーマン氏名'] = f"{SAMPLE_LAST_NAMES[lasts[k]]} {SAMPLE_FIRST_NAMES[firsts[k]]}"
+                        keyman_row['役職名'] = SAMPLE_POSITIONS[k]
+                        rows.append(keyman_row)
+            yield rows
+
+
+def write_batches(batches: Iterator[List[Dict]], output, file_format: str = 'jsonl') -> int:
+    """
+    バッチをストリームとして書き出し、書き出した行数を返す
+    """
+    written = 0
+    writer = None
+
+    for batch in batches:
+        if not batch:
+            continue
+        if file_format == 'csv':
+            if writer is None:
+                writer = csv.DictWriter(output, fieldnames=list(batch[0].keys()))
+                writer.writeheader()
+            writer.writerows(batch)
+        else:
+            output.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in batch))
+        written += len(batch)
+
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="負荷試験用の合成企業データを生成")
+    parser.add_argument('--industry', default='it_saas', help="基本データの業界（CompanySearchの業界キー）")
+    parser.add_argument('--companies', type=int, default=100000, help="生成する企業数")
+    parser.add_argument('--kind', choices=['companies', 'results'], default='companies',
+                        help="companies: 候補企業の行 / results: 企業 × キーマンの結果行")
+    parser.add_argument('--keymen', type=int, default=5, help="1社あたりのキーマン数（results のみ）")
+    parser.add_argument('--seed', type=int, default=None, help="乱数シード（省略時は業界から導出）")
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--output', default='-', help="出力ファイル（- で標準出力）")
+    args = parser.parse_args(argv)
+
+    from company_search import CompanySearch
+    generator = SyntheticCompanyGenerator(CompanySearch()._get_base_companies(args.industry), seed=args.seed)
+
+    if args.kind == 'results':
+        batches = generator.iter_result_batches(args.companies, args.keymen, args.batch_size)
+    else:
+        batches = generator.iter_company_batches(args.companies, args.batch_size)
+
+    if args.output == '-':
+        written = write_batches(batches, sys.stdout, args.format)
+    else:
+        encoding = 'utf-8-sig' if args.format == 'csv' else 'utf-8'
+        with open(args.output, 'w', newline='', encoding=encoding) as f:
+            written = write_batches(batches, f, args.format)
+
+    print(f"✓ {written}行を生成しました (seed={generator.seed})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+RedisSearchStore のテスト（fakeredis を Redis の代わりに使う）
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from database_redis import RedisSearchStore  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def store(server):
+    return RedisSearchStore(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+
+
+def test_update_search_status_keeps_ttl(store):
+    search_id = store.create_search('業界: it_saas', 5, params={'industry': 'it_saas'})
+    key = store._key(search_id)
+
+    store.update_search_status(search_id, 'completed', results=[{'企業名': 'A社'}], stats={'rows': 1})
+
+    assert store.get_search(search_id)['status'] == 'completed'
+    assert store.get_search(search_id)['results'] == [{'企業名': 'A社'}]
+    assert 0 < store.client.ttl(key) <= store.ttl
+    # 完了した検索は実行待ちから外れる
+    assert store.client.zscore(store._queue_key, str(search_id)) is None
+
+
+def test_update_search_status_does_not_recreate_missing_search(store):
+    store.update_search_status(999, 'completed', results=[{'企業名': 'A社'}])
+
+    assert not store.client.exists(store._key(999))
+    assert store.get_search(999) is None
+
+
+def test_update_search_status_does_not_recreate_search_expired_during_update(store, server, monkeypatch):
+    """
+    存在の確認の後、書き込みの前に検索が消えた場合も作り直さない
+    """
+    search_id = store.create_search('業界: it_saas', 5)
+    key = store._key(search_id)
+    other = fakeredis.FakeRedis(server=server, decode_responses=True)
+    pipeline = store.client.pipeline
+
+    def interrupted_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        multi = pipe.multi
+
+        def multi_after_expiry():
+            # 確認と書き込みの間に TTL で消えた
+            other.delete(key)
+            multi()
+
+        pipe.multi = multi_after_expiry
+        return pipe
+
+    monkeypatch.setattr(store.client, 'pipeline', interrupted_pipeline)
+    store.update_search_status(search_id, 'completed', results=[{'企業名': 'A社'}])
+
+    assert not store.client.exists(key)
+    assert store.get_search(search_id) is None
+
+
+def test_update_search_status_requires_lease_owner(store):
+    """
+    リースを失ったワーカーは、引き継いだワーカーの結果を上書きしない
+    """
+    search_id = store.create_search('業界: it_saas', 5, params={'industry': 'it_saas'})
+    store.claim_job('worker-2', 60)
+
+    assert not store.update_search_status(search_id, 'completed', results=[{'企業名': 'A社'}], owner='worker-1')
+    assert store.get_search(search_id)['status'] == 'processing'
+
+    assert store.update_search_status(search_id, 'completed', results=[{'企業名': 'B社'}], owner='worker-2')
+    assert store.get_search(search_id)['results'] == [{'企業名': 'B社'}]
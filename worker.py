@@ -0,0 +1,227 @@
+"""
+検索ワーカー
+共有のデータベースから実行待ちの検索をリースつきで取得して実行する
+
+Webサービスを JOB_EXECUTION=worker で起動すると、検索は保存されるだけになり、
+このワーカーが実行する。ワーカーはプロセス・サーバーを増やすだけでスケールする。
+リースはハートビートで延長され、ワーカーが停止した場合は期限切れ後に他のワーカーが引き継ぐ。
+取得した検索は scheduler.FairScheduler で送信者・優先度ごとに企業単位で交互に実行する
+
+使い方:
+    DATABASE_URL=postgresql://... python worker.py --concurrency 2
+    python worker.py --once        # 実行待ちの検索をすべて処理して終了
+"""
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import traceback
+import uuid
+from typing import Callable, Optional
+
+import metrics
+import storage
+from company_search import CompanySearch
+from config import (WORKER_LEASE_SECONDS, WORKER_POLL_INTERVAL, WORKER_CONCURRENCY, WORKER_MAX_ATTEMPTS,
+                    WORKER_MAX_JOBS)
+from keyman_finder import KeymanFinder
+from scheduler import FairScheduler
+from search_job import create_job
+from storage import SearchStore
+
+LEASES_LOST = metrics.counter(
+    'sales_bot_worker_leases_lost_total', '実行中にリースを失った検索数（他のワーカーが引き継いだ可能性がある）')
+
+
+class Heartbeat:
+    """
+    実行中の検索のリースを定期的に延長する（延長できなかった場合は watch() で設定した関数を呼ぶ）
+    """
+
+    def __init__(self, store: SearchStore, search_id: int, owner: str, lease_seconds: float):
+        self.store = store
+        self.search_id = search_id
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._on_lost: Optional[Callable[[], None]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def watch(self, on_lost: Callable[[], None]):
+        """
+        リースを失ったときに呼ぶ関数を設定（すでに失っていればすぐに呼ぶ）
+        """
+        with self._lock:
+            self._on_lost = on_lost
+            lost = self.lost
+        if lost:
+            on_lost()
+
+    def __enter__(self) -> 'Heartbeat':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        # リースの1/3ごとに延長（1回失敗しても期限までに再試行できる）
+        interval = max(self.lease_seconds / 3, 0.1)
+        while not self._stop.wait(interval):
+            try:
+                if not self.store.renew_lease(self.search_id, self.owner, self.lease_seconds):
+                    with self._lock:
+                        self.lost = True
+                        on_lost = self._on_lost
+                    LEASES_LOST.inc()
+                    print(f"[Worker {self.owner}] ⚠️ 検索 {self.search_id} のリースを失いました")
+                    if on_lost is not None:
+                        on_lost()
+                    return
+            except Exception as e:
+                print(f"[Worker {self.owner}] ハートビートエラー: {e}")
+
+
+class Worker:
+    """
+    検索ワーカー
+
+    Args:
+        store: リースに対応した保存先（SQL バックエンド）
+        concurrency: 同時に実行するステップ数（スケジューラーのスレッド数）
+        lease_seconds: リースの有効期間（秒）
+        poll_interval: 実行待ちがない場合の待機時間（秒）
+        max_attempts: 停止したワーカーから引き継いで再実行する上限
+        max_jobs: 同時に取得しておく検索数（多いほど送信者間の公平性が上がる）
+    """
+
+    def __init__(self, store: SearchStore, concurrency: int = WORKER_CONCURRENCY,
+                 lease_seconds: float = WORKER_LEASE_SECONDS, poll_interval: float = WORKER_POLL_INTERVAL,
+                 max_attempts: int = WORKER_MAX_ATTEMPTS, worker_id: Optional[str] = None,
+                 max_jobs: int = WORKER_MAX_JOBS):
+        self.store = store
+        self.concurrency = max(concurrency, 1)
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_jobs = max(max_jobs, self.concurrency)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.company_search = CompanySearch()
+        self.keyman_finder = KeymanFinder()
+        self.scheduler = FairScheduler(self.concurrency)
+        self.processed = 0
+        self._processed_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._slot_freed = threading.Event()
+
+    def stop(self):
+        """新しい検索の取得をやめる（実行中の検索は最後まで実行する）"""
+        self._stopping.set()
+        self._slot_freed.set()
+
+    def claim_one(self) -> bool:
+        """
+        検索を1件取得してスケジューラーに渡す（実行待ちがなければ False）
+        """
+        owner = self.worker_id
+        job = self.store.claim_job(owner, self.lease_seconds, self.max_attempts)
+        if job is None:
+            return False
+
+        search_id = job['id']
+        params = job['params'] or {}
+        print(f"[Worker {owner}] 検索 {search_id} を取得しました（{job['attempts']}回目）")
+
+        heartbeat = Heartbeat(self.store, search_id, owner, self.lease_seconds)
+        heartbeat.start()
+        try:
+            search_job = create_job(self.store, self.company_search, self.keyman_finder, search_id, params, owner)
+            if job.get('checkpoint'):
+                # 停止したワーカー・再実行（requeue_search）の途中経過から続ける
+                search_job.restore(job['checkpoint'])
+            # リースを失った検索は、他のワーカーと同時に実行しないように次のステップで中止する
+            heartbeat.watch(search_job.lose_lease)
+            self.scheduler.submit(search_job, params.get('submitter'), params.get('priority'),
+                                  on_done=lambda _: self._finish(search_id, heartbeat))
+        except Exception as e:
+            # 保存された検索パラメータが不正な場合など
+            traceback.print_exc()
+            try:
+                self.store.update_search_status(search_id, "failed", error_message=str(e))
+            finally:
+                self._finish(search_id, heartbeat)
+        return True
+
+    def _finish(self, search_id: int, heartbeat: Heartbeat):
+        heartbeat.stop()
+        try:
+            self.store.release_lease(search_id, self.worker_id)
+        except Exception as e:
+            print(f"[Worker {self.worker_id}] リース解除エラー: {e}")
+
+        with self._processed_lock:
+            self.processed += 1
+        self._slot_freed.set()
+
+    def run(self, once: bool = False):
+        """
+        ワーカーを実行（once=True の場合は実行待ちがなくなったら終了）
+        """
+        print(f"[Worker {self.worker_id}] 開始: 同時実行数={self.concurrency} "
+              f"取得する検索数={self.max_jobs} リース={self.lease_seconds}秒")
+        self.scheduler.start()
+        while not self._stopping.is_set():
+            self._slot_freed.clear()
+            if self.scheduler.active_jobs < self.max_jobs:
+                try:
+                    if self.claim_one():
+                        continue
+                except Exception as e:
+                    print(f"[Worker {self.worker_id}] 検索の取得に失敗しました: {e}")
+                if once and self.scheduler.active_jobs == 0:
+                    break
+            # 実行待ちがない・取得数が上限の場合は、検索の完了か次のポーリングまで待つ
+            self._slot_freed.wait(self.poll_interval)
+
+        self.scheduler.stop(wait=True)
+        print(f"[Worker {self.worker_id}] 終了: {self.processed}件の検索を処理しました")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="検索ワーカー（共有データベースの実行待ちの検索を処理）")
+    parser.add_argument('--concurrency', type=int, default=WORKER_CONCURRENCY, help="同時に実行するステップ数（スレッド数）")
+    parser.add_argument('--max-jobs', type=int, default=WORKER_MAX_JOBS, help="同時に取得しておく検索数")
+    parser.add_argument('--lease', type=float, default=WORKER_LEASE_SECONDS, help="リースの有効期間（秒）")
+    parser.add_argument('--poll', type=float, default=WORKER_POLL_INTERVAL, help="実行待ちがない場合の待機時間（秒）")
+    parser.add_argument('--max-attempts', type=int, default=WORKER_MAX_ATTEMPTS, help="停止した検索を再実行する上限")
+    parser.add_argument('--once', action='store_true', help="実行待ちの検索をすべて処理したら終了")
+    args = parser.parse_args(argv)
+
+    worker = Worker(storage.get_store(), args.concurrency, args.lease, args.poll, args.max_attempts,
+                    max_jobs=args.max_jobs)
+
+    def handle_signal(signum, frame):
+        print(f"[Worker {worker.worker_id}] 停止シグナルを受信しました。実行中の検索の完了を待っています...")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    worker.run(once=args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())